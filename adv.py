@@ -1,67 +1,62 @@
+import argparse
+import collections
+import gc
+import hashlib
 import json
-import art
+import marshal
 import os
-import pygame 
-pygame.mixer.init()   
+import re
+import sys
+import tempfile
+import threading
+import time
+import audio
+import metrics
+import snapshot
+from autosave import BackgroundWriter
+from journal import Journal
+from leaderboard import DEFAULT_LEADERBOARD_FILE, get_leaderboard
 
-class Room:
-    """A class representing a room in the text adventure game.
-    
-    Attributes:
-    name (str): The name of the room.
-    description (str): A dictionary of direction of the room.
-    exits (dict): A dictionary of directions (e.g, 'north') to room names (e.g., 'Kitchen').
-    items (list): A list of items in the room. 
-    trap(bool: Whether the room has a trap.
-    chest_locked (bool): Whether the room has a locked chest.
-    guard_present (bool): Whether a guard is present in the room.
-    puzzle (tuple): A tuple of (riddle, answer) for rooms with a puzzle, or None.
-    npc(tuple): A tuple of (name, riddle, answer) for rooms with an NPC,
-    """
-    def __init__(self, name, description, exits=None, items=None, trap=False, chest_locked=False, guard_present=False, puzzle=None, npc=None):
-        self.name = name
-        self.description = description
-        self.exits = exits if exits is not None else {}
-        self.items = items if items is not None else []
-        self.trap = trap
-        self.chest_locked = chest_locked
-        self.guard_present = guard_present
-        self.puzzle = puzzle
-        self.npc = npc
+class BaseRoom:
+    """Behaviour shared by stored rooms (Room) and per-session room views (RoomState)."""
+    __slots__ = ()
 
     def get_description(self, player):
         """Get a formatted description of the room, including exists, items, traps, chest, and guard.
         Returns:
         str: The formatted description of the room.
         """
-        desc = f"You are in {self.name.lower()}."
+        parts = [f"You are in {self.name.lower()}."]
         if self.exits:
-            desc += f" Exits: {' , '.join(self.exits.keys())}."
+            parts.append(f" Exits: {' , '.join(self.exits.keys())}.")
         if self.items:
-            desc += f" You see: {', '.join(item.name + ' ' + item.description for item in self.items)}."
+            parts.append(f" You see: {', '.join(item.name + ' ' + item.description for item in self.items)}.")
         else:
-            desc += f" The room is now empty."
+            parts.append(" The room is now empty.")
+        rules = self.rules
         if self.trap:
-            if self.name == "Garden" and any(item.name == "shield" for item in player.inventory):
-                desc += " The garden looks safer with your shield."
+            trap = rules.get("trap", {})
+            if "safe_text" in trap and trap.get("protection") in player.inventory:
+                parts.append(trap["safe_text"])
             else:
-                desc += " Watch out! there's a trap here!"
+                parts.append(" Watch out! there's a trap here!")
         if self.chest_locked:
-            desc += " There's a locked chest here."
-        elif self.name == "Treasure Room" and not self.chest_locked:
-            desc += " The chest is now open."
+            parts.append(" There's a locked chest here.")
+        elif "chest" in rules:
+            parts.append(" The chest is now open.")
         if self.guard_present:
-            desc += " A guard is blocking the chest!"
-        elif self.name == "Treasure Room" and not self.guard_present:
-            desc += " The guard is gone."
-        if self.name == "Living Room" and "east" in self.exits:
-            desc += " The eastern wall reveals an open passage."
-        if self.puzzle and self.name == "Garden":
-            if "Garden" not in player.solved_riddles:
-                desc += f"A riddle guards an exits: '{self.puzzle[0]}'"
+            parts.append(" A guard is blocking the chest!")
+        elif "guard" in rules:
+            parts.append(" The guard is gone.")
+        for direction, hidden in rules.get("hidden_exits", {}).items():
+            if direction in self.exits and "text" in hidden:
+                parts.append(hidden["text"])
+        if self.puzzle:
+            if self.name not in player.solved_riddles:
+                parts.append(f"A riddle guards an exits: '{self.puzzle[0]}'")
         if self.npc:
-            desc += f" {self.npc[0]} is here, waiting to speak with you"
-        return desc
+            parts.append(f" {self.npc[0]} is here, waiting to speak with you")
+        return "".join(parts)
 
     def save(self):
         """Save the room's state to a dictionary for serialization.
@@ -71,8 +66,8 @@ class Room:
         return{
             "name": self.name,
             "description": self.description,
-            "exits": self.exits,
-            "items": [{"type": item.__class__.__name__, "name":item.name, "description":item.description} for item in self.items],
+            "exits": dict(self.exits),
+            "items": self.items.save(),
             "trap": self.trap,
             "chest_locked": self.chest_locked,
             "guard_present": self.guard_present,
@@ -80,6 +75,59 @@ class Room:
             "npc": self.npc
         }
 
+
+class Room(BaseRoom):
+    """A class representing a room in the text adventure game.
+    
+    Attributes:
+    name (str): The name of the room.
+    description (str): A dictionary of direction of the room.
+    exits (dict): A dictionary of directions (e.g, 'north') to room names (e.g., 'Kitchen').
+    items (ItemBag): The items in the room, keyed by name. 
+    trap(bool: Whether the room has a trap.
+    chest_locked (bool): Whether the room has a locked chest.
+    guard_present (bool): Whether a guard is present in the room.
+    puzzle (tuple): A tuple of (riddle, answer) for rooms with a puzzle, or None.
+    npc(tuple): A tuple of (name, riddle, answer) for rooms with an NPC,
+    rules (dict): The room's definition from the world file (locks, trap, puzzle, npc, chest,
+    guard, hidden exits and hints); empty for rooms loaded from a save file.
+    """
+    __slots__ = ("name", "description", "exits", "items", "trap", "chest_locked", "guard_present", "puzzle", "npc", "rules")
+
+    def __init__(self, name, description, exits=None, items=None, trap=False, chest_locked=False, guard_present=False, puzzle=None, npc=None, rules=None):
+        self.name = name
+        self.description = description
+        self.exits = exits if exits is not None else {}
+        self.items = ItemBag(items if items is not None else ())
+        self.trap = trap
+        self.chest_locked = chest_locked
+        self.guard_present = guard_present
+        self.puzzle = puzzle
+        self.npc = npc
+        self.rules = rules if rules is not None else {}
+
+    def add_item(self, item):
+        """Place an item in the room.
+        Args:
+        item (Item): The item to add.
+        """
+        self.items.add(item)
+
+    def remove_item(self, item):
+        """Remove an item from the room.
+        Args:
+        item (Item): The item to remove.
+        """
+        self.items.remove(item.name)
+
+    def reveal_exit(self, direction, room_name):
+        """Open a new exit from the room.
+        Args:
+        direction (str): The direction of the exit (e.g., 'east').
+        room_name (str): The name of the room the exit leads to.
+        """
+        self.exits[direction] = room_name
+
     @staticmethod
     def load(data):
         """Load a room from a dictionary of saved data.
@@ -89,15 +137,10 @@ class Room:
         Returns:
         Room: A new Room object with the loaded state.
         """
-
-        item_classes = {"Item": Item, "Tool": Tool, "Treasure": Treasure, "Map": Map, "Weapon": Weapon}
-        items = []
-        for item_data in data["items"]:
-            item_type = item_data["type"]
-            item_name = item_data["name"]
-            item_description = item_data.get("description", "A generic item.")
-            item_class = item_classes.get(item_type, Item)
-            items.append(item_class(item_name, item_description))
+        items = [Item.load(item_data) for item_data in data["items"]]
+        # JSON turns the puzzle and NPC tuples into lists; restore them so they match the world.
+        puzzle = data.get("puzzle")
+        npc = data.get("npc")
         return Room(
             name=data["name"],
             description=data["description"],
@@ -106,27 +149,41 @@ class Room:
             trap=data["trap"],
             chest_locked=data["chest_locked"],
             guard_present=data.get("guard_present", False),
-            puzzle=data.get("puzzle", None),
-            npc=data.get("npc",None)
+            puzzle=tuple(puzzle) if puzzle is not None else None,
+            npc=tuple(npc) if npc is not None else None
         )
 
 class Player:
     """ A class representing the player in the text adventure game.
     Attributes:
     current_room (Room): The player's current room.
-    inventory (list): A list of items the player is carrying.
+    inventory (ItemBag): The items the player is carrying, keyed by name. Taking and dropping
+    replace the bag instead of changing it, so undo history can share it.
     score (int): The player's current score.
     Added to track solved riddles
-    solved_riddles (list): A list of room names where riddles have been solved.
-    max_inventory (int): Maximum number of items the player can carry (added for inventory limit).
+    solved_riddles (list): A list of room names where riddles have been solved (replaced, not
+    appended to, when a riddle is solved).
+    max_inventory (int): Maximum number of items the player can carry (the inventory's capacity).
+    events (list): (kind, key) events caused by the player's actions, run against the world's
+    rules after each command.
     """
+    __slots__ = ("current_room", "inventory", "score", "solved_riddles", "messages", "events")
 
-    def __init__(self, current_room):
+    def __init__(self, current_room, max_inventory=3):
         self.current_room = current_room
-        self.inventory = []
+        self.inventory = ItemBag(capacity=max_inventory)
         self.score = 0
         self.solved_riddles = []
-        self.max_inventory = 3
+        self.messages = []
+        self.events = []
+
+    @property
+    def max_inventory(self):
+        return self.inventory.capacity
+
+    @max_inventory.setter
+    def max_inventory(self, value):
+        self.inventory.capacity = value
     
     def move(self, direction):
         """Move the player in a specified direction if possible.
@@ -137,14 +194,25 @@ class Player:
         Returns:
         str or None: The name of the next room if the move is possible, None otherwise.
         """
-        if direction in self.current_room.exits:
-            if self.current_room.puzzle and direction == "north" and self.current_room.name == "Garden" and "Garden" not in self.solved_riddles:
-                return "The path to the  north is blocked by a riddle. Use 'solve <answer> to proceed."
-            if self.current_room.name == "Kitchen" and direction == "north" and not any(item.name == "key" for item in self.inventory):
-                return "North exit locked, need key."
+        room = self.current_room
+        if direction in room.exits:
+            puzzle = room.rules.get("puzzle")
+            if room.puzzle and puzzle and direction == puzzle.get("blocks") and room.name not in self.solved_riddles:
+                return puzzle.get("blocked_message", f"The path to the {direction} is blocked by a riddle. Use 'solve <answer>' to proceed.")
+            lock = room.rules.get("locks", {}).get(direction)
+            if lock and lock["item"] not in self.inventory:
+                return lock.get("message", f"The {direction} exit is locked, you need the {lock['item']}.")
             return self.current_room.exits[direction]
         return None
 
+    def enter(self, room):
+        """Put the player in a room.
+        Args:
+        room (RoomState): The room.
+        """
+        self.current_room = room
+        self.events.append((ENTER_ROOM, room.name))
+
     def take(self, item):
         """Take an item from the current room and add it to the player's inventory.
         Args:
@@ -152,19 +220,22 @@ class Player:
         Returns:
         bool: True if the item was taken, False if not found, or a string if inventory is full.
         """
-        if len(self.inventory) >= self.max_inventory:
+        if self.inventory.is_full():
             return "Your inventory is full! Drop an item to take another."
-        for room_item in self.current_room.items:
-            if room_item.name == item:
-                self.current_room.items.remove(room_item)
-                self.inventory.append(room_item)
-                if isinstance(room_item, Treasure):
-                    self.add_score(20)
-                else:
-                    self.add_score(10)
-                print(f"You picked up the {room_item.name}: {room_item.description}.")
-                return True
-        return False
+        room_item = self.current_room.items.get(item)
+        if room_item is None:
+            return False
+        self.current_room.remove_item(room_item)
+        # Replace the bag rather than change it: History entries may share the old one.
+        self.inventory = self.inventory.copy()
+        self.inventory.add(room_item)
+        self.events.append((GAIN_ITEM, room_item.name))
+        if isinstance(room_item, Treasure):
+            self.add_score(20)
+        else:
+            self.add_score(10)
+        self.messages.append(f"You picked up the {room_item.name}: {room_item.description}.")
+        return True
 
     def drop(self, item_name):
         """Drop an item from the inventory and place it in the current room.
@@ -173,11 +244,12 @@ class Player:
         Returns:
         bool or str: True if the item was dropped, False if not inventory.
         """
-        for item in self.inventory:
-            if item.name == item_name:
-                self.inventory.remove(item)
-                return True
-        return False
+        if item_name not in self.inventory:
+            return False
+        self.inventory = self.inventory.copy()
+        self.inventory.remove(item_name)
+        self.events.append((LOSE_ITEM, item_name))
+        return True
 
     def get_inventory(self):
         """Get a list of item names in the player's inventory.
@@ -185,7 +257,7 @@ class Player:
         list or str: A list of item names if the inventory is not empty, a message if it is.
         """ 
         if self.inventory:
-            return[item.name for item in self.inventory]
+            return self.inventory.names()
         return "Your inventory is empty."
 
     def save(self):
@@ -195,9 +267,9 @@ class Player:
         """
         return {
             "current_room": self.current_room.name,
-            "inventory": [{"type": item.__class__.__name__, "name": item.name, "description": item.description} for item in self.inventory],
+            "inventory": self.inventory.save(),
             "score": self.score,
-            "solved_riddles": self.solved_riddles
+            "solved_riddles": list(self.solved_riddles)
         }
     
     @staticmethod
@@ -211,14 +283,7 @@ class Player:
         Player: A new player object with the loaded state.
         """
         player = Player(rooms[data["current_room"]])
-        item_classes = {"Item": Item, "Tool": Tool, "Treasure": Treasure, "Map": Map, "Weapon": Weapon}
-        player.inventory = []
-        for item_data in data["inventory"]:
-            item_type = item_data["type"]
-            item_name = item_data["name"]
-            item_description = item_data.get("description", "A generic item.")
-            item_class = item_classes.get(item_type, Item)
-            player.inventory.append(item_class(item_name, item_description))
+        player.inventory = ItemBag((Item.load(item_data) for item_data in data["inventory"]), capacity=player.max_inventory)
         player.score = data["score"]
         player.solved_riddles = data.get("solved_riddles", [])
         return player
@@ -232,75 +297,62 @@ class Player:
         str: A hint message to guide the player.
         """
         room = self.current_room
-        inv_names = [item.name for item in self.inventory]
-        if room.name == "Hall" and "map" not in inv_names:
-            return "There's a map here-maybe it reveals something usefull."
-        elif room.name =="Kitchen" and "shield" not in inv_names:
-            return "A shield in this room can protect you from danger elsewhere."
-        elif room.name == "Living Room" and map in inv_names and "east" not in room.exits:
-            return "Try using the map to uncover hidden path."
-        elif room.name == "Garden" and  "shield" not in inv_names:
-            return "This place looks dangerous. A shield might help you aviod the trap."
-        elif room.name == "Treasure Room" and room.guard_present:
-            return "The guard is blocking the chest! You might need a weapon to fight or a tool to distract them."
-        elif room.name == "Treasure Room" and room.chest_locked:
-            return "The chest is locked you will need a lockpick and crowbar to open it."
-        elif room.name == "Treasure Room" and not room.chest_locked and "golden crown" not in inv_names:
-            return "The chest is open! Make sure to take the golden crown."
-        elif room.name == "Secret Room" and ("gem" not in inv_names or "lockpick" not in inv_names):
-            return "Look around-there might be something valuable or useful here."
-        elif "golden crown" in inv_names:
-            return "You have got the golden crown! You've won-congratulations!"
-        else:
-            return "Explore your surroundings or check your inventory for clues."
+        flags = {
+            "guard_present": room.guard_present,
+            "chest_locked": room.chest_locked,
+            "chest_open": "chest" in room.rules and not room.chest_locked,
+        }
+        for hint in room.rules.get("hints", ()):
+            if "flag" in hint and not flags[hint["flag"]]:
+                continue
+            if "missing" in hint and all(name in self.inventory for name in hint["missing"]):
+                continue
+            if not all(name in self.inventory for name in hint.get("has", ())):
+                continue
+            if "hidden" in hint and hint["hidden"] in room.exits:
+                continue
+            return hint["text"]
+        hints = rooms.template.hints
+        if rooms.template.win_item in self.inventory:
+            return hints.get("won", "You've won-congratulations!")
+        return hints.get("default", "Explore your surroundings or check your inventory for clues.")
     
     def add_score(self, points):
-        """Add points to the player's score and display the updated total.
+        """Add points to the player's score and queue a message with the updated total.
         Args:
         points (int): The number of points to add.
         """
         self.score += points
-        print(f"You earned {points} points! Total score: {self.score}")
+        self.messages.append(f"You earned {points} points! Total score: {self.score}")
 
-    def load_leaderboard(self):
-        """Load the leaderboard from leaderboard.json.
+    def drain_messages(self):
+        """Return and clear the messages queued by player actions (score updates, pickups).
         Returns:
-        list: A list of dictionaries containing names and scores.
+        list: The queued messages, oldest first.
         """
-        if os.path.exists("leaderboard.json"):
-            with open("leaderboard.json", "r") as f:
-                return json.load(f)
-        return[]
+        messages = self.messages
+        self.messages = []
+        return messages
 
-    def save_leaderboard(self, leaderboard):
-        """Save the leaderboard to leaderboard.json.
-        Args:
-        leaderboard (list): A list of dictionaries containing names and scores.
-        """
-        with open("leaderboard.json", "w") as f:
-            json.dump(leaderboard, f)
-    def update_leaderboard(self, player_name):
-        """Add the player's score to the leaderboard and keep the top 5 scores.
+    def update_leaderboard(self, player_name, leaderboard=None, game_id=None):
+        """Add the player's score to the leaderboard.
         Args:
         player_name (str): The name of the player.
+        leaderboard (Leaderboard): The leaderboard to update, or None for leaderboard.db.
+        game_id (str): The game's ID, so the same game is never recorded twice, or None.
         """
-        leaderboard = self.load_leaderboard()
-        leaderboard.append({"name": player_name, "score": self.score})
-        leaderboard = sorted(leaderboard, key=lambda x: x["score"], reverse=True)[:5]
-        self.save_leaderboard(leaderboard)
+        (leaderboard or get_leaderboard()).add(player_name, self.score, game_id)
 
-    def display_leaderboard(self):
+    def display_leaderboard(self, leaderboard=None, player_name=None):
         """Display the current leaderboard.
+        Args:
+        leaderboard (Leaderboard): The leaderboard to show, or None for leaderboard.db.
+        player_name (str): A player whose rank is shown under the top scores, or None.
+
         Return:
         str: A formatted string of the leaderboard.
         """
-        leaderboard = self.load_leaderboard()
-        if not leaderboard:
-            return "Leaderboard is empty."
-        result = "Leaderboard:\n"
-        for i, entry in enumerate(leaderboard, 1):
-            result += f"{i}.{entry['name']}: {entry['score']} points\n"
-        return result
+        return (leaderboard or get_leaderboard()).display(player_name)
     
     def solve_riddle(self, answer):
         """Attempt to solve the riddle in the current room.
@@ -309,11 +361,16 @@ class Player:
         Return:
         str: A message indicating the result of  the attempt.
         """
-        if self.current_room.puzzle and self.current_room.name == "Garden":
-            if answer.lower() == self.current_room.puzzle[1].lower():
-                self.solved_riddles.append(self.current_room.name)
-                self.add_score(20)
-                return "Correct! The path to the north is now open."
+        room = self.current_room
+        if room.puzzle:
+            if room.name in self.solved_riddles:
+                return "You've already solved the riddle here."
+            if answer.lower() == room.puzzle[1].lower():
+                puzzle = room.rules.get("puzzle", {})
+                self.solved_riddles = self.solved_riddles + [room.name]
+                self.events.append((FLAG_CHANGE, (room.name, "solved")))
+                self.add_score(puzzle.get("points", 20))
+                return puzzle.get("solved_message", "Correct! The way forward is now open.")
             else:
                 return f"'{answer}' is incorrect. Try again with 'solve <answer>'."
         return "There is no riddle to solve here."
@@ -323,21 +380,77 @@ class Player:
         Return:
         str: A message from the NPC or an error message.
         """
-        if self.current_room.npc:
-            if self.current_room.name == "Library":
-                return f"{self.current_room.npc[0]} says: '{self.current_room.npc[1]} Solve my riddle, and I'll give you a key to unlock a secret door! ' Use 'solve <answer>' to respond.."
-            return f"{self.current_room.npc[0]} says: '{self.current_room.npc[1]}' Use 'solve <answer>' to respond."
+        npc = self.current_room.npc
+        if npc:
+            talk = self.current_room.rules.get("npc", {}).get("talk", "{name} says: '{riddle}' Use 'solve <answer>' to respond.")
+            return talk.format(name=npc[0], riddle=npc[1])
         return "There is no one to talk to here."
 
 class Item:
     """A base class for items in the text adventure game.
+
+    Items are immutable definitions. Use Item.intern() (or a subclass's intern()) to get
+    the single shared instance of a definition, so rooms and inventories of every session
+    reference the same objects instead of holding copies.
+
     Attributes:
     name(str):The name of the item.
     description(str): A description of the item.
+    item_id(int): The process-wide ID of an interned item, or None for a temporary item.
     """
+    __slots__ = ("name", "description", "item_id")
+    _interned = {}
+    by_id = []
+    # Held while a new definition is added, since sessions load worlds and saves in worker threads.
+    _intern_lock = threading.Lock()
+
     def __init__(self, name, description="A generic item."):
         self.name = name
         self.description = description
+        self.item_id = None
+
+    @classmethod
+    def intern(cls, name, *args):
+        """Get the shared instance of an item definition, creating it once per process.
+        Args:
+        name (str): The name of the item.
+        *args: The description, if it differs from the class default.
+
+        Returns:
+        Item: The interned item; its item_id indexes Item.by_id.
+        """
+        # The key is the definition itself, so looking up an interned item builds nothing; the
+        # description defaults to the one in the class's __init__.
+        key = (cls, name, args[0] if args else cls.__init__.__defaults__[0])
+        interned = Item._interned.get(key)
+        if interned is None:
+            with Item._intern_lock:
+                interned = Item._interned.get(key)
+                if interned is None:
+                    item = cls(name, *args)
+                    item.item_id = len(Item.by_id)
+                    Item.by_id.append(item)
+                    Item._interned[key] = interned = item
+        return interned
+
+    def save(self):
+        """Save the item to a dictionary for serialization.
+        Returns:
+        dict: A dictionary with the item's type, name and description.
+        """
+        return {"type": self.__class__.__name__, "name": self.name, "description": self.description}
+
+    @staticmethod
+    def load(data):
+        """Get the interned item for a saved item dictionary.
+        Args:
+        data (dict): A dictionary with the item's 'type', 'name' and 'description'.
+
+        Returns:
+        Item: The interned item.
+        """
+        item_class = ITEM_CLASSES.get(data["type"], Item)
+        return item_class.intern(data["name"], data.get("description", "A generic item."))
 
     def use(self, player, rooms):
         """Use the item (default behaviour for generic item).
@@ -350,10 +463,29 @@ class Item:
         """
         return f"You can't use the {self.name} right now."
 
+    def remove_guard(self, player):
+        """Get rid of the guard in the player's room if the world lets this item do it.
+        Args:
+        player(Player): The player using the item.
+
+        Returns:
+        str or None: The result message, or None if the item has no effect on a guard here.
+        """
+        room = player.current_room
+        removal = room.rules.get("guard", {}).get("removed_by", {}).get(self.name)
+        if removal is None or not room.guard_present:
+            return None
+        room.guard_present = False
+        player.events.append((FLAG_CHANGE, (room.name, "guard_present")))
+        player.add_score(removal.get("points", 0))
+        return removal.get("message", f"You use the {self.name} and the guard leaves!")
+
 class Tool(Item):
     """A class for tools, which have specific use (e.g., lockpick, crowbar, bell).
     Inherits from Item.
     """
+    __slots__ = ()
+
     def __init__(self, name, description="A sturdy tool for specific tasks."):
         super().__init__(name, description)
 
@@ -366,31 +498,36 @@ class Tool(Item):
         Returns:
         str: A message indicating the result of using the tool.
         """
-        if player.current_room.name == "Treasure Room":
-            has_lockpick = any(isinstance(item, Tool) and item.name == "lockpick" for item in player.inventory)
-            has_crowbar = any(isinstance(item, Tool) and item.name == "crowbar" for item in player.inventory)
-            if self.name == "bell" and player.current_room.guard_present:
-                player.current_room.guard_present = False
-                player.add_score(20)
-                return "You rang the bell creating a loud noise. The guard is distracted and leaves the room!"
-            if has_lockpick and has_crowbar and not player.current_room.guard_present:
-                player.current_room.chest_locked = False
-                player.current_room.items.append(Treasure("golden crown", "A shimmering crown encrusted with jewels."))
-                player.add_score(50)
-                return "You use the lockpick and the crowbar to pry open the chest! Inside, you find a golden crown."
-                if has_lockpick and has_crowbar and player.current_room.guard_present:
-                    return "The guard is blocking the chest! You need to deal with the guard first."
-                if not has_lockpick and not has_crowbar:
-                    return"You need both a lockpick and a crowbar to open the chest. You're missing both."
-                if not has_lockpick:
-                    return "You need a lockpick to open the chest."
-                    return "You need a crowbar to open the chest."
-                    return f"You can't use the {self.name} right now."
+        room = player.current_room
+        chest = room.rules.get("chest")
+        if chest is None:
+            return super().use(player, rooms)
+        message = self.remove_guard(player)
+        if message is not None:
+            return message
+        if not room.chest_locked:
+            return chest.get("open_message", "The chest is already open.")
+        requires = chest.get("requires", ())
+        missing = [name for name in requires if not isinstance(player.inventory.get(name), Tool)]
+        if missing:
+            if len(missing) == 2 and len(requires) == 2:
+                return f"You need both a {missing[0]} and a {missing[1]} to open the chest. You're missing both."
+            return f"You need {' and '.join('a ' + name for name in missing)} to open the chest."
+        if room.guard_present:
+            return chest.get("guard_message", "The guard is blocking the chest! You need to deal with the guard first.")
+        room.chest_locked = False
+        player.events.append((FLAG_CHANGE, (room.name, "chest_locked")))
+        for item_data in chest.get("contents", ()):
+            room.add_item(Item.load(item_data))
+        player.add_score(chest.get("points", 0))
+        return chest.get("message", "You open the chest!")
 
 class Treasure(Item):
     """A class for treasure items, which award points when taken.
     inherits from item.
     """
+    __slots__ = ()
+
     def __init__(self, name, description="A valuable treasure that gleams with worth."):
         super().__init__(name, description)
 
@@ -409,11 +546,13 @@ class Map(Item):
     """A class for the map item, which reveals hidden passages.
     Inherits from Item.
     """
+    __slots__ = ()
+
     def __init__(self, name, description="An old map that might reveal hidden paths."):
         super().__init__(name, description)
 
     def use(self, player, rooms):
-        """Use the map to reveal a hidden paasage in the Living Room.
+        """Use the map to reveal the hidden passages the world ties to it.
         Args.
         player(Player): The player using the map.
         room (dict): A dictionary of all the rooms in the game.
@@ -421,21 +560,28 @@ class Map(Item):
         Rteurns:
         str:A message indicating the result of using the map.
         """
-        if "east" not in rooms["Living Room"].exits:
-            rooms["Living Room"].exits["east"] = "Secret Room"
-            player.add_score(20)
-            return "You use the map and discover a hidden passage! An east exit appears in the Living Room"
-        return "You've already used the map to reveal the hidden passage."
+        reveals = rooms.template.reveals.get(self.name, ())
+        for room_name, direction, hidden in reveals:
+            room = rooms[room_name]
+            if direction not in room.exits:
+                room.reveal_exit(direction, hidden["to"])
+                player.add_score(hidden.get("points", 0))
+                return hidden.get("message", f"You use the {self.name} and discover a hidden passage!")
+        if reveals:
+            return reveals[-1][2].get("already_message", f"You've already used the {self.name}.")
+        return super().use(player, rooms)
 
 class Weapon(Item):
     """A class for weapons, which can be used to fight enemies(e.g., the guard).
     Inherits from Item.
     """
+    __slots__ = ()
+
     def __init__(self, name, description="A sharp weapon for combat."):
         super().__init__(name, description)
    
     def use(self, player, rooms):
-        """Use the weapon to fight the guard in the treasure Room.
+        """Use the weapon to fight a guard the world says it can defeat.
            Args.
         player(Player): The player using the weapon.
         room (dict): A dictionary of all the rooms in the game.
@@ -443,348 +589,2124 @@ class Weapon(Item):
         Rteurns:
         str:A message indicating the result of using the weapon.
         """
-        if player.current_room.name == "Treasure Room" and player.current_room.guard_present:
-            player.current_room.guard_present = False
-            player.add_score(30)
-            return "You use the sword to defeat the guard! The path to the chest is now clear."
+        message = self.remove_guard(player)
+        if message is not None:
+            return message
         return f"You can't use the {self.name} right now."
 
 class Key(Item):
     """A class for keys, which unlock specific rooms.
     Inherits from Item.
     """
+    __slots__ = ()
+
     def __init__(self, name, description=" A key that unlocks a specific room."):
         super().__init__(name, description)
 
     def use(self, player, rooms):
-        """Use the key to unlock the Treasure Room from the Kitchen.
+        """Keys work by being carried; using one explains which exit it unlocks.
         Args:
-        player(Player): The player using the weapon.
+        player(Player): The player using the key.
         rooms (dict): A dictionary of all the rooms in the game.
         Returns:
-        str: A message indicating the result of using the weapon.
-        """       
-        return f"You can't use the {self.name} right now. The key is needed to unlock the north exit in the kitchen." 
+        str: A message indicating the result of using the key.
+        """
+        locks = rooms.template.locks.get(self.name)
+        if not locks:
+            return super().use(player, rooms)
+        room_name, direction = locks[0]
+        return f"You can't use the {self.name} right now. The {self.name} is needed to unlock the {direction} exit in the {room_name.lower()}."
             
                     
-def create_room():
-    """Created a dictionary of rooms for the game, ensuring a fresh state for each session.
-    Returns:
-    dict: A dictionary mapping room names to Room objects.
-    """  
-    return {
-        "Hall": Room(
-            name="Hall",
-            description="You are in a dusty hall.",
-            exits={"north": "Kitchen", "east": "Living Room"},
-            items=[Map("map", "An old parchment map with faded marking.")]
-        ),
-
-        "Kitchen": Room(
-            name="Kitchen",
-            description="You are in a small kithchen. There is a table here.",
-            exits={"south": "Hall", "west": "Garden", "north": "Treasure Room"},
-            items=[Item("shield", "A sturdy wooden shield for protection.")]
-        ),
-
-        "Living Room": Room(
-            name="Living Room",
-            description="You are in a cozy living room with a sofa.",
-            exits={"west": "Hall"},
-            items=[Tool("bell", "A small bell that makes a loud noise.")]
-        ),
-
-        "Garden": Room(
-            name="Garden",
-            description="You are in a sunny garden.",
-            exits={"east": "Kitchen", "north": "Library"},
-            items=[Tool("crowbar", "A heavy iron crowbar, perfect for prying things open.")],
-            trap=True,
-            puzzle=("I speak without a mouth and hear without ears. What am I?", "echo")
-        ),
-
-        "Treasure Room": Room(
-            name="Treasure Room",
-            description="You are in a dimly lit treasure room. A large chest sits in the corner.\n"
-            "  ----\n"
-            "  /    \\\n"
-            " /------\\\n"
-            " | ***  | \n"
-            " |------|",
-            exits={"south": "Kitchen"},
-            chest_locked=True,
-            guard_present=True
-        ),
-
-        "Secret Room": Room(
-            name="Secret Room",
-            description="You are in a hidden secrect room. The air is musty, but you see some valuable items.",
-            exits={"west": "Living Room"},
-            items=[
-                Treasure("gem", "A sparkling ruby that glows faintly."), 
-                Tool("lockpick", "A small metal tool for picking locks."), 
-                Weapon("sword", "A sharp steel sword for combat."),
-            ],
-        ),
-
-        "Library": Room(
-            name="Library",
-            description="You are in a quiet library filled with ancient books.",
-            exits={"south": "Garden"},
-            items=[],
-            npc=("Teacher", "I'm tall when i'm young, and i'm short when i'm old. What am I?", "candle")
-        ),
-    }
-def save_game(player, rooms, filename="savegame.json"):
-    """ Save the current game state (player and rooms) to a JSON file.
+class ItemBag:
+    """An ordered collection of items keyed by name, used for inventories and room contents.
+
+    Lookups, membership tests and removals by name are O(1); iteration follows insertion
+    order so listings and saves look the same as before.
+
+    Attributes:
+    capacity (int): The maximum number of items the bag holds, or None for no limit.
+    """
+    __slots__ = ("_items", "capacity")
+
+    def __init__(self, items=(), capacity=None):
+        self._items = {item.name: item for item in items}
+        self.capacity = capacity
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, name):
+        return name in self._items
+
+    def __repr__(self):
+        return f"ItemBag({self.names()!r})"
+
+    def get(self, name, default=None):
+        """Get the item with the given name, or default if the bag doesn't hold it."""
+        return self._items.get(name, default)
+
+    def is_full(self):
+        """Check whether the bag has reached its capacity."""
+        return self.capacity is not None and len(self._items) >= self.capacity
+
+    def add(self, item):
+        """Add an item to the end of the bag (capacity is checked by the caller)."""
+        self._items[item.name] = item
+
+    def remove(self, name):
+        """Remove and return the item with the given name, or None if the bag doesn't hold it."""
+        return self._items.pop(name, None)
+
+    def names(self):
+        """Get the names of the items in the bag, in order."""
+        return list(self._items)
+
+    def copy(self):
+        """Get a new bag with the same items and capacity."""
+        bag = ItemBag(capacity=self.capacity)
+        bag._items = self._items.copy()
+        return bag
+
+    def save(self):
+        """Save the bag to a list of item dictionaries for serialization."""
+        return [item.save() for item in self._items.values()]
+
+
+ITEM_CLASSES = {"Item": Item, "Tool": Tool, "Treasure": Treasure, "Map": Map, "Weapon": Weapon, "Key": Key}
+
+# Events queued on Player.events as (kind, key). The key is the room name for ENTER_ROOM,
+# the item name for GAIN_ITEM and LOSE_ITEM, and (room name, flag) for FLAG_CHANGE, where
+# flag is 'guard_present', 'chest_locked', 'npc' or 'solved' (the room's riddle).
+ENTER_ROOM = "enter-room"
+GAIN_ITEM = "gain-item"
+LOSE_ITEM = "lose-item"
+FLAG_CHANGE = "flag-change"
+EVENT_KINDS = (ENTER_ROOM, GAIN_ITEM, LOSE_ITEM, FLAG_CHANGE)
+FLAGS = ("guard_present", "chest_locked", "npc", "solved")
+
+
+class Rule:
+    """A condition that is only checked when an event that can make it true happens.
+
+    Attributes:
+    name (str): What the rule is for (e.g., 'trap:Garden').
+    when (callable): when(session, key) -> bool, or None to always run `then`.
+    then (callable): then(session, key), the rule's effect.
+    """
+    __slots__ = ("name", "when", "then")
+
+    def __init__(self, name, then, when=None):
+        self.name = name
+        self.then = then
+        self.when = when
+
+
+class RuleBook:
+    """A world's rules, indexed by the event that can fire them.
+
+    Firing an event looks up only the rules registered for that exact event and key, so
+    the cost of a command does not grow with the number of rules in the world.
+
+    Attributes:
+    index (dict): (event kind, key) -> list of Rules, in the order they were added.
+    """
+    __slots__ = ("index",)
+
+    def __init__(self):
+        self.index = {}
+
+    def __len__(self):
+        return sum(len(rules) for rules in self.index.values())
+
+    def add(self, kind, key, rule):
+        """Register a rule.
+        Args:
+        kind (str): The event kind (ENTER_ROOM, GAIN_ITEM, LOSE_ITEM or FLAG_CHANGE).
+        key: The room name, item name or (room name, flag) the rule listens to.
+        rule (Rule): The rule.
+        """
+        if kind not in EVENT_KINDS:
+            raise ValueError(f"Unknown event {kind!r}.")
+        self.index.setdefault((kind, key), []).append(rule)
+
+    def fire(self, session, kind, key):
+        """Run the rules registered for one event, stopping once the game is over."""
+        for rule in self.index.get((kind, key), ()):
+            if session.finished:
+                return
+            if rule.when is None or rule.when(session, key):
+                rule.then(session, key)
+
+
+def _trap_rules(book, room_name, trap):
+    """Register the rules of a trap room: entering it, or losing its protection inside it, loses the game."""
+    protection = trap.get("protection")
+    book.add(ENTER_ROOM, room_name, Rule(f"trap:{room_name}", lambda session, key: session._lose(),
+                                         lambda session, key: protection not in session.player.inventory))
+    if protection is not None:
+        book.add(LOSE_ITEM, protection, Rule(f"trap:{room_name}", lambda session, key: session._lose(),
+                                             lambda session, key: session.player.current_room.name == room_name))
+
+
+def _trigger_rule(name, trigger):
+    """Build the Rule for a world file trigger.
     Args:
-    player (Player): The player object to save.
-    rooms (dict): The dictionary of room object to save.
-    filename (str): The name of the file to save to (default: 'savegame.json').
+    name (str): The world's name, for error messages.
+    trigger (dict): {'on', 'room'/'item'/'flag', optional 'has' and 'lacks' item lists and
+    'in_room', and effects 'message', 'win' (bool) and 'lose' (message)}.
+
     Returns:
-    str: A message indicating success or failure.
+    tuple: (event kind, key, Rule).
     """
-    
-    game_state = {
-        "player": player.save(),
-        "rooms": {name: room.save() for name, room in rooms.items()}
-    }
-    try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(game_state, f)
-        return "Game saved successfully!"
-    except PermissionError as e:
-        return f"Error saving game: Permission denied. Check if you have write access to {filename} ({str(e)})."
-    except IOError as e:
-        return f"Error saving game: File error. The disk might be full or the file might be in use ({str(e)})."
-    except json.JSONEncodeError as e:
-        return f"Error saving game: Failed to serialize game state to JSON ({str(e)})."
-    except Exception as e:
-        return f"Error saving game: An unexpected error occurred ({str(e)})."
+    kind = trigger.get("on")
+    if kind == ENTER_ROOM:
+        key = trigger["room"]
+    elif kind in (GAIN_ITEM, LOSE_ITEM):
+        key = trigger["item"]
+    elif kind == FLAG_CHANGE:
+        if trigger.get("flag") not in FLAGS:
+            raise ValueError(f"World {name!r}: trigger flag must be one of {', '.join(FLAGS)}, not {trigger.get('flag')!r}.")
+        key = (trigger["room"], trigger["flag"])
+    else:
+        raise ValueError(f"World {name!r}: trigger event must be one of {', '.join(EVENT_KINDS)}, not {kind!r}.")
+    has = tuple(trigger.get("has", ()))
+    lacks = tuple(trigger.get("lacks", ()))
+    in_room = trigger.get("in_room")
+    message = trigger.get("message")
+    lose = trigger.get("lose")
+    win = trigger.get("win", False)
 
+    def when(session, key):
+        player = session.player
+        return ((in_room is None or player.current_room.name == in_room)
+                and all(item in player.inventory for item in has)
+                and not any(item in player.inventory for item in lacks))
+
+    def then(session, key):
+        if message:
+            session._say("\n" + message)
+        if win:
+            session._win()
+        elif lose:
+            session._lose(lose)
+
+    return kind, key, Rule(f"trigger:{kind}:{key}", then, when if has or lacks or in_room else None)
+
+
+WORLD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worlds")
+DEFAULT_WORLD_FILE = os.path.join(WORLD_DIR, "default.json")
+WORLD_FORMAT = 1
+# Bump when the compiled cache layout changes so stale caches are rebuilt.
+WORLD_CACHE_VERSION = 1
+
+
+class WorldTemplate:
+    """A compiled world definition shared by every session playing it.
+
+    Holds the room definitions from a world file plus lookup indexes built once at load
+    time. Template Room objects are built lazily on first access, so loading a huge world
+    costs little more than parsing it.
+
+    Attributes:
+    name (str): The world's name.
+    path (str): The world file it was loaded from, or None.
+    start (str): The name of the room new players start in.
+    win_item (str): Taking this item wins the game.
+    hints (dict): World-wide hint texts ('won' and 'default').
+    specs (dict): Room name -> room definition, in file order.
+    reveals (dict): Item name -> list of (room name, direction, hidden exit) the item reveals.
+    locks (dict): Item name -> list of (room name, direction) of the exits the item unlocks.
+    descriptions (dict): (room name, protected, solved) -> description of rooms in their
+    starting state, shared by every session.
+    rules (RuleBook): The win and trap conditions plus the world file's 'triggers', indexed
+    by event. Triggers run before the built-in rules for the same event.
+    """
+    __slots__ = ("name", "path", "start", "win_item", "hints", "specs", "reveals", "locks", "descriptions", "rules", "_rooms")
+
+    def __init__(self, data):
+        if data.get("format", WORLD_FORMAT) != WORLD_FORMAT:
+            raise ValueError(f"Unsupported world format {data.get('format')!r}.")
+        self.name = data.get("name", "world")
+        self.path = None
+        self.specs = data["rooms"]
+        self.start = data.get("start") or next(iter(self.specs))
+        self.win_item = data.get("win_item", "golden crown")
+        self.hints = data.get("hints", {})
+        self.reveals = {}
+        self.locks = {}
+        self.descriptions = {}
+        self._rooms = {}
+        self.rules = RuleBook()
+        if self.start not in self.specs:
+            raise ValueError(f"World {self.name!r}: start room {self.start!r} does not exist.")
+        for trigger in data.get("triggers", ()):
+            kind, key, rule = _trigger_rule(self.name, trigger)
+            if "room" in trigger and trigger["room"] not in self.specs:
+                raise ValueError(f"World {self.name!r}: trigger {kind} names unknown room {trigger['room']!r}.")
+            self.rules.add(kind, key, rule)
+        for room_name, spec in self.specs.items():
+            for direction, target in spec.get("exits", {}).items():
+                if target not in self.specs:
+                    raise ValueError(f"World {self.name!r}: exit {direction} of {room_name!r} leads to unknown room {target!r}.")
+            locks = spec.get("locks")
+            if locks:
+                for direction, lock in locks.items():
+                    self.locks.setdefault(lock["item"], []).append((room_name, direction))
+            hidden_exits = spec.get("hidden_exits")
+            if hidden_exits:
+                for direction, hidden in hidden_exits.items():
+                    if hidden["to"] not in self.specs:
+                        raise ValueError(f"World {self.name!r}: hidden exit {direction} of {room_name!r} leads to unknown room {hidden['to']!r}.")
+                    self.reveals.setdefault(hidden["revealed_by"], []).append((room_name, direction, hidden))
+            trap = spec.get("trap")
+            if trap is not None:
+                _trap_rules(self.rules, room_name, trap)
+        self.rules.add(GAIN_ITEM, self.win_item, Rule("win", lambda session, key: session._win()))
+
+    def __getitem__(self, name):
+        room = self._rooms.get(name)
+        if room is None:
+            room = self._rooms[name] = self.build_room(name)
+        return room
+
+    def __contains__(self, name):
+        return name in self.specs
+
+    def __iter__(self):
+        return iter(self.specs)
+
+    def __len__(self):
+        return len(self.specs)
+
+    def keys(self):
+        return self.specs.keys()
+
+    def build_room(self, name):
+        """Build a new Room from its definition.
+        Args:
+        name (str): The name of the room.
+
+        Returns:
+        Room: A new Room object in its starting state.
+        """
+        spec = self.specs[name]
+        puzzle = spec.get("puzzle")
+        npc = spec.get("npc")
+        return Room(
+            name=name,
+            description=spec.get("description", ""),
+            exits=dict(spec.get("exits", {})),
+            items=[Item.load(item_data) for item_data in spec.get("items", ())],
+            trap="trap" in spec,
+            chest_locked=spec.get("chest", {}).get("locked", False),
+            guard_present=spec.get("guard", {}).get("present", False),
+            puzzle=(puzzle["riddle"], puzzle["answer"]) if puzzle else None,
+            npc=(npc["name"], npc["riddle"], npc["answer"]) if npc else None,
+            rules=spec,
+        )
+
+
+def load_world(filename, use_cache=True):
+    """Load and compile a world file.
+
+    With use_cache, a marshal-encoded copy of the parsed file is kept next to it
+    ('<name>.cache') and used while the JSON file is unchanged, which makes reloading
+    large worlds several times faster.
 
-def load_game(filename="savegame.json"):
-    """Load a saved game state from a JSON file.
     Args:
-    filename (str): The name of the file to load from (default: 'savegame.json').
-    
+    filename (str): The path of the world's JSON file.
+    use_cache (bool): Whether to read and write the precompiled cache.
+
     Returns:
-    tuple: (Player, rooms, message) where player and rooms are the loaded game state,
-            or(None, None, error_message) if loading fails.
+    WorldTemplate: The compiled world.
     """
+    stat = os.stat(filename)
+    stamp = (WORLD_CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+    cache_file = os.path.splitext(filename)[0] + ".cache"
+    # Parsing allocates one container per room; the cyclic GC only slows that down.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
     try:
-        with open(filename, "r", encoding="utf-8") as f:
+        if use_cache:
             try:
-                game_state = json.load(f)
-                try:
-                    loaded_rooms = {name: Room.load(room) for name, room in game_state["rooms"].items()}
-                    player = Player.load(game_state["player"], loaded_rooms)
-                    return player, loaded_rooms, "Game loaded succesfully!"
-                except KeyError as e:
-                    return None, None, f"Error loading game: Missing key in save file ({str(e)})."
-            except json.JSONDecodeError as e:
-                return None, None, f"Error loading game: Corrupted save file (invalid JSON, {str(e)})."           
-    except FileNotFoundError:
-        return None, None, "No saved game found."
-    except PermissionError as e:
-        return None, None, f"Error loadig game: Permission denied. Check if you have read access to {filename} ({str(e)})."    
-    except IOError as e:
-        return None, None, f"Error loading game: File error ({str(e)})."
-    except Exception as e:
-        return None, None, f"Error loading game: An unexpected error occurred ({str(e)})."
-        
+                with open(cache_file, "rb") as f:
+                    cached_stamp, data = marshal.loads(f.read())
+                if tuple(cached_stamp) == stamp:
+                    world = WorldTemplate(data)
+                    world.path = filename
+                    return world
+            except (OSError, EOFError, ValueError, TypeError):
+                pass
+        with open(filename, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        world = WorldTemplate(data)
+        world.path = filename
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    if use_cache:
+        try:
+            temp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(temp_file, "wb") as f:
+                marshal.dump((stamp, data), f)
+            os.replace(temp_file, cache_file)
+        except OSError:
+            pass
+    return world
 
-def play_game():
-    """Start a new game session, allowing the player to explore rooms and interact with items.
-    Args: None.
-    
+
+def create_room():
+    """Created a dictionary of rooms for the default world, ensuring a fresh state for each call.
+    Sessions share default_world() instead; this builds independent Room objects.
     Returns:
-    str or bool: A message if the game ends (e.g., ' Thanks for playing!') or False if the 
-    player wins/losses.
+    dict: A dictionary mapping room names to Room objects.
     """
-    rooms = create_room()
-    player = Player(rooms["Hall"])
-    print(art.text2art("Text Adventure"))
-    print("Welcome to the Text Adventure Game!")
-    print("You goal: Find the golden crown and escape with it!")
-    player_name = input("Please enter your name:").strip()
-    while not player_name:
-        player_name = input("Name cannot be empty. Please enter your name:").strip()
-    
-    print("\nAvialable Commands:")
-    print("-Movement: north, east, south, west")
-    print("-Actions: take <item>, use <item>, drop <item> solve <answer>, talk, inventory, hint, save, load, help, quit")
-    print("Example: 'take map' or 'use sword' or 'leaderboard'")
-    print("-----")
-    print("\n" + player.current_room.get_description(player))
-    print("-----")
+    world = default_world()
+    return {name: world.build_room(name) for name in world}
 
-    while True:
 
-        if any(item.name == "golden crown" for item in player.inventory):
-            player.add_score(100)
-            print(art.text2art("You win!"))
-            try:
-                pygame.mixer.Sound("sound/victory.wav").play()
-                pygame.time.wait(2000)
-            except pygame.error as e:
-                print(f"Error playing trap sound: {e}")
-            print("\nCongratulation! You have obtained the golden crown and won the game!")
-            print(f"Final score: {player.score}")
-            player.update_leaderboard(player_name)
-            print(player.display_leaderboard())
-            return False
+class RoomState(BaseRoom):
+    """A per-session view of a shared template room.
 
-        if player.current_room.trap and "shield" not in [item.name for item in player.inventory]:
-            print("\nYou triggered a trap in the Garden and lost!")
-            print(f"Final score: {player.score}")
-            try:
-                pygame.mixer.Sound("sound/trap.wav").play()
-                pygame.time.wait(2000)
-            except pygame.error as e:
-                print(f"Error playing trap sound:{e}")
-            player.update_leaderboard(player_name)
-            print(player.display_leaderboard())
-            return False
+    Reads fall through to the template; writes go to the session's overlay, which
+    records only the fields that differ from the template (items, exits, chest_locked,
+    guard_present and npc). The template itself is never modified.
 
-        command = input("What do you want to do? ").strip().lower()  
-        command = command.strip()
-        if not command:
-            print("\nPlease enter a command. Type 'help' for a list of commands.")
-            continue
-        if command.lower() == "leaderboard":
-            print(player.display_leaderboard())
-            continue
-        valid_single_commands = ["north", "east", "south", "west", "quit", "inventory", "hint", "save", "load", "help", "talk", "drop"]
-        if command in valid_single_commands:
-            pass
-        elif command.startswith("take ") or command == "take":
-            pass
-        elif command.startswith("drop ") or command == "drop":
-            pass
-        elif command == "use" or (command.startswith("use ") and not command[4:].strip()):
-            print("\nPlease specify an item to use (e.g.,'use map').")
-            continue
-        elif command == "solve" or (command.startswith("solve ") and not command[6:].strip()):
-            print("\nPlease specify an answer to solve (e.g, 'solve echo').")
-            continue
-        elif not command.replace(" ", "").isalnum():
-            print("\nCommand can only contain letters, numbers, and spaces.") 
-            print("\nTry a direction like 'north' or a command like 'take map'.")
-            continue
-        if command == "quit":
-            print("\nThanks for playing!")
-            return False
-        elif command == "inventory":
-            inv = player.get_inventory()
-            if isinstance(inv, list) and inv:
-                print("\nYour inventory:")
-                for i, item in enumerate(inv, 1):
-                    print(f"{i}. {item}")
-            else:
-                print("\nYour inventory is empty")
-        elif command == "hint": 
-            print("\n" + player.hint(rooms))
-        elif command == "help":
-            print("\nAvialable Commands:")
-            print("- Movement: north, east, south, west")
-            print("- Action: take <item>, use <item>, drop <item>, solve <answer>, talk, inventory, hint, save, load, help, quit")
-            print("Goal: Find the golden crown and escape with it!")
-        elif command == "save":
-            print("\n" + save_game(player, rooms))
-        elif command == "load":
-            loaded_player, loaded_rooms, message = load_game()
-            if loaded_player and loaded_rooms:
-                player = loaded_player
-                rooms.clear()
-                rooms.update(create_room())
-                rooms.update(loaded_rooms)
-                player.current_room = rooms[player.current_room.name]
-                print("\nGame loaded successfully!")
-            else:
-                print("\n" + message)
-        elif command == "talk":
-            print("\n" + player.talk())
-        elif command.startswith("solve "):
-            answer = command[6:].strip()
-            if not answer:
-                print("\nPlease specify an answer to solve (e.g, 'solve echo').")
+    Attributes:
+    world (World): The session world holding the overlay.
+    template (Room): The shared room this view is based on.
+    """
+    __slots__ = ("world", "template")
+
+    def __init__(self, world, template):
+        self.world = world
+        self.template = template
+
+    name = property(lambda self: self.template.name)
+    description = property(lambda self: self.template.description)
+    trap = property(lambda self: self.template.trap)
+    puzzle = property(lambda self: self.template.puzzle)
+    rules = property(lambda self: self.template.rules)
+
+    def get_description(self, player):
+        """Get the room's description, reusing the last rendering while nothing relevant changed.
+
+        The cache key is the room's state version plus the only player state the text
+        depends on: whether they carry the trap's protection item and whether they solved
+        the room's riddle. Rooms still in their template state share one cache across all
+        sessions; changed rooms are cached per session.
+
+        Returns:
+        str: The formatted description of the room.
+        """
+        template = self.template
+        name = template.name
+        trap = template.rules.get("trap")
+        protected = trap is not None and trap.get("protection") in player.inventory
+        solved = template.puzzle is not None and name in player.solved_riddles
+        world = self.world
+        version = world.versions.get(name)
+        if version is None:
+            cache = world.template.descriptions
+            key = (name, protected, solved)
+            text = cache.get(key)
+        else:
+            cache = world.rendered
+            key = name
+            cached = cache.get(name)
+            text = cached[1] if cached is not None and cached[0] == (version, protected, solved) else None
+        if text is not None:
+            RENDER_STATS["hits"] += 1
+            return text
+        RENDER_STATS["misses"] += 1
+        registry = metrics.registry
+        if registry is None:
+            text = BaseRoom.get_description(self, player)
+        else:
+            start = time.perf_counter()
+            text = BaseRoom.get_description(self, player)
+            registry.observe("describe_seconds", time.perf_counter() - start)
+        cache[key] = text if version is None else ((version, protected, solved), text)
+        return text
+
+    def _touch(self):
+        """Give the room a new state version so cached descriptions are re-rendered."""
+        world = self.world
+        world.clock += 1
+        world.versions[self.template.name] = world.changed[self.template.name] = world.clock
+
+    def _get(self, field):
+        changes = self.world.overlay.get(self.template.name)
+        if changes is not None and field in changes:
+            return changes[field]
+        return getattr(self.template, field)
+
+    def _set(self, field, value):
+        """Record a changed field, dropping it again if it matches the template."""
+        name = self.template.name
+        touched = self.world.touched
+        if touched is not None and name not in touched:
+            touched[name] = _copy_fields(self.world.overlay.get(name))
+        changes = self.world.overlay.setdefault(name, {})
+        if value == getattr(self.template, field):
+            changes.pop(field, None)
+            if not changes:
+                # Back to the template state: the shared description cache applies again.
+                del self.world.overlay[name]
+                self.world.versions.pop(name, None)
+                self.world.clock += 1
+                self.world.changed[name] = self.world.clock
+                return
+        else:
+            changes[field] = value
+        self._touch()
+
+    def _own(self, field, copy):
+        """Return the session's own copy of a container field, copying it from the template on first write."""
+        touched = self.world.touched
+        if touched is not None and self.template.name not in touched:
+            touched[self.template.name] = _copy_fields(self.world.overlay.get(self.template.name))
+        changes = self.world.overlay.setdefault(self.template.name, {})
+        self._touch()
+        if field not in changes:
+            changes[field] = copy(getattr(self.template, field))
+        return changes[field]
+
+    exits = property(lambda self: self._get("exits"))
+    items = property(lambda self: self._get("items"))
+    chest_locked = property(lambda self: self._get("chest_locked"), lambda self, value: self._set("chest_locked", value))
+    guard_present = property(lambda self: self._get("guard_present"), lambda self, value: self._set("guard_present", value))
+    npc = property(lambda self: self._get("npc"), lambda self, value: self._set("npc", value))
+
+    def add_item(self, item):
+        self._own("items", ItemBag.copy).add(item)
+
+    def remove_item(self, item):
+        self._own("items", ItemBag.copy).remove(item.name)
+
+    def reveal_exit(self, direction, room_name):
+        self._own("exits", dict)[direction] = room_name
+
+
+class World:
+    """A session's rooms: an immutable shared template plus a small overlay of changes.
+
+    Behaves like the dictionary returned by create_room(), but rooms are RoomState
+    views created on access, so per-session memory grows with what the player changed
+    rather than with the size of the world.
+
+    Attributes:
+    template (WorldTemplate): The shared compiled world (never modified).
+    overlay (dict): Room name -> {field: value} for every field the session changed.
+    versions (dict): Room name -> state version for rooms changed by the session.
+    clock (int): The last state version handed out.
+    changed (dict): Room name -> version of its last change, including changes back to the
+    template state; lets incremental saves find the rooms changed since a given version.
+    rendered (dict): Room name -> ((version, protected, solved), description) for changed rooms.
+    pending (SnapshotReader): A snapshot whose room changes are copied into the overlay as
+    rooms are first accessed, or None once every change is in the overlay.
+    touched (dict): While a History records a command, room name -> the room's overlay
+    fields before the command first changed it (None for the template state); otherwise None.
+    """
+    __slots__ = ("template", "overlay", "versions", "clock", "changed", "rendered", "pending", "touched")
+
+    def __init__(self, template=None, overlay=None):
+        self.template = template if template is not None else default_world()
+        self.overlay = overlay if overlay is not None else {}
+        self.versions = {name: 0 for name in self.overlay}
+        self.clock = 0
+        self.changed = dict(self.versions)
+        self.rendered = {}
+        self.pending = None
+        self.touched = None
+
+    def __getitem__(self, name):
+        if self.pending is not None:
+            self._materialize(self.pending.take(name), name)
+            if self.pending.remaining == 0:
+                self.drop_pending()
+        return RoomState(self, self.template[name])
+
+    def _materialize(self, fields, name):
+        """Copy one room's changes from the pending snapshot into the overlay."""
+        if fields is not None and name in self.template:
+            changes = self.overlay[name] = {}
+            for field, value in fields.items():
+                if field == "items":
+                    value = ItemBag(_item_from_key(key) for key in value)
+                changes[field] = value
+            self.versions[name] = self.changed[name] = 0
+
+    def materialize(self):
+        """Copy every change from a lazily loaded snapshot into the overlay.
+
+        Call before reading the overlay as a whole (saving, comparing states).
+        """
+        if self.pending is not None:
+            for name, fields in self.pending.take_all().items():
+                self._materialize(fields, name)
+            self.drop_pending()
+
+    def drop_pending(self):
+        """Forget a lazily loaded snapshot (the overlay is being replaced)."""
+        if self.pending is not None:
+            self.pending.close()
+            self.pending = None
+
+    def __contains__(self, name):
+        return name in self.template
+
+    def __iter__(self):
+        return iter(self.template)
+
+    def __len__(self):
+        return len(self.template)
+
+    def keys(self):
+        return self.template.keys()
+
+    def values(self):
+        return (self[name] for name in self.template)
+
+    def items(self):
+        return ((name, self[name]) for name in self.template)
+
+    def restore(self, loaded_rooms):
+        """Replace the overlay with the differences between loaded rooms and the template.
+        Args:
+        loaded_rooms (dict): Room name -> Room, as returned by load_game().
+        """
+        self.drop_pending()
+        self.overlay = {}
+        self.versions = {}
+        self.changed = {}
+        self.rendered = {}
+        for name, loaded in loaded_rooms.items():
+            if name not in self.template:
                 continue
-            if not answer.replace(" ", "").isalnum():
-                print("\nAnswers can only contain letters, numbers, and spaces.")
+            view = self[name]
+            template = self.template[name]
+            for field in ("chest_locked", "guard_present", "npc"):
+                view._set(field, getattr(loaded, field))
+            if dict(loaded.exits) != dict(template.exits):
+                view._own("exits", dict).update(loaded.exits)
+            if _item_keys(loaded.items) != _item_keys(template.items):
+                view._own("items", ItemBag.copy)
+                self.overlay[name]["items"] = loaded.items.copy()
+
+
+    def set_fields(self, name, fields):
+        """Replace a room's overlay fields, e.g. to undo a command.
+        Args:
+        name (str): The room's name.
+        fields (dict): {field: value}, or None for the template state; it is copied, not kept.
+        """
+        self.clock += 1
+        if fields is None:
+            self.overlay.pop(name, None)
+            self.versions.pop(name, None)
+        else:
+            self.overlay[name] = _copy_fields(fields)
+            self.versions[name] = self.clock
+        self.changed[name] = self.clock
+
+    def changed_since(self, version):
+        """Get the names of the rooms changed after a state version.
+        Args:
+        version (int): A value of self.clock taken earlier.
+
+        Returns:
+        list: The names of the rooms changed since then.
+        """
+        self.materialize()
+        return [name for name, changed in self.changed.items() if changed > version]
+
+    def save_overlay(self, names=None):
+        """Serialize the session's changes.
+        Args:
+        names (list): The rooms to include, or None for every changed room.
+
+        Returns:
+        dict: Room name -> {field: value}, or None for a room back in its template state.
+        """
+        self.materialize()
+        if names is None:
+            names = list(self.overlay)
+        saved = {}
+        for name in names:
+            changes = self.overlay.get(name)
+            if changes is None:
+                saved[name] = None
                 continue
-            if player.current_room.name == "Library" and player.current_room.npc:
-                if answer.lower() == player.current_room.npc[2].lower():
-                    player.current_room.items.append(Key("key", "A rusty key that unlocks the kitchen's north exit."))
-                    player.add_score(20)
-                    print("\nCorrect! The Teacher hands you a rusty key that unlocks the kitchen's north exit.")
-                    player.current_room.npc = None
-                else:
-                    print(f"\n'{answer}' is incorrect. Try again with 'solve <answer>'.")
-            else:
-                print("\n" + player.solve_riddle(answer))
-        elif command.startswith("take "):
-            item_name = command[5:].strip()
-            if not item_name:
-                print("\nPlease specify an item to take (e.g, 'take map').")
+            saved[name] = entry = {}
+            for field, value in changes.items():
+                if field == "items":
+                    value = value.save()
+                elif field == "exits":
+                    value = dict(value)
+                entry[field] = value
+        return saved
+
+    def load_overlay(self, saved, reset=True):
+        """Apply serialized changes from save_overlay().
+        Args:
+        saved (dict): Room name -> {field: value} or None.
+        reset (bool): Whether to start from the template state (False applies a delta).
+        """
+        if reset:
+            self.drop_pending()
+            self.overlay = {}
+            self.versions = {}
+            self.changed = {}
+            self.rendered = {}
+        for name, entry in saved.items():
+            if name not in self.template:
                 continue
-            if not item_name.replace(" ", "" ).isalnum():
-                print("\nItem names can only contain letters, numbers, and spaces.")
+            self.overlay.pop(name, None)
+            self.clock += 1
+            self.changed[name] = self.clock
+            if entry is None:
+                self.versions.pop(name, None)
                 continue
-            result = player.take(item_name)
-            if result is True:
-                pass
-            elif result is False:
-                print(f"\nThere's no {item_name} here to take.")
+            changes = {}
+            for field, value in entry.items():
+                if field == "items":
+                    value = ItemBag(Item.load(item_data) for item_data in value)
+                elif field == "npc" and value is not None:
+                    value = tuple(value)
+                changes[field] = value
+            self.overlay[name] = changes
+            self.versions[name] = self.clock
+
+
+def _copy_fields(fields):
+    """Copy a room's overlay fields, including the containers that are changed in place."""
+    if fields is None:
+        return None
+    return {field: value.copy() if isinstance(value, (ItemBag, dict)) else value for field, value in fields.items()}
+
+
+def _same_fields(a, b):
+    """Check whether two overlay field dicts (or None) hold the same room state."""
+    if a is None or b is None:
+        return a is b
+    if a.keys() != b.keys():
+        return False
+    for field, value in a.items():
+        other = b[field]
+        if isinstance(value, ItemBag):
+            if value.names() != other.names():
+                return False
+        elif value != other:
+            return False
+    return True
+
+
+class History:
+    """Undo and redo for one session, bounded to its last `depth` changes.
+
+    An entry is recorded only for commands that changed something. It holds the player
+    before and after the command as (room name, score, inventory, solved riddles), sharing
+    the inventory and solved riddles with the player (Player replaces them rather than
+    changing them in place), and copies of the overlay fields of just the rooms the command
+    touched. Recording, undo and redo therefore cost O(fields touched), however large the
+    world and however long the history.
+
+    Attributes:
+    depth (int): The most commands that can be undone.
+    undo_stack (deque): Entries (player before, player after, {room name: (fields before,
+    fields after)}), oldest first.
+    redo_stack (list): Undone entries, the most recently undone last.
+    """
+    __slots__ = ("depth", "undo_stack", "redo_stack", "_touched", "_player")
+
+    def __init__(self, depth=100):
+        self.depth = depth
+        self.undo_stack = collections.deque(maxlen=depth)
+        self.redo_stack = []
+        self._touched = None
+        self._player = None
+
+    def begin(self, session):
+        """Start recording a command."""
+        self._touched = session.rooms.touched = {}
+        self._player = _player_state(session.player)
+
+    def commit(self, session):
+        """Finish recording a command, keeping an entry if it changed anything."""
+        touched = self._touched
+        session.rooms.touched = self._touched = None
+        if touched is None:
+            return
+        overlay = session.rooms.overlay
+        rooms = {}
+        for name, before in touched.items():
+            after = overlay.get(name)
+            if not _same_fields(before, after):
+                rooms[name] = (before, _copy_fields(after))
+        after = _player_state(session.player)
+        if rooms or after != self._player:
+            self.undo_stack.append((self._player, after, rooms))
+            self.redo_stack.clear()
+
+    def clear(self):
+        """Forget every entry, e.g. when a saved game is loaded."""
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self._touched = None
+
+    def undo(self, session, count=1):
+        """Undo up to `count` commands.
+        Returns:
+        int: How many were undone.
+        """
+        self._touched = None
+        done = 0
+        while done < count and self.undo_stack:
+            entry = self.undo_stack.pop()
+            self._apply(session, entry[0], entry[2], 0)
+            self.redo_stack.append(entry)
+            done += 1
+        return done
+
+    def redo(self, session, count=1):
+        """Redo up to `count` undone commands.
+        Returns:
+        int: How many were redone.
+        """
+        self._touched = None
+        done = 0
+        while done < count and self.redo_stack:
+            entry = self.redo_stack.pop()
+            self._apply(session, entry[1], entry[2], 1)
+            self.undo_stack.append(entry)
+            done += 1
+        return done
+
+    @staticmethod
+    def _apply(session, player_state, rooms, side):
+        world = session.rooms
+        for name, fields in rooms.items():
+            world.set_fields(name, fields[side])
+        room_name, score, inventory, solved = player_state
+        player = session.player
+        player.current_room = world[room_name]
+        player.score = score
+        player.inventory = inventory
+        player.solved_riddles = solved
+        player.events = []
+
+
+def _player_state(player):
+    """Get the parts of a player that History records."""
+    return (player.current_room.name, player.score, player.inventory, player.solved_riddles)
+
+
+def _item_keys(items):
+    """Return comparable (type, name, description) keys for a list of items."""
+    return [(item.__class__.__name__, item.name, item.description) for item in items]
+
+
+def _item_from_key(key):
+    """Get the interned item for a (type, name, description) key."""
+    item_type, name, description = key
+    return ITEM_CLASSES.get(item_type, Item).intern(name, description)
+
+
+_DEFAULT_WORLD = None
+# Room description cache counters, across all sessions in the process.
+RENDER_STATS = {"hits": 0, "misses": 0}
+metrics.add_collector(lambda: [("describe_cache_total", {"result": "hit"}, RENDER_STATS["hits"]),
+                               ("describe_cache_total", {"result": "miss"}, RENDER_STATS["misses"])])
+
+
+def default_world():
+    """Get the bundled default world, loading it once per process.
+    Returns:
+    WorldTemplate: The shared compiled world. Do not modify it.
+    """
+    global _DEFAULT_WORLD
+    if _DEFAULT_WORLD is None:
+        _DEFAULT_WORLD = load_world(DEFAULT_WORLD_FILE)
+    return _DEFAULT_WORLD
+
+
+class SaveJournal:
+    """Incremental saves for one session, kept in an append-only journal file.
+
+    The first save of a session (and every compact_every-th record) rewrites the file
+    as a single snapshot of the player and the world overlay. Other saves append a delta
+    holding the player and only the rooms changed since the previous save. Loading
+    replays the snapshot and its deltas; a torn record at the tail is dropped.
+
+    Attributes:
+    journal (Journal): The journal file.
+    compact_every (int): Maximum records in the journal before it is compacted.
+    synced_clock (int): The world clock at the last save or load, or None if the file
+    does not yet match this session.
+    """
+    def __init__(self, filename, compact_every=50, sync=False):
+        self.journal = Journal(filename, sync)
+        self.compact_every = compact_every
+        self.synced_clock = None
+
+    @metrics.timed("save_seconds", format="journal")
+    def save(self, player, rooms):
+        """Save the session, appending a delta when possible.
+        Args:
+        player (Player): The player to save.
+        rooms (World): The session's rooms.
+
+        Returns:
+        str: A message indicating success or failure.
+        """
+        try:
+            if self.synced_clock is None or self.journal.count >= self.compact_every:
+                self.journal.rewrite([{
+                    "t": "snapshot",
+                    "world": rooms.template.name,
+                    "player": player.save(),
+                    "rooms": rooms.save_overlay(),
+                }])
             else:
-                print(f"\n{result}")
-        elif command.startswith("drop "):
-            item_name = command[5:].strip()
-            if not item_name:
-                print("\nPlease specify an item to drop (e.g., 'drop map').")
-                continue
-            if not item_name.replace(" ", "").isalnum():
-                print("\nItem names can only contain letters, numbers, and spaces.")
-                continue
-            if player.drop(item_name):
-                print(f"\nYou dropped the {item_name}.")
+                self.journal.append({
+                    "t": "delta",
+                    "player": player.save(),
+                    "rooms": rooms.save_overlay(rooms.changed_since(self.synced_clock)),
+                })
+            self.synced_clock = rooms.clock
+            return "Game saved successfully!"
+        except PermissionError as e:
+            return f"Error saving game: Permission denied. Check if you have write access to {self.journal.path} ({str(e)})."
+        except OSError as e:
+            return f"Error saving game: File error. The disk might be full or the file might be in use ({str(e)})."
+
+    @metrics.timed("load_seconds", format="journal")
+    def load(self, template):
+        """Replay the journal.
+        Args:
+        template (WorldTemplate): The world the saved game was played in.
+
+        Returns:
+        tuple: (Player, World, message), or (None, None, error_message) if loading fails.
+        """
+        try:
+            records = self.journal.read()
+        except FileNotFoundError:
+            return None, None, "No saved game found."
+        except OSError as e:
+            return None, None, f"Error loading game: File error ({str(e)})."
+        if not records or records[0].get("t") != "snapshot":
+            return None, None, "Error loading game: Corrupted save file (the journal has no snapshot)."
+        saved_rooms = dict(records[0]["rooms"])
+        for record in records[1:]:
+            saved_rooms.update(record["rooms"])
+        rooms = World(template)
+        try:
+            rooms.load_overlay(saved_rooms)
+            player = Player.load(records[-1]["player"], rooms)
+        except KeyError as e:
+            return None, None, f"Error loading game: Missing key in save file ({str(e)})."
+        self.synced_clock = rooms.clock
+        return player, rooms, "Game loaded succesfully!"
+
+
+class SaveSnapshot:
+    """Saves in the compact binary snapshot format (see snapshot.py).
+
+    A snapshot holds the player and the world overlay only, with strings and items stored
+    once. Loading maps the file and copies a room's changes into the session only when
+    the room is first accessed. If the snapshot does not exist yet but a JSON save does
+    (legacy_file), the first load reads the JSON save and converts it.
+
+    Attributes:
+    path (str): The snapshot file.
+    legacy_file (str): A JSON save (save_game() format) to migrate from, or None.
+    sync (bool): Whether to fsync each save before it replaces the previous one.
+    """
+    def __init__(self, filename, legacy_file=None, sync=True):
+        self.path = filename
+        self.legacy_file = legacy_file
+        self.sync = sync
+
+    @metrics.timed("save_seconds", format="snapshot")
+    def save(self, player, rooms):
+        """Write a snapshot of the session, replacing the previous one atomically.
+        Args:
+        player (Player): The player to save.
+        rooms (World): The session's rooms.
+
+        Returns:
+        str: A message indicating success or failure.
+        """
+        rooms.materialize()
+        changed = {}
+        for name, changes in rooms.overlay.items():
+            entry = changed[name] = dict(changes)
+            if "items" in entry:
+                entry["items"] = _item_keys(entry["items"])
+        player_data = {
+            "current_room": player.current_room.name,
+            "score": player.score,
+            "inventory": _item_keys(player.inventory),
+            "solved_riddles": list(player.solved_riddles),
+        }
+        try:
+            snapshot.write(self.path, snapshot.encode(rooms.template.name, player_data, changed), self.sync)
+            return "Game saved successfully!"
+        except PermissionError as e:
+            return f"Error saving game: Permission denied. Check if you have write access to {self.path} ({str(e)})."
+        except OSError as e:
+            return f"Error saving game: File error. The disk might be full or the file might be in use ({str(e)})."
+
+    @metrics.timed("load_seconds", format="snapshot")
+    def load(self, template):
+        """Open the snapshot; room changes are read from it as rooms are accessed.
+        Args:
+        template (WorldTemplate): The world the saved game was played in.
+
+        Returns:
+        tuple: (Player, World, message), or (None, None, error_message) if loading fails.
+        """
+        if not os.path.exists(self.path) and self.legacy_file and os.path.exists(self.legacy_file):
+            return self.migrate(template)
+        try:
+            reader = snapshot.SnapshotReader(self.path)
+        except FileNotFoundError:
+            return None, None, "No saved game found."
+        except snapshot.SnapshotError as e:
+            return None, None, f"Error loading game: Corrupted save file ({str(e)})."
+        except OSError as e:
+            return None, None, f"Error loading game: File error ({str(e)})."
+        if reader.world != template.name:
+            reader.close()
+            return None, None, f"Error loading game: The save is from the world {reader.world!r}, not {template.name!r}."
+        rooms = World(template)
+        if reader.room_count:
+            rooms.pending = reader
+        else:
+            reader.close()
+        saved = reader.player
+        try:
+            player = Player.load({
+                "current_room": saved["current_room"],
+                "score": saved["score"],
+                "inventory": [{"type": key[0], "name": key[1], "description": key[2]} for key in saved["inventory"]],
+                "solved_riddles": saved["solved_riddles"],
+            }, rooms)
+        except KeyError as e:
+            rooms.drop_pending()
+            return None, None, f"Error loading game: Missing key in save file ({str(e)})."
+        return player, rooms, "Game loaded succesfully!"
+
+    def migrate(self, template):
+        """Convert the legacy JSON save into a snapshot and load it.
+        Args:
+        template (WorldTemplate): The world the saved game was played in.
+
+        Returns:
+        tuple: (Player, World, message), or (None, None, error_message) if loading fails.
+        """
+        loaded_player, loaded_rooms, message = load_game(self.legacy_file)
+        if loaded_player is None:
+            return None, None, message
+        rooms = World(template)
+        rooms.restore(loaded_rooms)
+        if loaded_player.current_room.name not in rooms:
+            return None, None, f"Error loading game: Missing key in save file ('{loaded_player.current_room.name}')."
+        player = Player(rooms[loaded_player.current_room.name])
+        player.inventory = loaded_player.inventory
+        player.score = loaded_player.score
+        player.solved_riddles = loaded_player.solved_riddles
+        message = self.save(player, rooms)
+        if message.startswith("Error"):
+            return None, None, message
+        return player, rooms, "Game loaded succesfully!"
+
+
+def open_save_store(save_file):
+    """Get the save store a save file's name selects.
+    Args:
+    save_file (str): The save file.
+
+    Returns:
+    SaveJournal or SaveSnapshot: The store for a '.journal' or '.snap' file (a snapshot
+    migrates the JSON save of the same name on first load), or None for a JSON save file.
+    """
+    if save_file.endswith(".journal"):
+        return SaveJournal(save_file)
+    if save_file.endswith(".snap"):
+        return SaveSnapshot(save_file, os.path.splitext(save_file)[0] + ".json")
+    return None
+
+
+def safe_name(name):
+    """Turn a player or slot name into a file name, a different one for every name.
+
+    A name of at most 32 letters, digits, '_' and '-' is its own file name. Any other name is
+    cut to 32 characters, with the others turned into '_', and gets '.' and part of its SHA-1
+    appended, so names that clean up or cut to the same characters never share a file.
+    """
+    cleaned = re.sub(r"[^A-Za-z0-9_-]", "_", name)
+    if cleaned == name and 0 < len(name) <= 32:
+        return name
+    digest = hashlib.sha1(name.encode("utf-8", "surrogatepass")).hexdigest()[:12]
+    return f"{cleaned[:32] or '_'}.{digest}"
+
+
+class StateCache:
+    """An LRU cache of saved game states, bounded by their estimated size in memory.
+
+    States are kept in memory in the session's own form (player parts and a copy of the
+    World overlay), so loading a cached slot reads no file and decodes nothing. One cache
+    is shared by every session in the process (STATE_CACHE).
+
+    Attributes:
+    max_bytes (int): The most bytes the cached states may take; the least recently used
+    states are evicted beyond that.
+    size (int): The bytes cached now.
+    hits (int): Lookups answered from the cache.
+    misses (int): Lookups that had to read the save file.
+    """
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._states = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._states)
+
+    def get(self, key):
+        """Get a cached state and mark it as recently used, or None."""
+        with self._lock:
+            entry = self._states.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._states.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, state, size):
+        """Cache a state taking `size` bytes, evicting the least recently used beyond max_bytes."""
+        with self._lock:
+            old = self._states.pop(key, None)
+            if old is not None:
+                self.size -= old[0]
+            if size > self.max_bytes:
+                return
+            self._states[key] = (size, state)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._states.popitem(last=False)
+                self.size -= evicted
+
+
+STATE_CACHE = StateCache()
+SLOT_INDEX_FORMAT = 1
+# Slot index updates (read, change, rewrite) hold one of these, picked by the index file, so
+# sessions of players with the same name (who share a folder) never lose each other's slots.
+_INDEX_LOCKS = [threading.Lock() for _ in range(64)]
+
+
+class SaveSlots:
+    """A player's named save slots in a data directory.
+
+    Each slot is a save file in the player's folder ('<data dir>/saves/<player>/slot-<name>.json',
+    or '.journal'/'.snap' for those formats). An index file ('index.json') next to them holds
+    each slot's room, score and save time, so listing slots never opens a save. Saved and
+    loaded states go into an LRU StateCache, so loading a recently used slot again reads no file.
+    Index updates are serialized within the process, since players with the same name share
+    a folder.
+    Cached states are keyed by the file's modification time and size, so a slot file that is
+    replaced or deleted behind our back is never answered from the cache.
+
+    Attributes:
+    directory (str): The player's folder.
+    extension (str): The save format of the slot files ('.json', '.journal' or '.snap').
+    cache (StateCache): The cache of recent states.
+    """
+    def __init__(self, directory, extension=".json", cache=None):
+        self.directory = directory
+        self.extension = extension if extension in (".journal", ".snap") else ".json"
+        self.cache = cache if cache is not None else STATE_CACHE
+        self.index_file = os.path.join(directory, "index.json")
+        self._index_lock = _INDEX_LOCKS[hash(os.path.abspath(self.index_file)) % len(_INDEX_LOCKS)]
+        self._stores = {}
+
+    def path(self, slot):
+        """Get the save file of a slot."""
+        return os.path.join(self.directory, f"slot-{safe_name(slot)}{self.extension}")
+
+    def _store(self, path):
+        """Get the journal or snapshot store of a slot file (None for JSON), kept for incremental saves."""
+        if path not in self._stores:
+            self._stores[path] = open_save_store(path)
+        return self._stores[path]
+
+    def stores(self):
+        """Get the journal and snapshot stores of the slots used so far."""
+        return [store for store in self._stores.values() if store is not None]
+
+    def list(self):
+        """Read the index.
+        Returns:
+        dict: Slot name -> {'room', 'score', 'saved' (time.time()), 'bytes'}, oldest save first.
+        """
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        slots = index.get("slots", {}) if isinstance(index, dict) else {}
+        return dict(sorted(slots.items(), key=lambda item: item[1].get("saved", 0)))
+
+    def save(self, slot, player, rooms):
+        """Save the game to a slot and record it in the index.
+        Args:
+        slot (str): The slot's name.
+        player (Player): The player.
+        rooms (World): The session's rooms.
+
+        Returns:
+        str: A message indicating success or failure.
+        """
+        path = self.path(slot)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            return f"Error saving game: {e}"
+        store = self._store(path)
+        message = store.save(player, rooms) if store is not None else save_game(player, rooms, path)
+        if message.startswith("Error"):
+            return message
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            return f"Error saving game: {e}"
+        with self._index_lock:
+            index = self.list()
+            index.pop(slot, None)
+            index[slot] = {"room": player.current_room.name, "score": player.score, "saved": time.time(), "bytes": stat.st_size}
+            message = write_game_state({"format": SLOT_INDEX_FORMAT, "slots": index}, self.index_file)
+        if message.startswith("Error"):
+            return message
+        state = _cached_state(player, rooms)
+        self.cache.put(self._key(path, rooms.template, stat), state, _state_size(state))
+        return f"Game saved to slot '{slot}'."
+
+    def load(self, slot, template, max_inventory=3):
+        """Load a slot, from the cache if it holds the slot.
+        Args:
+        slot (str): The slot's name.
+        template (WorldTemplate): The world being played.
+        max_inventory (int): The player's carrying capacity.
+
+        Returns:
+        tuple: (Player, World, message), with None for the player and world on failure.
+        """
+        path = self.path(slot)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None, None, f"There is no saved game in slot '{slot}'. Type 'saves' to list your slots."
+        key = self._key(path, template, stat)
+        state = self.cache.get(key)
+        metrics.inc("slot_cache_total", result="hit" if state is not None else "miss")
+        if state is not None:
+            player, rooms = _restore_cached_state(state, template, max_inventory)
+            return player, rooms, f"Game loaded from slot '{slot}'."
+        store = self._store(path)
+        if store is not None:
+            player, rooms, message = store.load(template)
+            if player is None:
+                return None, None, message
+        else:
+            player, loaded_rooms, message = load_game(path)
+            if player is None or loaded_rooms is None:
+                return None, None, message
+            rooms = World(template)
+            rooms.restore(loaded_rooms)
+            player.current_room = rooms[player.current_room.name]
+        player.max_inventory = max_inventory
+        state = _cached_state(player, rooms)
+        self.cache.put(key, state, _state_size(state))
+        return player, rooms, f"Game loaded from slot '{slot}'."
+
+    def _key(self, path, template, stat):
+        return (os.path.abspath(path), template.name, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _cached_state(player, rooms):
+    """Copy the parts of a game a StateCache keeps."""
+    rooms.materialize()
+    overlay = {name: _copy_fields(fields) for name, fields in rooms.overlay.items()}
+    return (player.current_room.name, player.score, player.inventory.copy(), list(player.solved_riddles), overlay)
+
+
+def _state_size(state):
+    """Estimate the bytes a StateCache state takes (items are shared with the template and not counted)."""
+    _, _, inventory, solved, overlay = state
+    size = sys.getsizeof(overlay) + sys.getsizeof(inventory._items) + sys.getsizeof(solved)
+    for fields in overlay.values():
+        if fields is not None:
+            size += sys.getsizeof(fields)
+            size += sum(sys.getsizeof(value._items if isinstance(value, ItemBag) else value) for value in fields.values())
+    return size
+
+
+def _restore_cached_state(state, template, max_inventory):
+    """Build a player and World from a StateCache state, leaving the cached copy untouched."""
+    room_name, score, inventory, solved, overlay = state
+    rooms = World(template, {name: _copy_fields(fields) for name, fields in overlay.items()})
+    player = Player(rooms[room_name], max_inventory)
+    player.inventory = inventory.copy()
+    player.inventory.capacity = max_inventory
+    player.score = score
+    player.solved_riddles = list(solved)
+    return player, rooms
+
+
+@metrics.timed("save_seconds", format="json")
+def save_game(player, rooms, filename="savegame.json"):
+    """ Save the current game state (player and rooms) to a JSON file.
+    Args:
+    player (Player): The player object to save.
+    rooms (dict): The dictionary of room object to save.
+    filename (str): The name of the file to save to (default: 'savegame.json').
+    Returns:
+    str: A message indicating success or failure.
+    """
+    
+    game_state = {
+        "player": player.save(),
+        "rooms": {name: room.save() for name, room in rooms.items()}
+    }
+    return write_game_state(game_state, filename)
+
+
+def write_game_state(game_state, filename):
+    """Write a game state dictionary to a save file, atomically.
+
+    The JSON goes to a temporary file in the same directory, which is then renamed over
+    the save file, so a crash mid-write leaves the previous save intact.
+    Args:
+    game_state (dict): The 'player' and 'rooms' dictionaries to save.
+    filename (str): The name of the file to save to.
+
+    Returns:
+    str: A message indicating success or failure.
+    """
+    temp_path = None
+    try:
+        fd, temp_path = tempfile.mkstemp(prefix=".save-", suffix=".tmp", dir=os.path.dirname(os.path.abspath(filename)))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(game_state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, filename)
+        temp_path = None
+        return "Game saved successfully!"
+    except PermissionError as e:
+        return f"Error saving game: Permission denied. Check if you have write access to {filename} ({str(e)})."
+    except OSError as e:
+        return f"Error saving game: File error. The disk might be full or the file might be in use ({str(e)})."
+    except (TypeError, ValueError) as e:
+        return f"Error saving game: Failed to serialize game state to JSON ({str(e)})."
+    except Exception as e:
+        return f"Error saving game: An unexpected error occurred ({str(e)})."
+    finally:
+        if temp_path is not None:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+@metrics.timed("load_seconds", format="json")
+def load_game(filename="savegame.json"):
+    """Load a saved game state from a JSON file.
+    Args:
+    filename (str): The name of the file to load from (default: 'savegame.json').
+    
+    Returns:
+    tuple: (Player, rooms, message) where player and rooms are the loaded game state,
+            or(None, None, error_message) if loading fails.
+    """
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            try:
+                game_state = json.load(f)
+                try:
+                    loaded_rooms = {name: Room.load(room) for name, room in game_state["rooms"].items()}
+                    player = Player.load(game_state["player"], loaded_rooms)
+                    return player, loaded_rooms, "Game loaded succesfully!"
+                except KeyError as e:
+                    return None, None, f"Error loading game: Missing key in save file ({str(e)})."
+            except json.JSONDecodeError as e:
+                return None, None, f"Error loading game: Corrupted save file (invalid JSON, {str(e)})."           
+    except FileNotFoundError:
+        return None, None, "No saved game found."
+    except PermissionError as e:
+        return None, None, f"Error loadig game: Permission denied. Check if you have read access to {filename} ({str(e)})."    
+    except IOError as e:
+        return None, None, f"Error loading game: File error ({str(e)})."
+    except Exception as e:
+        return None, None, f"Error loading game: An unexpected error occurred ({str(e)})."
+        
+
+class Autosave:
+    """Periodic saves written by a background thread.
+
+    On the game thread a save only copies the player and the session's changed rooms;
+    building and writing the full save file happens on the writer thread, so a slow disk
+    never stalls the prompt. Saves requested while a write is running are coalesced and
+    only the newest is written.
+
+    Attributes:
+    filename (str): The JSON save file written (loadable with the 'load' command).
+    every (int): Save after this many commands, or None.
+    interval (float): Save when this many seconds have passed since the last save, or None.
+    writer (BackgroundWriter): The thread writing the snapshots.
+    """
+    def __init__(self, filename="savegame.json", every=None, interval=None):
+        self.filename = filename
+        self.every = every
+        self.interval = interval
+        self.writer = BackgroundWriter(self._write)
+        self._commands = 0
+        self._last_save = time.monotonic()
+
+    def tick(self, session):
+        """Count one command and save if the policy says a save is due.
+        Args:
+        session (GameSession): The session to save.
+        """
+        self._commands += 1
+        if self.every and self._commands >= self.every:
+            self.save(session)
+        elif self.interval is not None and time.monotonic() - self._last_save >= self.interval:
+            self.save(session)
+
+    def save(self, session):
+        """Snapshot the session and hand it to the writer thread.
+        Args:
+        session (GameSession): The session to save.
+        """
+        self._commands = 0
+        self._last_save = time.monotonic()
+        self.writer.submit((session.rooms.template, session.player.save(), session.rooms.save_overlay()))
+
+    def save_now(self, session):
+        """Save the session and wait for the write, keeping it ordered after earlier autosaves.
+        Args:
+        session (GameSession): The session to save.
+
+        Returns:
+        str: A message indicating success or failure.
+        """
+        self.save(session)
+        self.writer.flush()
+        return self.writer.last_result
+
+    def close(self):
+        """Wait for pending saves to reach the disk and stop the writer thread.
+        Returns:
+        str: The message of the last write, or None if nothing was written.
+        """
+        self.writer.close()
+        return self.writer.last_result
+
+    @metrics.timed("save_seconds", format="autosave")
+    def _write(self, snapshot):
+        template, player_data, overlay = snapshot
+        rooms = World(template)
+        rooms.load_overlay(overlay)
+        game_state = {
+            "player": player_data,
+            "rooms": {name: room.save() for name, room in rooms.items()}
+        }
+        return write_game_state(game_state, self.filename)
+
+
+class Event:
+    """A non-text event emitted by a game session, such as a banner or a sound effect.
+    Attributes:
+    kind (str): The kind of event ('banner' or 'sound').
+    value (str): The banner text or the sound name (e.g., 'victory').
+    wait (int): Milliseconds the terminal should pause after a sound (0 for none).
+    """
+    __slots__ = ("kind", "value", "wait")
+    def __init__(self, kind, value, wait=0):
+        self.kind = kind
+        self.value = value
+        self.wait = wait
+
+    def __repr__(self):
+        return f"Event({self.kind!r}, {self.value!r})"
+
+
+class Command:
+    """A registered command verb.
+    Attributes:
+    name (str): The verb (e.g., 'take').
+    handler (function): Called as handler(session, arg) to run the command.
+    arg (str): What the argument names ('item' or 'answer'), or None if the verb takes none.
+    usage (str): Shown when a required argument is missing, or None to just describe the room.
+    describe (bool): Whether the room description is shown after the command.
+    optional (bool): Whether the handler also runs without the argument (with arg '').
+    """
+    __slots__ = ("name", "handler", "arg", "usage", "describe", "optional")
+
+    def __init__(self, name, handler, arg=None, usage=None, describe=True, optional=False):
+        self.name = name
+        self.handler = handler
+        self.arg = arg
+        self.usage = usage
+        self.describe = describe
+        self.optional = optional
+
+
+COMMANDS = {}
+# Metric keys for parse timing and for each verb's latency and count.
+_PARSE_METRIC = metrics.key("parse_seconds")
+_COMMAND_METRICS = {}
+ARGUMENT_ERRORS = {
+    "item": "\nItem names can only contain letters, numbers, and spaces.",
+    "answer": "\nAnswers can only contain letters, numbers, and spaces.",
+    "count": "\nPlease specify how many commands to undo as a number (e.g., 'rewind 3').",
+    "slot": "\nSlot names can only contain letters, numbers, and spaces.",
+}
+
+
+def register_command(name, handler, aliases=(), arg=None, usage=None, describe=True, optional=False):
+    """Add a verb (and its aliases) to the command table.
+    Args:
+    name (str): The verb players type (e.g., 'take').
+    handler (function): Called as handler(session, arg) to run the command.
+    aliases (tuple): Other words for the same verb (e.g., ('get',)).
+    arg (str): 'item' or 'answer' if the verb takes an argument, None otherwise.
+    usage (str): Message shown when the argument is missing.
+    describe (bool): Whether to show the room description afterwards.
+    optional (bool): Whether the argument may be left out.
+
+    Returns:
+    Command: The registered command.
+    """
+    entry = Command(name, handler, arg, usage, describe, optional)
+    for word in (name,) + tuple(aliases):
+        COMMANDS[word] = entry
+    return entry
+
+
+def command(name, aliases=(), arg=None, usage=None, describe=True, optional=False):
+    """Decorator form of register_command() for GameSession methods."""
+    def decorator(handler):
+        register_command(name, handler, aliases, arg, usage, describe, optional)
+        return handler
+    return decorator
+
+
+def parse_command(text):
+    """Resolve a normalised command line with a single table lookup.
+    Args:
+    text (str): A stripped, lower-case command (e.g., 'get map').
+
+    Returns:
+    tuple: (Command, arg), or (None, text) if the verb is unknown or takes no argument but got one.
+    """
+    verb, _, arg = text.partition(" ")
+    entry = COMMANDS.get(verb)
+    if entry is None:
+        return None, text
+    arg = arg.strip()
+    if arg and entry.arg is None:
+        return None, text
+    return entry, arg
+
+
+# Seconds a 'hint' in a terminal or hosted game waits for the world's hint table (building
+# one takes seconds, or minutes for a huge world); it gives the room's hint meanwhile.
+HINT_WAIT = 0.5
+
+
+class GameSession:
+    """A headless game session holding one player and their rooms.
+
+    All game rules live here; nothing reads from stdin or writes to stdout, so many
+    sessions can be driven from tests or servers as fast as commands arrive.
+
+    Attributes:
+    player_name (str): The name recorded on the leaderboard.
+    rooms (World): The session's rooms (a shared template plus this session's changes).
+    Pass a WorldTemplate (e.g., from load_world()) to play a different world.
+    player (Player): The session's player.
+    save_file (str): The file used by the 'save' and 'load' commands. A name ending in
+    '.journal' selects incremental saves (SaveJournal) and one ending in '.snap' binary
+    snapshots (SaveSnapshot) instead of a full JSON dump.
+    store (SaveJournal or SaveSnapshot): The save store for those files, or None for full JSON saves.
+    slots (SaveSlots): The player's named slots for 'save <slot>' and 'load <slot>', kept in
+    '<data_dir>/saves/<player name>' in the save file's format.
+    record_scores (bool): Whether finished games are added to the leaderboard.
+    leaderboard (Leaderboard): The high scores shown and updated by the session
+    (by default the shared leaderboard.db, opened on first use).
+    autosave (Autosave): Background saves taken after commands, or None.
+    history (History): The 'undo', 'redo' and 'rewind' history, or None when undo_depth is 0.
+    Loading a saved game clears it.
+    finished (bool): True once the player has won, lost or quit.
+    outcome (str): None while playing, then 'won', 'lost' or 'quit'.
+    game_id (str): Identifies the game on the leaderboard, so it is recorded only once, or None.
+    hint_wait (float): The most seconds 'hint' waits for the world's hint table before giving
+    the room's hint, or None to wait until it is ready (so the same commands always get the
+    same hints).
+    """
+    def __init__(self, player_name="Player", rooms=None, save_file="savegame.json", record_scores=True, max_inventory=3, autosave=None, leaderboard=None, undo_depth=100, data_dir=".", game_id=None, hint_wait=None):
+        self.player_name = player_name
+        self.rooms = rooms if isinstance(rooms, World) else World(rooms)
+        self.player = Player(self.rooms[self.rooms.template.start], max_inventory)
+        self.player.events.append((ENTER_ROOM, self.rooms.template.start))
+        self.save_file = save_file
+        self.store = open_save_store(save_file)
+        self.slots = SaveSlots(os.path.join(data_dir, "saves", safe_name(player_name)), os.path.splitext(save_file)[1])
+        self.record_scores = record_scores
+        self.autosave = autosave
+        self.history = History(undo_depth) if undo_depth else None
+        self._leaderboard = leaderboard
+        self.finished = False
+        self.outcome = None
+        self.game_id = game_id
+        self.hint_wait = hint_wait
+        self._events = []
+
+    @property
+    def leaderboard(self):
+        if self._leaderboard is None:
+            self._leaderboard = get_leaderboard()
+        return self._leaderboard
+
+    def look(self):
+        """Get the description of the player's current room.
+        Returns:
+        str: The formatted description of the current room.
+        """
+        return self.player.current_room.get_description(self.player)
+
+    def step(self, command):
+        """Apply one command to the session.
+        Args:
+        command (str): The raw command typed by the player (e.g., 'take map').
+
+        Returns:
+        list: The output of the command, as strings and Event objects in display order.
+        """
+        self._events = []
+        if self.finished:
+            return self._events
+        text = command.strip().lower()
+        history = self.history
+        if history is not None:
+            history.begin(self)
+        if metrics.registry is None:
+            self._dispatch(text)
+        else:
+            self._dispatch_timed(metrics.registry, text)
+        if self.player.events:
+            self._run_rules()
+        if history is not None:
+            history.commit(self)
+        if self.autosave is not None and not self.finished:
+            self.autosave.tick(self)
+        self._say()
+        return self._events
+
+    def close(self):
+        """Flush the autosave when the game ends; a game that was quit is saved first.
+        Returns:
+        str: An error message if the last autosave failed, otherwise None.
+        """
+        if self.autosave is None:
+            return None
+        if self.outcome not in ("won", "lost"):
+            self.autosave.save(self)
+        message = self.autosave.close()
+        if message and message.startswith("Error"):
+            return message
+        return None
+
+    def _say(self, *lines):
+        """Queue output lines after any messages the player has accumulated."""
+        self._events.extend(self.player.drain_messages())
+        self._events.extend(lines)
+
+    def _finish(self, outcome):
+        """End the session, recording the score and showing the leaderboard."""
+        self.finished = True
+        self.outcome = outcome
+        metrics.inc("games_total", outcome=outcome)
+        if self.record_scores:
+            self.player.update_leaderboard(self.player_name, self.leaderboard, self.game_id)
+            self._say(self.player.display_leaderboard(self.leaderboard, self.player_name))
+
+    def _run_rules(self):
+        """Run the world's rules for the events queued by the last command, in order."""
+        player = self.player
+        fire = self.rooms.template.rules.fire
+        while player.events and not self.finished:
+            events = player.events
+            player.events = []
+            for kind, key in events:
+                fire(self, kind, key)
+        player.events = []
+
+    def _win(self):
+        """End the game as won (the win item was taken)."""
+        player = self.player
+        player.add_score(100)
+        self._say(Event("banner", "You win!"), Event("sound", "victory", wait=2000))
+        self._say(f"\nCongratulation! You have obtained the {self.rooms.template.win_item} and won the game!")
+        self._say(f"Final score: {player.score}")
+        self._finish("won")
+
+    def _lose(self, message=None):
+        """End the game as lost in the player's current room.
+        Args:
+        message (str): What happened, or None for the room's trap message.
+        """
+        player = self.player
+        room = player.current_room
+        if message is None:
+            message = room.rules.get("trap", {}).get("message", f"You triggered a trap in the {room.name} and lost!")
+        self._say("\n" + message)
+        self._say(f"Final score: {player.score}")
+        self._say(Event("sound", "trap", wait=2000))
+        metrics.inc("traps_total", room=room.name)
+        self._finish("lost")
+
+    def _dispatch(self, text, parsed=None):
+        """Parse and run a normalised command, queueing its output.
+        Args:
+        text (str): The stripped, lower-case command.
+        parsed (tuple): parse_command(text) if the caller already parsed it.
+        """
+        if not text:
+            self._say("\nPlease enter a command. Type 'help' for a list of commands.")
+            return
+        entry, arg = parsed if parsed is not None else parse_command(text)
+        if entry is None:
+            if not text.replace(" ", "").isalnum():
+                self._say("\nCommand can only contain letters, numbers, and spaces.")
+                self._say("\nTry a direction like 'north' or a command like 'take map'.")
+                return
+        elif entry.arg and not arg and not entry.optional:
+            if entry.usage:
+                self._say(entry.usage)
+                return
+        elif entry.arg and arg and not arg.replace(" ", "").isalnum():
+            self._say(ARGUMENT_ERRORS[entry.arg])
+            return
+        else:
+            entry.handler(self, arg)
+            if not entry.describe or self.finished:
+                return
+        player = self.player
+        if "chest" in player.current_room.rules:
+            self._say(Event("sound", "chest"))
+        self._say("\n" + player.current_room.get_description(player))
+
+    def _dispatch_timed(self, registry, text):
+        """Run _dispatch() and record the parse and command latency by verb."""
+        start = time.perf_counter()
+        parsed = parse_command(text)
+        parse_end = time.perf_counter()
+        self._dispatch(text, parsed)
+        end = time.perf_counter()
+        verb = parsed[0].name if parsed[0] is not None else ("unknown" if text else "empty")
+        keys = _COMMAND_METRICS.get(verb)
+        if keys is None:
+            keys = _COMMAND_METRICS[verb] = (metrics.key("command_seconds", verb=verb), metrics.key("commands_total", verb=verb))
+        registry.observe_key(_PARSE_METRIC, parse_end - start)
+        registry.observe_key(keys[0], end - parse_end)
+        registry.inc_key(keys[1])
+
+    def _move(self, direction):
+        player = self.player
+        next_room_name = player.move(direction)
+        # Exit targets are room names exactly as the world file gives them (checked when it is compiled).
+        if next_room_name and isinstance(next_room_name, str) and next_room_name in self.rooms:
+            player.enter(self.rooms[next_room_name])
+        else:
+            self._say("\n" + (next_room_name if isinstance(next_room_name, str) else "You can't go that way! Try a direction like 'north' or 'east'."))
+
+    @command("leaderboard", describe=False)
+    def _leaderboard(self, arg):
+        self._say(self.player.display_leaderboard(self.leaderboard))
+
+    @command("quit", aliases=("q",))
+    def _quit(self, arg):
+        self._say("\nThanks for playing!")
+        self.finished = True
+        self.outcome = "quit"
+        metrics.inc("games_total", outcome="quit")
+
+    @command("inventory", aliases=("i", "inv"))
+    def _inventory(self, arg):
+        inv = self.player.get_inventory()
+        if isinstance(inv, list) and inv:
+            self._say("\nYour inventory:")
+            self._say(*(f"{i}. {item}" for i, item in enumerate(inv, 1)))
+        else:
+            self._say("\nYour inventory is empty")
+
+    @command("hint")
+    def _hint(self, arg):
+        import hints
+        self._say("\n" + hints.hint(self, self.hint_wait))
+
+    @command("help", aliases=("h", "?"))
+    def _help(self, arg):
+        self._say("\nAvialable Commands:")
+        self._say("- Movement: north, east, south, west")
+        self._say("- Action: take <item>, use <item>, drop <item>, solve <answer>, talk, inventory, hint, save, load, help, quit")
+        self._say("- Save slots: save <slot>, load <slot>, saves")
+        self._say("- Time travel: undo, redo, rewind <count>")
+        self._say(f"Goal: Find the {self.rooms.template.win_item} and escape with it!")
+
+    @command("save", arg="slot", optional=True)
+    def _save(self, arg):
+        if arg:
+            message = self.slots.save(arg, self.player, self.rooms)
+        elif self.store is not None:
+            message = self.store.save(self.player, self.rooms)
+        elif self.autosave is not None and self.autosave.filename == self.save_file:
+            message = self.autosave.save_now(self)
+        else:
+            message = save_game(self.player, self.rooms, self.save_file)
+        metrics.inc("saves_total", result="error" if message.startswith("Error") else "ok")
+        self._say("\n" + message)
+
+    @command("load", arg="slot", optional=True)
+    def _load(self, arg):
+        if arg:
+            loaded_player, loaded_world, message = self.slots.load(arg, self.rooms.template, self.player.max_inventory)
+            if loaded_player:
+                self.player = loaded_player
+                self.rooms = loaded_world
+                self._after_load()
+                loaded_player.enter(loaded_player.current_room)
+                metrics.inc("loads_total", result="ok")
             else:
-                print(f"\nYou don't have a {item_name} to drop.")
-        elif command.startswith("use "):
-            item_name = command[4:].strip()
-            if not item_name:
-                print("\nPlease specify an item to use (e.g 'use map').")
-                continue
-            if not item_name.replace(" ", "").isalnum():
-                print("\nItem names can only contain letters, numbers, and spaces.")
-                continue
-            result = next((item.use(player, rooms) for item in player.inventory if item.name == item_name), None)
-            if result:
-                print(f"\n{result}")
+                metrics.inc("loads_total", result="error")
+            self._say("\n" + message)
+            return
+        if self.autosave is not None:
+            self.autosave.writer.flush()
+        if self.store is not None:
+            loaded_player, loaded_world, message = self.store.load(self.rooms.template)
+            if loaded_player:
+                loaded_player.max_inventory = self.player.max_inventory
+                self.player = loaded_player
+                self.rooms = loaded_world
+                self._after_load()
+                loaded_player.enter(loaded_player.current_room)
+                metrics.inc("loads_total", result="ok")
+                self._say("\nGame loaded successfully!")
             else:
-                temp_item = Item(item_name)
-                print(f"\n{temp_item.use(player, rooms)}")
+                metrics.inc("loads_total", result="error")
+                self._say("\n" + message)
+            return
+        loaded_player, loaded_rooms, message = load_game(self.save_file)
+        if loaded_player and loaded_rooms:
+            loaded_player.max_inventory = self.player.max_inventory
+            self.player = loaded_player
+            self.rooms.restore(loaded_rooms)
+            self._after_load()
+            self.player.enter(self.rooms[self.player.current_room.name])
+            metrics.inc("loads_total", result="ok")
+            self._say("\nGame loaded successfully!")
+        else:
+            metrics.inc("loads_total", result="error")
+            self._say("\n" + message)
+
+    def _after_load(self):
+        """Forget what a successful load replaced: the undo history, and the journals' sync points.
+
+        Undo steps are not kept across a load (a failed load keeps them). A journal appends the
+        rooms changed since its last save, which is only right while the session keeps the World
+        it saved; after a load the rooms are replaced or restored, so every journal (the save
+        file's and the slots') writes a full snapshot on its next save.
+        """
+        if self.history is not None:
+            self.history.clear()
+        for store in (self.store, *self.slots.stores()):
+            if isinstance(store, SaveJournal):
+                store.synced_clock = None
+
+    @command("saves", describe=False)
+    def _saves(self, arg):
+        slots = self.slots.list()
+        if not slots:
+            self._say("\nYou have no save slots yet. Type 'save <slot>' to save to one.")
+            return
+        self._say("\nYour save slots:")
+        self._say(*(f"- {slot}: {info.get('room')}, score {info.get('score')}, saved "
+                    f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(info.get('saved', 0)))}"
+                    for slot, info in slots.items()))
 
-        if player.current_room.name == "Treasure Room":
-            pygame.mixer.Sound("sound/chest.wav").play()
+    @command("undo")
+    def _undo(self, arg):
+        self._rewind("1")
 
-        elif command in ["north", "east", "south", "west"]:
-            next_room_name = player.move(command)  
-            if next_room_name  and isinstance(next_room_name, str) and next_room_name.title() in rooms:
-                player.current_room = rooms[next_room_name.title()]
+    @command("redo")
+    def _redo(self, arg):
+        if self.history is None:
+            self._say("\nUndo is turned off in this game.")
+        elif self.history.redo(self):
+            self._say("\nRedone.")
+        else:
+            self._say("\nThere is nothing to redo.")
+
+    @command("rewind", arg="count", usage="\nPlease specify how many commands to undo (e.g., 'rewind 3').")
+    def _rewind(self, count):
+        if self.history is None:
+            self._say("\nUndo is turned off in this game.")
+            return
+        if not count.isdigit() or int(count) < 1:
+            self._say("\nPlease specify how many commands to undo as a number (e.g., 'rewind 3').")
+            return
+        undone = self.history.undo(self, int(count))
+        if not undone:
+            self._say("\nThere is nothing to undo.")
+        elif undone == 1:
+            self._say("\nUndone.")
+        else:
+            self._say(f"\nRewound {undone} commands.")
+
+    @command("talk")
+    def _talk(self, arg):
+        self._say("\n" + self.player.talk())
+
+    @command("solve", arg="answer", usage="\nPlease specify an answer to solve (e.g, 'solve echo').")
+    def _solve(self, answer):
+        player = self.player
+        room = player.current_room
+        if room.npc:
+            npc = room.rules.get("npc", {})
+            if answer.lower() == room.npc[2].lower():
+                if "reward" in npc:
+                    room.add_item(Item.load(npc["reward"]))
+                player.add_score(npc.get("points", 0))
+                self._say("\n" + npc.get("message", f"Correct! {room.npc[0]} is pleased."))
+                room.npc = None
+                player.events.append((FLAG_CHANGE, (room.name, "npc")))
             else:
-                print("\n" + (next_room_name if isinstance(next_room_name, str) else "You can't go that way! Try a direction like 'north' or 'east'."))
-        description = player.current_room.get_description(player)
-        print("\n" + description)
-            
+                self._say(f"\n'{answer}' is incorrect. Try again with 'solve <answer>'.")
+        else:
+            self._say("\n" + player.solve_riddle(answer))
 
+    @command("take", aliases=("get",), arg="item")
+    def _take(self, item_name):
+        result = self.player.take(item_name)
+        if result is False:
+            self._say(f"\nThere's no {item_name} here to take.")
+        elif result is not True:
+            self._say(f"\n{result}")
 
-               
-            
-def main():
-    while True:
-        play_again = play_game()
-        if not play_again:
-            break
+    @command("drop", arg="item")
+    def _drop(self, item_name):
+        if self.player.drop(item_name):
+            self._say(f"\nYou dropped the {item_name}.")
+        else:
+            self._say(f"\nYou don't have a {item_name} to drop.")
+
+    @command("use", arg="item", usage="\nPlease specify an item to use (e.g.,'use map').")
+    def _use(self, item_name):
+        item = self.player.inventory.get(item_name)
+        result = item.use(self.player, self.rooms) if item is not None else None
+        if result:
+            self._say(f"\n{result}")
+        else:
+            self._say(f"\n{Item(item_name).use(self.player, self.rooms)}")
+
+
+for _direction in ("north", "east", "south", "west"):
+    register_command(_direction, lambda session, arg, direction=_direction: session._move(direction), aliases=(_direction[0],))
+
+
+def show_event(event):
+    """Render one session output item on the terminal.
+    Args:
+    event (str or Event): A line of text, or a banner/sound event.
+    """
+    if not isinstance(event, Event):
+        print(event)
+    elif event.kind == "banner":
+        print(banner(event.value))
+    elif event.kind == "sound":
+        backend = audio.get_backend()
+        backend.play(event.value, event.wait)
+        for error in backend.take_errors():
+            print(error)
+
+
+def banner(text):
+    """Render text as ASCII art, importing art only when a banner is shown.
+    Args:
+    text (str): The banner text.
+
+    Returns:
+    str: The ASCII art.
+    """
+    import art
+    return art.text2art(text)
+
+
+def play_game(max_inventory=3, world=None, save_file="savegame.json", autosave_every=None, autosave_interval=None, leaderboard=None, record=None, undo_depth=100, data_dir="."):
+    """Start a new game session on the terminal, reading commands from input().
+    Args:
+    max_inventory (int): How many items the player can carry.
+    world (WorldTemplate): The world to play, or None for the bundled default world.
+    save_file (str): The file used by 'save' and 'load' ('.journal' for incremental saves, '.snap' for binary snapshots).
+    autosave_every (int): Autosave after this many commands, or None.
+    autosave_interval (float): Autosave after a command once this many seconds have passed, or None.
+    leaderboard (Leaderboard): The high scores to show and update, or None for leaderboard.db.
+    record (str): A log file to record the game to for 'adv.py --replay', or None.
+    undo_depth (int): How many commands 'undo' and 'rewind' can take back (0 turns them off).
+    data_dir (str): The folder holding the player's save slots.
+    
+    Returns:
+    bool: False once the player wins, loses or quits.
+    """
+    print(banner("Text Adventure"))
+    # Start the sound thread now so effects are decoded while the player types their name.
+    audio.get_backend()
+    print("Welcome to the Text Adventure Game!")
+    print("You goal: Find the golden crown and escape with it!")
+    player_name = input("Please enter your name:").strip()
+    while not player_name:
+        player_name = input("Name cannot be empty. Please enter your name:").strip()
+    autosave = None
+    if autosave_every or autosave_interval is not None:
+        autosave = Autosave(autosave_file(save_file), autosave_every, autosave_interval)
+    # A recorded game waits for the hint table, so its log replays with the same hints.
+    hint_wait = None if record else HINT_WAIT
+    session = GameSession(player_name, rooms=world, save_file=save_file, max_inventory=max_inventory, autosave=autosave, leaderboard=leaderboard, undo_depth=undo_depth, data_dir=data_dir, hint_wait=hint_wait)
+    recorder = None
+    if record:
+        import replay
+        recorder = replay.Recorder(record, session)
+
+    print("\nAvialable Commands:")
+    print("-Movement: north, east, south, west")
+    print("-Actions: take <item>, use <item>, drop <item> solve <answer>, talk, inventory, hint, save, load, help, quit")
+    print("-Save slots: save <slot>, load <slot>, saves")
+    print("-Time travel: undo, redo, rewind <count>")
+    print("Example: 'take map' or 'use sword' or 'leaderboard'")
+    print("-----")
+    print("\n" + session.look())
+    print("-----")
+
+    while not session.finished:
+        command = input("What do you want to do? ")
+        events = session.step(command)
+        if recorder is not None:
+            recorder.record(command, events)
+        for event in events:
+            show_event(event)
+    if recorder is not None:
+        recorder.close()
+    error = session.close()
+    if error:
+        print(error)
+    # Let the final victory or trap sound play out before the program exits.
+    audio.get_backend().close()
+    return False
+
+
+def autosave_file(save_file):
+    """Get the JSON file autosaves are written to for a save file.
+    Args:
+    save_file (str): The session's save file.
+
+    Returns:
+    str: The save file itself, or '<name>.autosave.json' next to a '.journal' or '.snap' save file.
+    """
+    if save_file.endswith((".journal", ".snap")):
+        return os.path.splitext(save_file)[0] + ".autosave.json"
+    return save_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Text Adventure Game")
+    parser.add_argument("--serve", action="store_true", help="host games for many players over TCP/telnet")
+    parser.add_argument("--http", action="store_true", help="serve the stateless HTTP JSON API, with game state kept in signed tokens")
+    parser.add_argument("--secret", default=os.environ.get("ADV_TOKEN_SECRET"), help="key signing --http state tokens (default: $ADV_TOKEN_SECRET); share it between workers")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on with --serve or --http")
+    parser.add_argument("--port", type=int, default=4000, help="TCP port to listen on with --serve or --http")
+    parser.add_argument("--max-connections", type=int, default=1000, help="concurrent player cap with --serve")
+    parser.add_argument("--idle-timeout", type=float, default=300.0, help="seconds before an idle player is disconnected")
+    parser.add_argument("--max-inventory", type=int, default=3, help="how many items the player can carry")
+    parser.add_argument("--world", help="path of a world JSON file to play (default: the bundled world)")
+    parser.add_argument("--data-dir", default=os.environ.get("ADV_DATA_DIR", "."), help="folder for the save file, save slots and leaderboard (default: $ADV_DATA_DIR or the current folder)")
+    parser.add_argument("--save-file", default="savegame.json", help="save file; a name ending in .journal saves incrementally, .snap in the binary snapshot format")
+    parser.add_argument("--autosave-every", type=int, default=None, metavar="N", help="autosave in the background every N commands")
+    parser.add_argument("--autosave-interval", type=float, default=None, metavar="SECONDS", help="autosave in the background when this many seconds have passed")
+    parser.add_argument("--undo-depth", type=int, default=None, metavar="N", help="how many commands undo/rewind can take back (default 100, 10 with --serve; 0 turns undo off)")
+    parser.add_argument("--leaderboard", default=DEFAULT_LEADERBOARD_FILE, help="leaderboard database file (relative to --data-dir)")
+    parser.add_argument("--top-k", type=int, default=5, help="how many high scores the leaderboard shows")
+    parser.add_argument("--no-audio", action="store_true", help="play without sound effects")
+    parser.add_argument("--record", metavar="LOG", help="record the game's commands and output to a log ('.gz' to compress)")
+    parser.add_argument("--replay", nargs="+", metavar="LOG", help="replay recorded logs headlessly and report where they diverge")
+    parser.add_argument("--script", nargs="+", metavar="FILE", help="play scripts of ';'-separated commands ('-' reads stdin) without a terminal")
+    parser.add_argument("--quiet", action="store_true", help="with --script, print only one result line per script")
+    parser.add_argument("--json-events", action="store_true", help="with --script, print each command's output and events as JSON lines")
+    parser.add_argument("--metrics-json", metavar="FILE", help="record latency and counter metrics and write them to a JSON file")
+    parser.add_argument("--metrics-prom", metavar="FILE", help="record metrics and write them in the Prometheus text format")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, metavar="SECONDS", help="how often the metrics files are rewritten")
+    args = parser.parse_args(argv)
+    # Relative paths are taken from the data folder; os.path.join() keeps absolute ones as they are.
+    save_file = os.path.join(args.data_dir, args.save_file)
+    undo_depth = 100 if args.undo_depth is None else args.undo_depth
+    if args.replay:
+        import replay
+        sys.exit(1 if replay.replay_logs(args.replay) else 0)
+    if args.no_audio:
+        audio.disable()
+    exporter = None
+    if args.metrics_json or args.metrics_prom:
+        exporter = metrics.Exporter(metrics.enable(), args.metrics_json, args.metrics_prom, args.metrics_interval)
+    try:
+        world = load_world(args.world) if args.world else None
+        if args.script:
+            import batch
+            sys.exit(1 if batch.run_scripts(args.script, world, save_file, args.max_inventory, args.quiet, args.json_events,
+                                            undo_depth=undo_depth) else 0)
+        leaderboard = get_leaderboard(os.path.join(args.data_dir, args.leaderboard), args.top_k)
+        if args.serve:
+            import server
+            server.serve(args.host, args.port, args.max_connections, args.idle_timeout, world, leaderboard, args.data_dir,
+                         server.UNDO_DEPTH if args.undo_depth is None else args.undo_depth, args.max_inventory)
+            return
+        if args.http:
+            import httpapi
+            httpapi.serve(args.host, args.port, world, leaderboard, args.secret, args.max_inventory)
+            return
+        while True:
+            play_again = play_game(args.max_inventory, world, save_file, args.autosave_every, args.autosave_interval, leaderboard, args.record, undo_depth, args.data_dir)
+            if not play_again:
+                break
+    finally:
+        if exporter is not None:
+            exporter.close()
+            if exporter.last_error:
+                print(exporter.last_error)
 if __name__== "__main__":
-    main()
\ No newline at end of file
+    # Let 'import adv' in other modules (server, replay) get this module, not a second copy.
+    sys.modules.setdefault("adv", sys.modules[__name__])
+    main()
@@ -0,0 +1,178 @@
+"""Sound effects for the terminal game, behind a lazily chosen backend.
+
+Nothing here imports pygame until the backend is first used. Sounds are decoded once
+and played by a background thread, so the game never waits for the disk or the mixer.
+If pygame is missing, no audio device is available, or audio was disabled (--no-audio),
+sounds are silently skipped.
+"""
+import collections
+import os
+import queue
+import threading
+import time
+
+import metrics
+
+SOUND_DIR = "sound"
+
+
+class NullAudio:
+    """An audio backend that plays nothing."""
+    name = "null"
+
+    def play(self, sound, wait=0):
+        """Skip a sound.
+        Args:
+        sound (str): The sound name (e.g., 'victory').
+        wait (int): Milliseconds the sound would have kept the program alive.
+        """
+
+    def take_errors(self):
+        """Get the errors met while loading sounds.
+        Returns:
+        list: Always empty.
+        """
+        return []
+
+    def close(self, timeout=None):
+        """Nothing to stop."""
+
+
+class SoundManager:
+    """Decode sound effects once and play them from a fire-and-forget queue.
+
+    play() only checks the rate limit and queues the sound. A background thread imports
+    pygame, initializes the mixer, decodes every '.wav' file in the sound folder, and
+    then plays queued sounds from that cache. Playing the same sound again within
+    min_interval seconds is skipped, as is anything queued while the queue is full.
+
+    Attributes:
+    sound_dir (str): The folder holding '<sound>.wav' files.
+    min_interval (float): Minimum seconds between two plays of the same sound.
+    available (bool): False once pygame or the audio device turned out to be missing.
+    played (int): Sounds played so far.
+    dropped (int): Sounds skipped by the rate limit, a full queue or missing audio.
+    """
+    name = "pygame"
+
+    def __init__(self, sound_dir=SOUND_DIR, min_interval=1.0, max_queue=32):
+        self.sound_dir = sound_dir
+        self.min_interval = min_interval
+        self.available = True
+        self.played = 0
+        self.dropped = 0
+        self._errors = collections.deque()
+        self._sounds = {}
+        self._last_played = {}
+        self._hold_until = 0.0
+        self._pygame = None
+        self._queue = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name="sound-player", daemon=True)
+        self._thread.start()
+
+    def play(self, sound, wait=0):
+        """Queue a sound without waiting for it.
+        Args:
+        sound (str): The sound name; the file played is <sound_dir>/<sound>.wav.
+        wait (int): Milliseconds the sound should keep playing before close() returns.
+        """
+        now = time.monotonic()
+        last = self._last_played.get(sound)
+        if not self.available or (last is not None and now - last < self.min_interval):
+            self.dropped += 1
+            metrics.inc("sounds_total", sound=sound, result="dropped")
+            return
+        self._last_played[sound] = now
+        try:
+            self._queue.put_nowait((sound, wait))
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc("sounds_total", sound=sound, result="dropped")
+
+    def take_errors(self):
+        """Get the errors met while loading sounds since the last call.
+        Returns:
+        list: Error messages, oldest first.
+        """
+        errors = []
+        while self._errors:
+            errors.append(self._errors.popleft())
+        return errors
+
+    def close(self, timeout=3.0):
+        """Let queued sounds start and finish their wait time, then stop the thread.
+        Args:
+        timeout (float): Seconds to wait at most.
+        """
+        if not self.available:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        remaining = min(self._hold_until, deadline) - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def _run(self):
+        try:
+            import pygame
+            pygame.mixer.init()
+        except Exception:
+            # ImportError without pygame; pygame.error without an audio device.
+            self.available = False
+            return
+        self._pygame = pygame
+        if os.path.isdir(self.sound_dir):
+            for filename in sorted(os.listdir(self.sound_dir)):
+                if filename.endswith(".wav"):
+                    self._load(filename[:-len(".wav")])
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            sound, wait = item
+            effect = self._load(sound)
+            if effect is None:
+                metrics.inc("sounds_total", sound=sound, result="missing")
+                continue
+            start = time.perf_counter()
+            effect.play()
+            metrics.observe("sound_seconds", time.perf_counter() - start, sound=sound)
+            metrics.inc("sounds_total", sound=sound, result="played")
+            self.played += 1
+            self._hold_until = max(self._hold_until, time.monotonic() + wait / 1000)
+
+    def _load(self, sound):
+        """Get a decoded sound, reading its file only the first time (failures are cached too)."""
+        if sound in self._sounds:
+            return self._sounds[sound]
+        try:
+            effect = self._pygame.mixer.Sound(os.path.join(self.sound_dir, f"{sound}.wav"))
+        except (self._pygame.error, FileNotFoundError) as e:
+            effect = None
+            self._errors.append(f"Error playing {sound} sound: {e}")
+        self._sounds[sound] = effect
+        return effect
+
+
+_backend = None
+
+
+def disable():
+    """Use the null backend from now on (e.g., for --no-audio)."""
+    global _backend
+    _backend = NullAudio()
+
+
+def get_backend():
+    """Get the audio backend, starting the sound thread on first use.
+    Returns:
+    SoundManager or NullAudio: The sound manager, or the null backend if audio was disabled.
+    """
+    global _backend
+    if _backend is None:
+        _backend = SoundManager()
+    return _backend
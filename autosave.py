@@ -0,0 +1,92 @@
+"""Background writer thread for autosaves.
+
+The game thread hands over cheap snapshots with submit(); a single writer thread
+serializes and writes them. If several snapshots arrive while a write is in progress,
+only the newest is written (older ones are coalesced away).
+"""
+import threading
+
+
+class BackgroundWriter:
+    """Write snapshots on a background thread, keeping only the newest pending one.
+
+    Attributes:
+    write (function): Called as write(snapshot) on the writer thread.
+    written (int): Snapshots written so far.
+    coalesced (int): Snapshots replaced by a newer one before they were written.
+    last_result: The value returned by the last write.
+    last_error (Exception): The last exception raised by write, or None.
+    """
+    def __init__(self, write, name="autosave-writer"):
+        self.write = write
+        self.name = name
+        self.written = 0
+        self.coalesced = 0
+        self.last_result = None
+        self.last_error = None
+        self._cond = threading.Condition()
+        self._pending = None
+        self._has_pending = False
+        self._busy = False
+        self._closed = False
+        self._thread = None
+
+    def submit(self, snapshot):
+        """Queue a snapshot for writing, replacing any snapshot still waiting.
+        Args:
+        snapshot: The data passed to write().
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("The writer is closed.")
+            if self._has_pending:
+                self.coalesced += 1
+            self._pending = snapshot
+            self._has_pending = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every submitted snapshot has been written.
+        Args:
+        timeout (float): Seconds to wait at most, or None to wait as long as it takes.
+
+        Returns:
+        bool: True if everything was written, False on timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._has_pending and not self._busy, timeout)
+
+    def close(self, timeout=None):
+        """Flush pending work and stop the writer thread.
+        Args:
+        timeout (float): Seconds to wait for the flush at most.
+        """
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._has_pending or self._closed)
+                if not self._has_pending:
+                    return
+                snapshot = self._pending
+                self._pending = None
+                self._has_pending = False
+                self._busy = True
+            try:
+                self.last_result = self.write(snapshot)
+                self.written += 1
+            except Exception as e:
+                self.last_error = e
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
@@ -0,0 +1,167 @@
+"""Run scripted games without a terminal.
+
+A script is a text file (or stdin, given as '-') of commands, one pipeline per line, with
+commands in a pipeline separated by ';'. Blank lines and lines starting with '#' are
+skipped:
+
+    # Get past the Living Room
+    take map; east; use map
+    east
+
+Each script is played in a fresh session whose saves go to a temporary folder, so scripts
+never see each other's saves, and scores are not added to the leaderboard. Output is
+collected per pipeline and written with one write() call; it is flushed once per script,
+or after every line when reading stdin so a driving program sees each reply:
+
+    python adv.py --script smoke/*.txt --quiet
+    echo "north; take shield; west" | python adv.py --script - --json-events
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import adv
+
+
+def read_pipelines(lines):
+    """Split script lines into pipelines of commands.
+    Args:
+    lines (iterable): The script's lines.
+
+    Yields:
+    tuple: (line number, list of commands) for each line holding commands.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        commands = [command.strip() for command in line.split(";")]
+        commands = [command for command in commands if command]
+        if commands:
+            yield number, commands
+
+
+def render_text(output):
+    """Turn session output into lines of text, leaving out sounds.
+    Args:
+    output (list): What GameSession.step() returned.
+
+    Returns:
+    list: The text lines.
+    """
+    lines = []
+    for item in output:
+        if not isinstance(item, adv.Event):
+            lines.append(item)
+        elif item.kind == "banner":
+            lines.append(f"*** {item.value} ***")
+    return lines
+
+
+def run_script(name, lines, out, world=None, save_file="savegame.json", max_inventory=3, quiet=False, json_events=False, flush_lines=False, data_dir=".", undo_depth=100):
+    """Play one script.
+    Args:
+    name (str): The script's name, used in the output.
+    lines (iterable): The script's lines.
+    out (file): Where output is written.
+    world (WorldTemplate): The world, or None for the bundled default world.
+    save_file (str): The save file for 'save' and 'load' (its extension picks the format).
+    max_inventory (int): How many items the player can carry.
+    quiet (bool): Write only the summary line.
+    json_events (bool): Write one JSON object per command and one for the summary.
+    flush_lines (bool): Flush after every line rather than once at the end.
+    data_dir (str): The folder holding the save slots of 'save <slot>' and 'load <slot>'.
+    undo_depth (int): How many commands 'undo' and 'rewind' can take back (0 turns them off).
+
+    Returns:
+    GameSession: The finished (or abandoned) session.
+    """
+    session = adv.GameSession("script", rooms=world, save_file=save_file, record_scores=False, max_inventory=max_inventory, undo_depth=undo_depth, data_dir=data_dir)
+    commands = 0
+    if json_events:
+        out.write(json.dumps({"script": name, "line": 0, "command": None, "output": [session.look()]}) + "\n")
+    elif not quiet:
+        out.write(session.look() + "\n")
+    for number, pipeline in read_pipelines(lines):
+        chunks = []
+        for command in pipeline:
+            output = session.step(command)
+            commands += 1
+            if json_events:
+                chunks.append(json.dumps({
+                    "script": name,
+                    "line": number,
+                    "command": command,
+                    "output": [item for item in output if not isinstance(item, adv.Event)],
+                    "events": [{"kind": item.kind, "value": item.value} for item in output if isinstance(item, adv.Event)],
+                }) + "\n")
+            elif not quiet:
+                chunks.append(f"> {command}\n")
+                chunks.extend(line + "\n" for line in render_text(output))
+            if session.finished:
+                break
+        if chunks:
+            out.write("".join(chunks))
+        if flush_lines:
+            out.flush()
+        if session.finished:
+            break
+    session.close()
+    outcome = session.outcome or "unfinished"
+    if json_events:
+        out.write(json.dumps({"script": name, "outcome": outcome, "score": session.player.score, "commands": commands}) + "\n")
+    else:
+        out.write(f"{name}: {outcome}, score {session.player.score}, {commands} commands\n")
+    out.flush()
+    return session
+
+
+def run_scripts(paths, world=None, save_file="savegame.json", max_inventory=3, quiet=False, json_events=False, out=None, undo_depth=100):
+    """Play scripts one after another, each in a fresh session.
+    Args:
+    paths (list): Script files, or '-' for stdin.
+    world (WorldTemplate): The world, or None for the bundled default world.
+    save_file (str): The save file name; only its extension is used, to pick the save format.
+    max_inventory (int): How many items the player can carry.
+    quiet (bool): Write only one summary line per script.
+    json_events (bool): Write JSON lines instead of text.
+    out (file): Where output is written (default: stdout).
+    undo_depth (int): How many commands 'undo' and 'rewind' can take back in each script (0 turns them off).
+
+    Returns:
+    int: The number of scripts that could not be read.
+    """
+    out = out or sys.stdout
+    errors = 0
+    work_dir = tempfile.mkdtemp(prefix="adv-script-")
+    save_path = os.path.join(work_dir, "save" + (os.path.splitext(save_file)[1] or ".json"))
+    start = time.perf_counter()
+    try:
+        for path in paths:
+            for name in os.listdir(work_dir):
+                leftover = os.path.join(work_dir, name)
+                if os.path.isdir(leftover):
+                    shutil.rmtree(leftover)
+                else:
+                    os.remove(leftover)
+            if path == "-":
+                run_script("<stdin>", sys.stdin, out, world, save_path, max_inventory, quiet, json_events, flush_lines=True, data_dir=work_dir, undo_depth=undo_depth)
+            else:
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        lines = f.readlines()
+                except (OSError, UnicodeDecodeError) as e:
+                    print(f"{path}: cannot read script ({e})", file=sys.stderr)
+                    errors += 1
+                    continue
+                run_script(path, lines, out, world, save_path, max_inventory, quiet, json_events, data_dir=work_dir, undo_depth=undo_depth)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - start
+    if len(paths) > 1 and elapsed > 0 and not json_events:
+        out.write(f"{len(paths)} scripts in {elapsed:.2f}s ({len(paths) / elapsed:.0f} scripts/sec), {errors} unreadable\n")
+        out.flush()
+    return errors
@@ -0,0 +1,81 @@
+"""Micro-benchmark of command parsing and dispatch.
+
+Reports the cost per command of parse_command() alone and of a full GameSession.step()
+(parse, dispatch, handler and room description) over a mix of typical commands, with
+metrics disabled and, with --metrics, enabled. --rules adds that many world triggers
+on other items and room flags, to show that rules a command does not touch cost nothing.
+
+    python benchmarks/bench_commands.py --repeat 200000 --metrics --rules 1000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import adv
+import hints
+import metrics
+
+COMMANDS = ["north", "s", "take map", "get bell", "drop map", "use map", "i", "hint", "talk", "solve echo", "dance", "e", "w"]
+
+
+def bench_parse(repeat):
+    """Return nanoseconds per parse_command() call."""
+    commands = COMMANDS * (repeat // len(COMMANDS) + 1)
+    parse = adv.parse_command
+    start = time.perf_counter()
+    for text in commands:
+        parse(text)
+    return (time.perf_counter() - start) / len(commands) * 1e9
+
+
+def world_with_rules(count):
+    """Load the default world with `count` extra triggers."""
+    with open(adv.DEFAULT_WORLD_FILE, encoding="utf-8") as f:
+        data = json.load(f)
+    rooms = list(data["rooms"])
+    triggers = data.setdefault("triggers", [])
+    for i in range(count):
+        if i % 3 == 0:
+            triggers.append({"on": "gain-item", "item": f"relic {i}", "message": "You found a relic."})
+        elif i % 3 == 1:
+            triggers.append({"on": "lose-item", "item": f"relic {i}", "in_room": rooms[i % len(rooms)], "lose": "The relic shatters."})
+        else:
+            triggers.append({"on": "flag-change", "room": rooms[i % len(rooms)], "flag": "solved", "has": [f"relic {i}"], "win": True})
+    return adv.WorldTemplate(data)
+
+
+def bench_step(repeat, world=None):
+    """Return nanoseconds per GameSession.step() call."""
+    session = adv.GameSession("bench", rooms=world, record_scores=False)
+    # Build the 'hint' command's table up front so it is not part of the timing.
+    hints.get_table(session.rooms.template)
+    commands = COMMANDS * (repeat // len(COMMANDS) + 1)
+    step = session.step
+    start = time.perf_counter()
+    for text in commands:
+        step(text)
+    return (time.perf_counter() - start) / len(commands) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200000)
+    parser.add_argument("--metrics", action="store_true", help="also time session.step() with metrics enabled")
+    parser.add_argument("--rules", type=int, default=0, help="also time session.step() in a world with this many extra triggers")
+    args = parser.parse_args()
+    print(f"parse_command: {bench_parse(args.repeat):8.0f} ns/command")
+    print(f"session.step:  {bench_step(args.repeat):8.0f} ns/command")
+    if args.metrics:
+        metrics.enable()
+        print(f"  with metrics: {bench_step(args.repeat):7.0f} ns/command")
+        metrics.disable()
+    if args.rules:
+        print(f"  with {args.rules} rules: {bench_step(args.repeat, world_with_rules(args.rules)):7.0f} ns/command")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Startup benchmark: how long a cold 'import adv' takes in a fresh interpreter.
+
+Runs 'python -X importtime -c "import adv"' several times, reports the median cumulative
+import time of adv and the slowest modules it pulls in, and checks that importing adv
+does not load pygame or art (they are loaded only when a sound or banner is played).
+Exits with status 1 if the median is over the target.
+
+    python benchmarks/bench_import.py --runs 10 --target-ms 50
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECK = "import adv, sys; print(','.join(name for name in ('pygame', 'art') if name in sys.modules))"
+
+
+def import_times():
+    """Import adv in a fresh interpreter.
+    Returns:
+    dict: adv and each module it imported -> cumulative import time in microseconds.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import adv"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            # A top-level import: interpreter startup (site) or adv itself, which comes last.
+            if name.strip() != "adv":
+                times = {}
+                continue
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=50.0, help="fail if the median import is slower")
+    parser.add_argument("--top", type=int, default=8, help="how many of the slowest imports to list")
+    args = parser.parse_args()
+
+    # The first run compiles bytecode; measure the cached imports a user sees.
+    import_times()
+    runs = [import_times() for _ in range(args.runs)]
+    median = statistics.median(run["adv"] for run in runs) / 1000
+    print(f"import adv: {median:.1f} ms median over {args.runs} runs (target {args.target_ms:.0f} ms)")
+    last = runs[-1]
+    for name in sorted(last, key=last.get, reverse=True)[1:args.top + 1]:
+        print(f"  {name:<24} {last[name] / 1000:6.1f} ms")
+
+    loaded = subprocess.run([sys.executable, "-c", CHECK], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    if loaded:
+        print(f"importing adv loaded: {loaded}")
+    if loaded or median > args.target_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Memory benchmark: bytes per live session.
+
+Builds N sessions, plays a few commands in each and reports the traced allocation per
+session. 'shared' sessions use the process-wide world template and interned items;
+'rebuild' sessions each get their own fully built rooms, as every game did before the
+world template existed. Shared sessions are also measured at each --undo-depth, after the
+short game and after a long one (--long-rounds more rounds of moves),
+since each kept undo step holds the rooms and player state its command changed.
+
+    python benchmarks/bench_memory.py --sessions 10000 --undo-depth 0 10 100
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import adv
+import server
+
+COMMANDS = ["take map", "east", "use map", "take bell", "west", "inventory"]
+# One round of a long game: moves, each of which is kept as an undo step.
+LONG_ROUND = ["east", "west"]
+
+
+def measure(sessions, mode, undo_depth=100, rounds=0):
+    """Return the traced bytes per session for the given mode ('shared' or 'rebuild')."""
+    adv.default_world()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    live = []
+    for i in range(sessions):
+        rooms = None
+        if mode == "rebuild":
+            rooms = adv.load_world(adv.DEFAULT_WORLD_FILE)
+            for name in rooms:
+                rooms[name]
+        session = adv.GameSession(f"player{i}", rooms=rooms, record_scores=False, undo_depth=undo_depth)
+        for command in COMMANDS + LONG_ROUND * rounds:
+            session.step(command)
+        session.step("")
+        live.append(session)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return total / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--undo-depth", type=int, nargs="*", default=[0, server.UNDO_DEPTH, 100],
+                        help="undo depths to measure shared sessions at (the server's default is %d)" % server.UNDO_DEPTH)
+    parser.add_argument("--long-rounds", type=int, default=60, help="rounds of moves in a long game")
+    args = parser.parse_args()
+    for mode in ("rebuild", "shared"):
+        print(f"{mode:8s} {measure(args.sessions, mode):10.0f} bytes/session ({args.sessions} sessions)")
+    for depth in args.undo_depth:
+        short = measure(args.sessions, "shared", depth)
+        long = measure(args.sessions, "shared", depth, args.long_rounds)
+        print(f"shared, undo depth {depth:3d}: {short:10.0f} bytes/session, {long:10.0f} after "
+              f"{len(COMMANDS) + len(LONG_ROUND) * args.long_rounds} commands")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Save benchmark: full JSON dump (save_game) versus the incremental journal (SaveJournal).
+
+For worlds of growing size, a player walks a corridor picking up one item per room and
+saves after every command. Reports the mean save latency and bytes written per save.
+
+    python benchmarks/bench_saves.py --sizes 10 1000 10000 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import adv
+
+
+def corridor_world(size):
+    """Build a world of `size` rooms in a line, each holding one pebble."""
+    rooms = {}
+    for i in range(size):
+        exits = {}
+        if i:
+            exits["south"] = f"Room {i - 1}"
+        if i < size - 1:
+            exits["north"] = f"Room {i + 1}"
+        rooms[f"Room {i}"] = {
+            "description": f"Room number {i}.",
+            "exits": exits,
+            "items": [{"type": "Item", "name": "pebble", "description": "A smooth pebble."}],
+        }
+    return adv.WorldTemplate({"name": f"corridor{size}", "start": "Room 0", "rooms": rooms})
+
+
+def bench(world, save_file, saves):
+    """Return (mean seconds per save, mean bytes per save) for one save format."""
+    session = adv.GameSession(rooms=world, save_file=save_file, record_scores=False, max_inventory=None)
+    elapsed = 0.0
+    written = 0
+    commands = ["take pebble", "north"]
+    for i in range(saves):
+        session.step(commands[i % 2])
+        before = os.path.getsize(save_file) if os.path.exists(save_file) else 0
+        start = time.perf_counter()
+        session.step("save")
+        elapsed += time.perf_counter() - start
+        after = os.path.getsize(save_file)
+        # A compaction rewrites the file, so count its whole size.
+        written += after - before if after > before else after
+    return elapsed / saves, written / saves
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000, 100000])
+    parser.add_argument("--saves", type=int, default=100)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'rooms':>8} {'full ms':>9} {'full bytes':>11} {'journal ms':>11} {'journal bytes':>14}")
+        for size in args.sizes:
+            world = corridor_world(size)
+            full_time, full_bytes = bench(world, os.path.join(directory, f"full{size}.json"), args.saves)
+            journal_time, journal_bytes = bench(world, os.path.join(directory, f"inc{size}.journal"), args.saves)
+            print(f"{size:8d} {full_time * 1000:9.2f} {full_bytes:11.0f} {journal_time * 1000:11.3f} {journal_bytes:14.0f}")
+
+
+if __name__ == "__main__":
+    main()
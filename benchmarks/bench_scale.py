@@ -0,0 +1,115 @@
+"""Scale benchmark on generated worlds (worldgen.py) of 10 to 1,000,000 rooms.
+
+For each size, generates a seeded world and reports the time to generate and compile it,
+the per-command latency of playing its winning command sequence (mean, p50, p99), and
+for each save format (JSON, journal, snapshot) the time of a 'save' and a 'load' command
+halfway through the game and the size of the save file. --json writes the results to a
+file so runs can be compared over time.
+
+    python benchmarks/bench_scale.py --sizes 10 1000 100000 1000000 --json scale.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import adv
+import worldgen
+
+SAVE_FORMATS = (("json", "save.json"), ("journal", "save.journal"), ("snapshot", "save.snap"))
+
+
+def play(template, solution):
+    """Play the winning commands, returning each command's latency in seconds."""
+    session = adv.GameSession(rooms=template, save_file=os.devnull, record_scores=False)
+    step = session.step
+    clock = time.perf_counter
+    latencies = []
+    for command in solution:
+        start = clock()
+        step(command)
+        latencies.append(clock() - start)
+    if session.outcome != "won":
+        raise RuntimeError(f"{template.name}: the winning commands did not win ({session.outcome}).")
+    return latencies
+
+
+def save_and_load(template, commands, save_file):
+    """Play some commands, then time a 'save' and a 'load' command.
+    Returns:
+    tuple: (save seconds, load seconds, save file size in bytes).
+    """
+    session = adv.GameSession(rooms=template, save_file=save_file, record_scores=False)
+    for command in commands:
+        session.step(command)
+    start = time.perf_counter()
+    saved = session.step("save")
+    save_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    loaded = session.step("load")
+    load_seconds = time.perf_counter() - start
+    if not any("saved" in str(line) for line in saved) or not any("loaded" in str(line) for line in loaded):
+        raise RuntimeError(f"{template.name}: save or load failed: {saved} {loaded}")
+    return save_seconds, load_seconds, os.path.getsize(save_file)
+
+
+def percentile(values, q):
+    """Get a percentile of an already sorted list."""
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def bench(size, seed, directory):
+    """Run the benchmark for one world size and return its results."""
+    start = time.perf_counter()
+    data, solution = worldgen.generate_world(size, seed)
+    generated = time.perf_counter()
+    template = adv.WorldTemplate(data)
+    compiled = time.perf_counter()
+    latencies = sorted(play(template, solution))
+    result = {
+        "rooms": size,
+        "seed": seed,
+        "generate_seconds": generated - start,
+        "compile_seconds": compiled - generated,
+        "commands": len(solution),
+        "command_mean_us": sum(latencies) / len(latencies) * 1e6,
+        "command_p50_us": percentile(latencies, 0.5) * 1e6,
+        "command_p99_us": percentile(latencies, 0.99) * 1e6,
+        "saves": {},
+    }
+    halfway = solution[:len(solution) // 2]
+    for name, filename in SAVE_FORMATS:
+        save_file = os.path.join(directory, f"{size}-{filename}")
+        save_seconds, load_seconds, size_bytes = save_and_load(template, halfway, save_file)
+        result["saves"][name] = {"save_ms": save_seconds * 1000, "load_ms": load_seconds * 1000, "bytes": size_bytes}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000, 1000000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    results = []
+    print(f"{'rooms':>8} {'gen s':>7} {'compile s':>9} {'cmds':>6} {'mean us':>8} {'p50 us':>7} {'p99 us':>7}  "
+          + "  ".join(f"{name + ' save/load ms, KB':>30}" for name, _ in SAVE_FORMATS))
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            result = bench(size, args.seed, directory)
+            results.append(result)
+            saves = "  ".join(f"{s['save_ms']:>12.2f} {s['load_ms']:>8.2f} {s['bytes'] / 1024:>8.1f}"
+                              for s in result["saves"].values())
+            print(f"{size:>8} {result['generate_seconds']:>7.2f} {result['compile_seconds']:>9.2f} {result['commands']:>6} "
+                  f"{result['command_mean_us']:>8.1f} {result['command_p50_us']:>7.1f} {result['command_p99_us']:>7.1f}  {saves}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Snapshot benchmark: binary snapshots (SaveSnapshot) versus JSON saves (save_game).
+
+For worlds of growing size, a player walks a corridor taking the pebble in a share of the
+rooms, then the game is saved both ways. Reports the file sizes and the time to load each
+save and describe the current room (what the 'load' command does), plus the time to load
+every room of the snapshot instead of only the ones accessed.
+
+    python benchmarks/bench_snapshots.py --sizes 1000 10000 100000 --changed 0.1
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import adv
+from bench_saves import corridor_world
+
+
+def played_session(world, changed):
+    """Walk the corridor, taking the pebble in every 1/changed-th room."""
+    session = adv.GameSession(rooms=world, save_file=os.devnull, record_scores=False, max_inventory=None)
+    every = max(1, round(1 / changed))
+    for i in range(len(world) - 1):
+        if i % every == 0:
+            session.step("take pebble")
+        session.step("north")
+    return session
+
+
+def best_of(runs, load):
+    """Return the fastest of several runs of load(), in milliseconds."""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        load()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--changed", type=float, default=0.1, help="share of the rooms the player changes")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    print(f"{'rooms':>8} {'json KB':>9} {'snap KB':>9} {'json load ms':>13} {'snap load ms':>13} {'snap all ms':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            world = corridor_world(size)
+            session = played_session(world, args.changed)
+            json_file = os.path.join(directory, f"save{size}.json")
+            snap_file = os.path.join(directory, f"save{size}.snap")
+            adv.save_game(session.player, session.rooms, json_file)
+            store = adv.SaveSnapshot(snap_file, sync=False)
+            store.save(session.player, session.rooms)
+
+            def load_json():
+                player, rooms, _ = adv.load_game(json_file)
+                world_rooms = adv.World(world)
+                world_rooms.restore(rooms)
+                world_rooms[player.current_room.name].get_description(player)
+
+            def load_snapshot():
+                player, rooms, _ = store.load(world)
+                player.current_room.get_description(player)
+                rooms.drop_pending()
+
+            def load_snapshot_all():
+                player, rooms, _ = store.load(world)
+                rooms.materialize()
+
+            json_ms = best_of(args.runs, load_json)
+            snap_ms = best_of(args.runs, load_snapshot)
+            all_ms = best_of(args.runs, load_snapshot_all)
+            print(f"{size:>8} {os.path.getsize(json_file) / 1024:>9.1f} {os.path.getsize(snap_file) / 1024:>9.1f} "
+                  f"{json_ms:>13.2f} {snap_ms:>13.2f} {all_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
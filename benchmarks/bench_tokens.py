@@ -0,0 +1,144 @@
+"""HTTP API state token benchmark: token size and encode/decode time as a game goes on.
+
+Plays the winning commands of the default world and of generated worlds (worldgen.py) the
+way the stateless API does (decode the token, run one command, encode a new token) and
+reports, at five points of each game, the token's size next to the JSON of Player.save()
+plus Room.save() of every changed room, and the mean encode, decode and whole-request
+times. --http also times the requests through an in-process server over one keep-alive
+connection.
+
+    python benchmarks/bench_tokens.py --sizes 1000 100000 --http
+"""
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import adv
+import httpapi
+import leaderboard
+import worldgen
+
+
+def solution_for(template):
+    """Get the default world's winning commands from the solver."""
+    import solver
+    return solver.solve_world(template).solution
+
+
+def full_state_bytes(session):
+    """Size of the state as Player.save() plus Room.save() of every changed room, in compact JSON."""
+    rooms = session.rooms
+    state = {"player": session.player.save(), "rooms": {name: rooms[name].save() for name in rooms.overlay}}
+    return len(json.dumps(state, separators=(",", ":")))
+
+
+def bench_world(template, solution, board, repeat=5):
+    """Play the winning commands through tokens and return the results for one world."""
+    codec = httpapi.StateCodec(b"benchmark secret", template)
+    token = codec.encode(codec.new_session("bench"))
+    clock = time.perf_counter
+    encode = decode = request = 0.0
+    checkpoints = {round(len(solution) * fraction) for fraction in (0, 0.25, 0.5, 0.75, 1)}
+    sizes = []
+    for number, command in enumerate(solution, 1):
+        start = clock()
+        session = codec.decode(token)
+        decoded = clock()
+        session, _ = httpapi.step(codec, token, command, board)
+        stepped = clock()
+        token = codec.encode(session)
+        done = clock()
+        decode += decoded - start
+        request += done - decoded
+        encode += done - stepped
+        if number in checkpoints:
+            # Re-time the coding of this state a few times for a steadier figure.
+            start = clock()
+            for _ in range(repeat):
+                codec.encode(session)
+            encode_us = (clock() - start) / repeat * 1e6
+            start = clock()
+            for _ in range(repeat):
+                codec.decode(token)
+            decode_us = (clock() - start) / repeat * 1e6
+            sizes.append({"command": number, "token_bytes": len(token), "full_state_bytes": full_state_bytes(session),
+                          "changed_rooms": len(session.rooms.overlay), "encode_us": encode_us, "decode_us": decode_us})
+    if session.outcome != "won":
+        raise RuntimeError(f"{template.name}: the winning commands did not win ({session.outcome}).")
+    count = len(solution)
+    return {"world": template.name, "rooms": len(template), "commands": count, "checkpoints": sizes,
+            "encode_mean_us": encode / count * 1e6, "decode_mean_us": decode / count * 1e6,
+            "request_mean_us": request / count * 1e6, "codec": codec}
+
+
+def bench_http(codec, solution, board):
+    """Play the winning commands through an in-process server; returns sorted latencies in seconds."""
+    server = httpapi.ApiServer(("127.0.0.1", 0), codec, board)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+
+    def post(path, body):
+        connection.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+        return json.loads(connection.getresponse().read())
+
+    try:
+        token = post("/games", {"name": "bench"})["token"]
+        latencies = []
+        for command in solution:
+            start = time.perf_counter()
+            token = post("/command", {"token": token, "command": command})["token"]
+            latencies.append(time.perf_counter() - start)
+    finally:
+        connection.close()
+        server.shutdown()
+        server.server_close()
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 100000], help="generated world sizes (besides the default world)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--http", action="store_true", help="also time the requests through an in-process HTTP server")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    worlds = [(adv.default_world(), None)]
+    for size in args.sizes:
+        data, solution = worldgen.generate_world(size, args.seed)
+        worlds.append((adv.WorldTemplate(data), solution))
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        board = leaderboard.get_leaderboard(os.path.join(directory, "leaderboard.db"))
+        for template, solution in worlds:
+            solution = solution or solution_for(template)
+            result = bench_world(template, solution, board)
+            codec = result.pop("codec")
+            print(f"{result['world']} ({result['rooms']} rooms, {result['commands']} commands): "
+                  f"encode {result['encode_mean_us']:.1f} us, decode {result['decode_mean_us']:.1f} us, "
+                  f"decode+command+encode {result['request_mean_us']:.1f} us per request")
+            print(f"  {'command':>8} {'rooms changed':>13} {'token B':>8} {'full state B':>12} {'encode us':>9} {'decode us':>9}")
+            for point in result["checkpoints"]:
+                print(f"  {point['command']:>8} {point['changed_rooms']:>13} {point['token_bytes']:>8} "
+                      f"{point['full_state_bytes']:>12} {point['encode_us']:>9.1f} {point['decode_us']:>9.1f}")
+            if args.http:
+                latencies = bench_http(codec, solution, board)
+                result["http_mean_ms"] = sum(latencies) / len(latencies) * 1000
+                result["http_p99_ms"] = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000
+                print(f"  HTTP: {result['http_mean_ms']:.3f} ms mean, {result['http_p99_ms']:.3f} ms p99 per request "
+                      f"({1000 / result['http_mean_ms']:.0f} requests/sec on one connection)")
+            results.append(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
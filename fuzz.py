@@ -0,0 +1,345 @@
+"""Randomized fuzzing of the command loop across a process pool.
+
+Each worker plays game after game with command streams that are partly grammar-aware
+(exits, items and riddle answers that make sense where the player stands) and partly
+random (unknown verbs and items, garbage text). After every command it checks the
+session's invariants. Crashes and invariant violations are grouped by signature; the
+first failing game of each is minimized (commands are removed while the failure still
+reproduces) and written as a replay log:
+
+    python fuzz.py --workers 8 --commands 2000000
+    python adv.py --replay fuzz-repros/*.log
+
+Exits with status 1 if anything failed.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+import traceback
+
+import adv
+import replay
+import solver
+
+VERBS = ["move"] * 30 + ["take"] * 12 + ["drop"] * 5 + ["use"] * 12 + ["solve"] * 6 + ["talk"] * 3 + ["look"] * 4 + ["junk"] * 4 + ["undo"] * 3 + ["save", "load", "slot", "hint", "inventory", "help", "redo", "rewind"]
+SLOT_SAVED = re.compile(r"Game saved to slot '(.*)'\.")
+SLOT_LOADED = re.compile(r"Game loaded from slot '(.*)'\.")
+JUNK_WORDS = ["dance", "xyzzy", "open chest", "take", "use", "drop it", "north east", "solve", "!!", "take   map", "  ", "quit now", "use ???"]
+
+
+def generate_command(rng, session):
+    """Pick a command for the session's current state.
+    Args:
+    rng (random.Random): The random source.
+    session (GameSession): The session.
+
+    Returns:
+    str: The command.
+    """
+    player = session.player
+    room = player.current_room
+    verb = rng.choice(VERBS)
+    if verb == "move":
+        if room.exits and rng.random() < 0.9:
+            return rng.choice(list(room.exits))
+        return rng.choice(["north", "south", "east", "west", "n", "s", "e", "w"])
+    if verb in ("take", "drop", "use"):
+        pool = [item.name for item in (room.items if verb == "take" else player.inventory)]
+        if pool and rng.random() < 0.85:
+            return f"{verb} {rng.choice(pool)}"
+        other = [item.name for item in adv.Item.by_id] or ["map"]
+        return f"{verb} {rng.choice(other)}"
+    if verb == "solve":
+        answers = [answer for answer in (room.puzzle and room.puzzle[1], room.npc and room.npc[2]) if answer]
+        if answers and rng.random() < 0.7:
+            return f"solve {rng.choice(answers)}"
+        return f"solve {rng.choice(['echo', 'candle', 'wrong', '42'])}"
+    if verb == "rewind":
+        return f"rewind {rng.randint(1, 4)}"
+    if verb == "slot":
+        return f"{rng.choice(['save', 'load'])} {rng.choice(['a', 'b'])}"
+    if verb == "look":
+        return ""
+    if verb == "junk":
+        if rng.random() < 0.5:
+            return rng.choice(JUNK_WORDS)
+        return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz ?!;'") for _ in range(rng.randint(1, 12)))
+    return verb
+
+
+class Checker:
+    """Invariants checked after every command of one game.
+
+    Attributes:
+    session (GameSession): The game being checked.
+    """
+    def __init__(self, session):
+        self.session = session
+        self.score = session.player.score
+        self.state = solver.freeze_state(session.player, session.rooms)
+        self.saved = None
+        self.slots = {}
+        # id(history entry) -> (entry, state before, state after), to check undo and redo.
+        self.entries = {}
+
+    def check(self, command, output):
+        """Check the session after a command.
+        Args:
+        command (str): The command that was run.
+        output (list): What session.step() returned.
+
+        Returns:
+        str: The name of the first violated invariant with details, or None.
+        """
+        session = self.session
+        player = session.player
+        for item in output:
+            if not isinstance(item, (str, adv.Event)):
+                return f"output-type: {type(item).__name__} in output"
+            if isinstance(item, str) and re.search(r"\bNone\b", item):
+                return "output-none: 'None' in output"
+        if player.current_room.name not in session.rooms:
+            return f"room-unknown: {player.current_room.name!r}"
+        if len(player.inventory) > player.max_inventory:
+            return f"inventory-capacity: {len(player.inventory)} > {player.max_inventory}"
+        names = player.inventory.names()
+        rooms = session.rooms.values() if len(session.rooms) <= 1000 else [player.current_room]
+        for room in rooms:
+            names.extend(item.name for item in room.items)
+        if len(names) != len(set(names)):
+            return "item-duplicated: " + ", ".join(sorted({name for name in names if names.count(name) > 1}))
+        state = solver.freeze_state(player, session.rooms)
+        loaded = any(isinstance(item, str) and "Game loaded successfully!" in item for item in output)
+        slot_loaded = next((match.group(1) for match in (SLOT_LOADED.search(item) for item in output if isinstance(item, str)) if match), None)
+        verb = adv.parse_command(command.strip().lower())[0]
+        travelled = verb is not None and verb.name in ("undo", "redo", "rewind")
+        history = session.history
+        if travelled:
+            if verb.name == "redo" and history.undo_stack:
+                expected = self.entries.get(id(history.undo_stack[-1]), (None, None, state))[2]
+            elif verb.name != "redo" and history.redo_stack:
+                expected = self.entries.get(id(history.redo_stack[-1]), (None, state))[1]
+            else:
+                expected = state
+            if state != expected:
+                return f"{verb.name}-mismatch: the game differs from the one before/after the command"
+        elif history is not None and not loaded and slot_loaded is None and state != self.state:
+            if not history.undo_stack or id(history.undo_stack[-1]) in self.entries:
+                return f"undo-missing: {command!r} changed the game but cannot be undone"
+            self.entries[id(history.undo_stack[-1])] = (history.undo_stack[-1], self.state, state)
+        if loaded:
+            if self.saved is not None and state != self.saved:
+                return "load-mismatch: the loaded game differs from the saved one"
+        elif slot_loaded is not None:
+            if slot_loaded in self.slots and state != self.slots[slot_loaded]:
+                return f"slot-mismatch: the game loaded from slot {slot_loaded!r} differs from the one saved there"
+        elif travelled:
+            pass
+        elif player.score < self.score:
+            return f"score-decreased: {self.score} -> {player.score}"
+        elif player.score > self.score and state == self.state:
+            return f"score-without-progress: +{player.score - self.score} for {command!r}"
+        if any(isinstance(item, str) and "Game saved successfully!" in item for item in output):
+            self.saved = state
+        for match in (SLOT_SAVED.search(item) for item in output if isinstance(item, str)):
+            if match:
+                self.slots[match.group(1)] = state
+        self.score = player.score
+        self.state = state
+        return None
+
+
+def run_game(commands, world, save_file):
+    """Replay a command list in a fresh session and check it.
+    Args:
+    commands (list): The commands.
+    world (WorldTemplate): The world.
+    save_file (str): The session's save file.
+
+    Returns:
+    tuple: (signature, step) of the first failure, or (None, None).
+    """
+    session = adv.GameSession("fuzzer", rooms=world, save_file=save_file, record_scores=False, data_dir=os.path.dirname(save_file))
+    checker = Checker(session)
+    for step, command in enumerate(commands):
+        try:
+            output = session.step(command)
+        except Exception as e:
+            frame = traceback.extract_tb(e.__traceback__)[-1]
+            return f"crash: {e.__class__.__name__} at {os.path.basename(frame.filename)}:{frame.lineno} ({frame.name})", step
+        violation = checker.check(command, output)
+        if violation is not None:
+            return violation, step
+    return None, None
+
+
+def clear_dir(directory):
+    """Delete the save files and save slot folders left in a scratch folder."""
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+def _kind(signature):
+    return signature.split(":", 1)[0] if not signature.startswith("crash") else signature.split(" (")[0]
+
+
+def fuzz_worker(job):
+    """Play random games until the worker's command budget is spent.
+    Args:
+    job (tuple): (seed, commands, world path or None, max game length).
+
+    Returns:
+    dict: Counters and the first failing game of each failure kind.
+    """
+    seed, budget, world_path, max_length = job
+    world = adv.load_world(world_path) if world_path else adv.default_world()
+    work_dir = tempfile.mkdtemp(prefix="adv-fuzz-")
+    rng = random.Random(seed)
+    result = {"commands": 0, "games": 0, "failures": {}, "counts": {}}
+    try:
+        while result["commands"] < budget:
+            game_seed = rng.getrandbits(32)
+            game_rng = random.Random(game_seed)
+            save_file = os.path.join(work_dir, game_rng.choice(["save.json", "save.journal", "save.snap"]))
+            clear_dir(work_dir)
+            session = adv.GameSession("fuzzer", rooms=world, save_file=save_file, record_scores=False, data_dir=work_dir)
+            checker = Checker(session)
+            commands = []
+            failure = None
+            while not session.finished and len(commands) < max_length:
+                command = generate_command(game_rng, session)
+                commands.append(command)
+                try:
+                    output = session.step(command)
+                except Exception as e:
+                    frame = traceback.extract_tb(e.__traceback__)[-1]
+                    failure = f"crash: {e.__class__.__name__} at {os.path.basename(frame.filename)}:{frame.lineno} ({frame.name})"
+                    break
+                failure = checker.check(command, output)
+                if failure is not None:
+                    break
+            result["commands"] += len(commands)
+            result["games"] += 1
+            if failure is not None:
+                kind = _kind(failure)
+                result["counts"][kind] = result["counts"].get(kind, 0) + 1
+                result["failures"].setdefault(kind, (failure, commands))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+
+def minimize(commands, kind, world, work_dir):
+    """Remove commands while the same kind of failure still happens (delta debugging).
+    Args:
+    commands (list): A failing command list.
+    kind (str): The failure kind to preserve.
+    world (WorldTemplate): The world.
+    work_dir (str): A scratch folder for save files.
+
+    Returns:
+    list: A shorter failing command list.
+    """
+    def fails(candidate):
+        clear_dir(work_dir)
+        signature, step = run_game(candidate, world, save_file)
+        return signature is not None and _kind(signature) == kind, step
+
+    for name in ("save.json", "save.journal", "save.snap"):
+        save_file = os.path.join(work_dir, name)
+        failing, step = fails(commands)
+        if failing:
+            break
+    else:
+        return commands, save_file
+    commands = commands[:step + 1]
+    chunk = max(1, len(commands) // 2)
+    while chunk >= 1:
+        i = 0
+        while i < len(commands):
+            candidate = commands[:i] + commands[i + chunk:]
+            failing, step = fails(candidate) if candidate else (False, None)
+            if failing:
+                commands = candidate[:step + 1]
+            else:
+                i += chunk
+        chunk //= 2
+    return commands, save_file
+
+
+def write_repro(path, commands, world, save_file):
+    """Record a command list as a replay log (a crashing command is logged without output)."""
+    clear_dir(os.path.dirname(save_file))
+    session = adv.GameSession("fuzzer", rooms=world, save_file=save_file, record_scores=False, data_dir=os.path.dirname(save_file))
+    recorder = replay.Recorder(path, session)
+    try:
+        for command in commands:
+            try:
+                output = session.step(command)
+            except Exception:
+                recorder._write({"c": command, "o": None})
+                break
+            recorder.record(command, output)
+    finally:
+        recorder.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fuzz the game's command loop")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--commands", type=int, default=1000000, help="total commands across all workers")
+    parser.add_argument("--seed", type=int, default=None, help="base seed (default: random)")
+    parser.add_argument("--max-length", type=int, default=200, help="commands per game at most")
+    parser.add_argument("--world", help="world JSON file (default: the bundled world)")
+    parser.add_argument("--repro-dir", default="fuzz-repros", help="where minimized replay logs are written")
+    args = parser.parse_args(argv)
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    per_worker = -(-args.commands // args.workers)
+    jobs = [(seed + i, per_worker, args.world, args.max_length) for i in range(args.workers)]
+    print(f"Fuzzing with {args.workers} workers, {args.commands} commands, seed {seed}")
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.workers) as pool:
+        results = pool.map(fuzz_worker, jobs)
+    elapsed = time.perf_counter() - start
+    commands = sum(result["commands"] for result in results)
+    games = sum(result["games"] for result in results)
+    print(f"{commands} commands in {games} games, {elapsed:.1f}s ({commands / elapsed:.0f} commands/sec)")
+
+    failures = {}
+    counts = {}
+    for result in results:
+        for kind, count in result["counts"].items():
+            counts[kind] = counts.get(kind, 0) + count
+        for kind, failure in result["failures"].items():
+            failures.setdefault(kind, failure)
+    if not failures:
+        print("No crashes or invariant violations.")
+        return 0
+    world = adv.load_world(args.world) if args.world else adv.default_world()
+    os.makedirs(args.repro_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="adv-fuzz-")
+    try:
+        for kind, (signature, failing) in sorted(failures.items()):
+            minimal, save_file = minimize(failing, kind, world, work_dir)
+            slug = re.sub(r"[^A-Za-z0-9]+", "-", kind).strip("-").lower()
+            path = os.path.join(args.repro_dir, f"{slug}.log")
+            write_repro(path, minimal, world, save_file)
+            print(f"{counts[kind]} games: {signature}")
+            print(f"  minimized to {len(minimal)} commands: {minimal}")
+            print(f"  repro: {path}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
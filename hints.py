@@ -0,0 +1,259 @@
+"""Hints computed from a precomputed "next best action" table.
+
+The table is built once per world: the solver explores every reachable state, then a
+backward breadth-first search from the winning states gives each state its distance to
+a win and the command that gets closer. The table maps a short digest of each state to
+that command, so a 'hint' is one dictionary lookup. It is cached on disk next to the
+world ('<name>.hints') and rebuilt when the world file changes. Tables are loaded or built
+in a background thread; a hint that cannot wait for one gives the room's hint instead.
+
+    python hints.py                 # prebuild the tables for every world in worlds/
+"""
+import collections
+import glob
+import hashlib
+import marshal
+import os
+import sys
+import threading
+
+import adv
+import metrics
+import solver
+
+# Bump when the table layout or the state digest changes so stale tables are rebuilt.
+HINT_CACHE_VERSION = 3
+# The search stops after this many states; states it did not reach fall back to the room hints.
+MAX_STATES = 200000
+
+
+def state_digest(state):
+    """Get a short digest of a solver state that is stable across processes.
+    Args:
+    state (tuple): A state from solver.freeze_state().
+
+    Returns:
+    bytes: An 8-byte digest.
+    """
+    room_name, inventory, solved, overlay = state
+    # freeze_state() orders items by Item.item_id, which depends on the order this process
+    # interned them in; the digest sorts them by what they are instead.
+    frozen_overlay = tuple(sorted(
+        (name, tuple(sorted((field, _item_keys(value) if field == "items" else value) for field, value in fields)))
+        for name, fields in overlay
+    ))
+    text = repr((room_name, _item_keys(inventory), solved, frozen_overlay))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+def _item_keys(items):
+    return tuple(sorted((item.name, type(item).__name__, item.description) for item in items))
+
+
+class HintTable:
+    """The next best command for every state a world can still be won from.
+
+    Attributes:
+    world (str): The world's name.
+    max_inventory (int): The carrying capacity the table was built for.
+    complete (bool): Whether every reachable state was explored.
+    actions (dict): State digest -> the next command on a shortest path to a win.
+    """
+    def __init__(self, world, max_inventory, complete, actions):
+        self.world = world
+        self.max_inventory = max_inventory
+        self.complete = complete
+        self.actions = actions
+
+    @staticmethod
+    def build(template, max_inventory=3, max_states=MAX_STATES):
+        """Build the table with a forward search followed by a backward search from the wins.
+        Args:
+        template (WorldTemplate): The world.
+        max_inventory (int): The player's carrying capacity.
+        max_states (int): The solver's state cap.
+
+        Returns:
+        HintTable: The table.
+        """
+        search = solver.Solver(template, max_inventory, max_states, find_dead_ends=True)
+        report = search.solve()
+        actions = {}
+        distance = {state: 0 for state in search.wins}
+        queue = collections.deque(search.wins)
+        while queue:
+            state = queue.popleft()
+            for parent, text in search.reverse.get(state, ()):
+                if parent not in distance:
+                    distance[parent] = distance[state] + 1
+                    actions[state_digest(parent)] = text
+                    queue.append(parent)
+        return HintTable(template.name, max_inventory, report.complete, actions)
+
+    def next_action(self, player, rooms):
+        """Get the next best command for a game.
+        Args:
+        player (Player): The player.
+        rooms (World): The player's rooms.
+
+        Returns:
+        str: The command, or None if the state is not in the table.
+        """
+        return self.actions.get(state_digest(solver.freeze_state(player, rooms)))
+
+    def save(self, filename, stamp):
+        """Write the table to a cache file (temp file plus rename)."""
+        temp_file = f"{filename}.{os.getpid()}.tmp"
+        with open(temp_file, "wb") as f:
+            marshal.dump((stamp, self.world, self.complete, self.actions), f)
+        os.replace(temp_file, filename)
+
+    @staticmethod
+    def load(filename, stamp, max_inventory):
+        """Read a cache file.
+        Returns:
+        HintTable: The table, or None if the file is missing or stale.
+        """
+        try:
+            with open(filename, "rb") as f:
+                cached_stamp, world, complete, actions = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if tuple(cached_stamp) != stamp:
+            return None
+        return HintTable(world, max_inventory, complete, actions)
+
+
+class _TableTask:
+    """A hint table being loaded or built in a background thread.
+
+    Attributes:
+    template (WorldTemplate): The world, kept alive so its id is not reused by another world.
+    done (threading.Event): Set once the table (or error) is there.
+    table (HintTable): The table, or None.
+    error (Exception): What stopped the table from being loaded or built, or None.
+    """
+    def __init__(self, key, template, max_inventory):
+        self.template = template
+        self.done = threading.Event()
+        self.table = None
+        self.error = None
+        threading.Thread(target=self._run, args=(key, max_inventory), name=f"hints-{template.name}", daemon=True).start()
+
+    def _run(self, key, max_inventory):
+        try:
+            self.table = _load_or_build(self.template, max_inventory)
+        except Exception as e:
+            self.error = e
+            # Let the next call try again.
+            with _TABLES_LOCK:
+                if _TABLES.get(key) is self:
+                    del _TABLES[key]
+        finally:
+            self.done.set()
+
+
+_TABLES = {}
+_TABLES_LOCK = threading.Lock()
+
+
+def get_table(template, max_inventory=3, timeout=None):
+    """Get the hint table of a world, from memory, its cache file, or by building it.
+
+    The first call for a world starts loading or building its table in a background
+    thread, which keeps going if the caller stops waiting.
+    Args:
+    template (WorldTemplate): The world.
+    max_inventory (int): The player's carrying capacity.
+    timeout (float): The most seconds to wait for the table, or None to wait until it is ready.
+
+    Returns:
+    HintTable: The table, or None if it was not ready in time.
+    """
+    key = (template.path or id(template), max_inventory)
+    with _TABLES_LOCK:
+        task = _TABLES.get(key)
+        if task is None:
+            task = _TABLES[key] = _TableTask(key, template, max_inventory)
+    if not task.done.wait(timeout):
+        return None
+    if task.error is not None:
+        raise task.error
+    return task.table
+
+
+def _load_or_build(template, max_inventory):
+    table = None
+    if template.path is not None:
+        stat = os.stat(template.path)
+        stamp = (HINT_CACHE_VERSION, stat.st_mtime_ns, stat.st_size, max_inventory)
+        cache_file = os.path.splitext(template.path)[0] + ".hints"
+        table = HintTable.load(cache_file, stamp, max_inventory)
+    if table is None:
+        table = HintTable.build(template, max_inventory)
+        if template.path is not None:
+            try:
+                table.save(cache_file, stamp)
+            except OSError:
+                pass
+    return table
+
+
+def describe_action(text, room):
+    """Turn a command into a hint that points the way without spelling out answers.
+    Args:
+    text (str): The command (e.g., 'take shield').
+    room (RoomState): The player's current room.
+
+    Returns:
+    str: The hint.
+    """
+    verb, _, arg = text.partition(" ")
+    if verb == "take":
+        return f"Take the {arg}; you will need it."
+    if verb == "use":
+        return f"Try using the {arg} here."
+    if verb == "drop":
+        return f"Your hands are full. The {arg} won't be needed any more, so drop it."
+    if verb == "solve":
+        if room.npc:
+            return f"Talk to {room.npc[0]} and answer the riddle with 'solve <answer>'."
+        return "The riddle here is the way forward. Answer it with 'solve <answer>'."
+    return f"Head {verb}."
+
+
+def hint(session, timeout=None):
+    """Get a hint for a game session.
+    Args:
+    session (GameSession): The session.
+    timeout (float): The most seconds to wait for the world's hint table before giving the
+    room's hint instead, or None to wait until it is ready. The room's hint is also given
+    when the table could not be loaded or built.
+
+    Returns:
+    str: The hint message.
+    """
+    player, rooms = session.player, session.rooms
+    if rooms.template.win_item in player.inventory:
+        return rooms.template.hints.get("won", "You've won-congratulations!")
+    try:
+        table = get_table(rooms.template, player.max_inventory, timeout)
+    except Exception as e:
+        # A failed build must not break the game; the next hint tries again.
+        metrics.inc("hint_table_errors_total", error=type(e).__name__)
+        table = None
+    action = table.next_action(player, rooms) if table is not None else None
+    if action is not None:
+        return describe_action(action, player.current_room)
+    return player.hint(rooms)
+
+
+def main(argv=None):
+    paths = (argv if argv is not None else sys.argv[1:]) or sorted(glob.glob(os.path.join(adv.WORLD_DIR, "*.json")))
+    for path in paths:
+        table = get_table(adv.load_world(path))
+        print(f"{path}: {len(table.actions)} states with hints{'' if table.complete else ' (incomplete)'}")
+
+
+if __name__ == "__main__":
+    main()
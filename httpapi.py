@@ -0,0 +1,384 @@
+"""Stateless HTTP JSON API whose game state travels in signed tokens.
+
+The server keeps no sessions. Each response carries the whole game state as a compact
+token, and the client sends it back with the next command, so any worker (on any node
+sharing the secret) can serve any request: it decodes the token, runs one command and
+returns the new token.
+
+    python adv.py --http --port 8000 --secret "$ADV_TOKEN_SECRET"
+    curl -d '{"name": "Ann"}' localhost:8000/games
+    curl -d '{"token": "...", "command": "take map"}' localhost:8000/command
+
+A token holds only what the player changed: the player's room, score, inventory and solved
+riddles, and the changed fields of changed rooms (the World overlay), with a room's items
+given as positions in the room's starting items where possible. The JSON is deflated when
+that makes it smaller, then signed with HMAC-SHA256 (truncated to MAC_BYTES):
+
+    token = base64url(flag byte + state) "." base64url(MAC)
+
+A forged or corrupted token is rejected before anything in it is decoded. Old tokens stay
+valid, so sending an earlier token goes back to that point of the game; 'save', 'load' and
+the undo commands are therefore not needed (and not available) in this mode. Every token
+of a game carries the game's random ID, and the leaderboard records each game ID once, so
+winning again from an earlier token does not add another score.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import adv
+import metrics
+
+TOKEN_FORMAT = 2
+GAME_ID_BYTES = 12
+MAC_BYTES = 16
+RAW = 0
+DEFLATED = 1
+# Limits on what a request may make the server read or inflate.
+MAX_BODY_BYTES = 64 * 1024
+MAX_STATE_BYTES = 1024 * 1024
+# Commands that need server-side state; the token already covers what they do.
+STATEFUL_COMMANDS = {"save", "load", "saves", "undo", "redo", "rewind"}
+
+
+class TokenError(ValueError):
+    """Raised for a token that is forged, corrupted or from another world."""
+
+
+class StateCodec:
+    """Turn sessions into signed state tokens and back.
+
+    Attributes:
+    secret (bytes): The HMAC key; every worker serving the same players needs the same one.
+    template (WorldTemplate): The world every token is played in.
+    max_inventory (int): How many items players can carry.
+    """
+    def __init__(self, secret, template=None, max_inventory=3):
+        self.secret = secret
+        self.template = template if template is not None else adv.default_world()
+        self.max_inventory = max_inventory
+        self._catalogue = None
+
+    @property
+    def catalogue(self):
+        """Item name -> interned Item for every item the world defines (built on first use)."""
+        if self._catalogue is None:
+            catalogue = {}
+            for spec in self.template.specs.values():
+                for item_data in spec.get("items", ()):
+                    catalogue.setdefault(item_data["name"], adv.Item.load(item_data))
+                for item_data in spec.get("chest", {}).get("contents", ()):
+                    catalogue.setdefault(item_data["name"], adv.Item.load(item_data))
+            self._catalogue = catalogue
+        return self._catalogue
+
+    def new_session(self, player_name):
+        """Start a new game for a player, with a new game ID."""
+        return adv.GameSession(player_name, rooms=self.template, save_file=os.devnull, record_scores=False,
+                               max_inventory=self.max_inventory, undo_depth=0, game_id=secrets.token_urlsafe(GAME_ID_BYTES),
+                               hint_wait=adv.HINT_WAIT)
+
+    @metrics.timed("token_seconds", operation="encode")
+    def encode(self, session):
+        """Encode a session's state as a signed token.
+        Args:
+        session (GameSession): The session.
+
+        Returns:
+        str: The token.
+        """
+        player = session.player
+        rooms = session.rooms
+        rooms.materialize()
+        changed = {}
+        for name, fields in rooms.overlay.items():
+            changed[name] = self._encode_room(self.template[name], fields)
+        state = [TOKEN_FORMAT, self.template.name, session.game_id, session.player_name, player.current_room.name, player.score,
+                 [self._item_ref(item) for item in player.inventory], player.solved_riddles, session.outcome, changed]
+        data = json.dumps(state, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        deflated = zlib.compress(data, 9, wbits=-15)
+        payload = bytes((DEFLATED,)) + deflated if len(deflated) < len(data) else bytes((RAW,)) + data
+        mac = hmac.new(self.secret, payload, hashlib.sha256).digest()[:MAC_BYTES]
+        return _b64encode(payload) + "." + _b64encode(mac)
+
+    @metrics.timed("token_seconds", operation="decode")
+    def decode(self, token):
+        """Check a token's signature and rebuild its session.
+        Args:
+        token (str): A token from encode().
+
+        Returns:
+        GameSession: The session, ready for its next command.
+
+        Raises:
+        TokenError: If the token is malformed, forged or from another world.
+        """
+        try:
+            body, mac = token.split(".")
+            payload = _b64decode(body)
+            mac = _b64decode(mac)
+        except (AttributeError, ValueError) as e:
+            raise TokenError(f"Malformed token ({e}).") from None
+        if not payload or not hmac.compare_digest(mac, hmac.new(self.secret, payload, hashlib.sha256).digest()[:MAC_BYTES]):
+            raise TokenError("The token's signature does not match.")
+        data = payload[1:]
+        if payload[0] == DEFLATED:
+            inflater = zlib.decompressobj(-15)
+            data = inflater.decompress(data, MAX_STATE_BYTES)
+            if inflater.unconsumed_tail:
+                raise TokenError("The token's state is too large.")
+        try:
+            version, world, game_id, player_name, room_name, score, inventory, solved, outcome, changed = json.loads(data)
+        except (TypeError, ValueError) as e:
+            raise TokenError(f"Unreadable token state ({e}).") from None
+        if version != TOKEN_FORMAT:
+            raise TokenError(f"Token format {version} is not supported.")
+        if world != self.template.name:
+            raise TokenError(f"The token is for the world {world!r}, not {self.template.name!r}.")
+        try:
+            overlay = {name: self._decode_room(self.template[name], fields) for name, fields in changed.items()}
+            rooms = adv.World(self.template, overlay)
+            session = adv.GameSession(player_name, rooms=rooms, save_file=os.devnull, record_scores=False,
+                                      max_inventory=self.max_inventory, undo_depth=0, game_id=game_id, hint_wait=adv.HINT_WAIT)
+            player = session.player
+            player.current_room = rooms[room_name]
+            player.events.clear()
+            player.inventory = adv.ItemBag((self._item(ref) for ref in inventory), capacity=self.max_inventory)
+        except (AttributeError, KeyError, IndexError, TypeError, ValueError) as e:
+            raise TokenError(f"The token does not fit this world ({e}).") from None
+        player.score = score
+        player.solved_riddles = solved
+        session.outcome = outcome
+        session.finished = outcome is not None
+        return session
+
+    def _item_ref(self, item, starting=None):
+        """Refer to an item by its position in a room's starting items, by name, or in full."""
+        if starting is not None:
+            for position, other in enumerate(starting):
+                if other is item:
+                    return position
+        if self.catalogue.get(item.name) is item:
+            return item.name
+        data = item.save()
+        return [data["type"], data["name"], data["description"]]
+
+    def _item(self, ref, starting=None):
+        if isinstance(ref, int):
+            return list(starting)[ref]
+        if isinstance(ref, str):
+            return self.catalogue[ref]
+        return adv.Item.load({"type": ref[0], "name": ref[1], "description": ref[2]})
+
+    def _encode_room(self, room, fields):
+        """Encode a room's overlay fields, as changes from its starting state where that is shorter."""
+        encoded = {}
+        for field, value in fields.items():
+            if field == "items":
+                encoded["i"] = [self._item_ref(item, room.items) for item in value]
+            elif field == "exits":
+                delta = {direction: target for direction, target in value.items() if room.exits.get(direction) != target}
+                delta.update((direction, 0) for direction in room.exits if direction not in value)
+                if list(_apply_exits(room.exits, delta).items()) == list(value.items()):
+                    encoded["e"] = delta
+                else:
+                    encoded["E"] = value
+            elif field == "npc":
+                encoded["n"] = list(value) if value else 0
+            elif field == "chest_locked":
+                encoded["c"] = int(value)
+            elif field == "guard_present":
+                encoded["g"] = int(value)
+            else:
+                raise ValueError(f"Unknown room field {field!r}.")
+        return encoded
+
+    def _decode_room(self, room, encoded):
+        fields = {}
+        for code, value in encoded.items():
+            if code == "i":
+                fields["items"] = adv.ItemBag(self._item(ref, room.items) for ref in value)
+            elif code == "e":
+                fields["exits"] = _apply_exits(room.exits, value)
+            elif code == "E":
+                fields["exits"] = dict(value)
+            elif code == "n":
+                fields["npc"] = tuple(value) if value else None
+            elif code == "c":
+                fields["chest_locked"] = bool(value)
+            elif code == "g":
+                fields["guard_present"] = bool(value)
+            else:
+                raise KeyError(code)
+        return fields
+
+
+def _apply_exits(exits, delta):
+    result = dict(exits)
+    for direction, target in delta.items():
+        if target == 0:
+            result.pop(direction, None)
+        else:
+            result[direction] = target
+    return result
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def step(codec, token, command, leaderboard=None):
+    """Run one command against a token's game.
+    Args:
+    codec (StateCodec): The codec the token was made with.
+    token (str): The game's token.
+    command (str): The command.
+    leaderboard (Leaderboard): Where finished games are recorded, or None for leaderboard.db.
+
+    Returns:
+    tuple: (session after the command, the command's output from GameSession.step()).
+
+    Raises:
+    TokenError: If the token is not valid here.
+    """
+    session = codec.decode(token)
+    if session.finished:
+        return session, ["\nThis game is over. Start a new one with POST /games."]
+    entry = adv.parse_command(command.strip().lower())[0]
+    if entry is not None and entry.name in STATEFUL_COMMANDS:
+        return session, ["\nYour game lives in its token: send an earlier token to go back to that point."]
+    output = session.step(command)
+    if session.outcome in ("won", "lost"):
+        board = leaderboard if leaderboard is not None else session.leaderboard
+        session.player.update_leaderboard(session.player_name, board, session.game_id)
+        output.append(session.player.display_leaderboard(board, session.player_name))
+    return session, output
+
+
+def response(codec, session, output):
+    """Build the JSON reply for a session and a command's output."""
+    return {
+        "token": codec.encode(session),
+        "output": [item for item in output if not isinstance(item, adv.Event)],
+        "events": [{"kind": item.kind, "value": item.value} for item in output if isinstance(item, adv.Event)],
+        "room": session.player.current_room.name,
+        "score": session.player.score,
+        "finished": session.finished,
+        "outcome": session.outcome,
+    }
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Serve the API: POST /games, POST /command and GET /health."""
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY each keep-alive reply
+    # waits for the client's delayed ACK (about 40 ms).
+    disable_nagle_algorithm = True
+    server_version = "TextAdventure/1"
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"ok": True, "world": self.server.codec.template.name})
+        else:
+            self._reply(404, {"error": f"Unknown path {self.path!r}."})
+
+    def do_POST(self):
+        if self.path not in ("/games", "/command"):
+            self._reply(404, {"error": f"Unknown path {self.path!r}."})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._reply(413, {"error": f"Request bodies are limited to {MAX_BODY_BYTES} bytes."})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._reply(400, {"error": f"The request body is not JSON ({e})."})
+            return
+        if not isinstance(body, dict):
+            self._reply(400, {"error": "The request body must be a JSON object."})
+            return
+        codec = self.server.codec
+        if self.path == "/games":
+            name = body.get("name")
+            if not isinstance(name, str) or not name.strip():
+                self._reply(400, {"error": "Please give your name as 'name'."})
+                return
+            session = codec.new_session(name.strip())
+            self._reply(200, response(codec, session, [session.look()]))
+            return
+        token = body.get("token")
+        command = body.get("command")
+        if not isinstance(token, str) or not isinstance(command, str):
+            self._reply(400, {"error": "Send the game's 'token' and a 'command'."})
+            return
+        try:
+            session, output = step(codec, token, command, self.server.leaderboard)
+        except TokenError as e:
+            self._reply(400, {"error": str(e)})
+            return
+        self._reply(200, response(codec, session, output))
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        metrics.inc("http_requests_total", path=self.path if self.path in ("/games", "/command", "/health") else "other", status=status)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ApiServer(ThreadingHTTPServer):
+    """A threaded HTTP server for the API.
+
+    Attributes:
+    codec (StateCodec): Encodes and checks the state tokens.
+    leaderboard (Leaderboard): Where finished games are recorded, or None for leaderboard.db.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, codec, leaderboard=None):
+        super().__init__(address, ApiHandler)
+        self.codec = codec
+        self.leaderboard = leaderboard
+
+
+def serve(host="127.0.0.1", port=8000, world=None, leaderboard=None, secret=None, max_inventory=3):
+    """Run the HTTP API until interrupted.
+    Args:
+    host (str): The interface to listen on.
+    port (int): The TCP port to listen on.
+    world (WorldTemplate): The world to host, or None for the default world.
+    leaderboard (Leaderboard): The high scores to record, or None for leaderboard.db.
+    secret (str): The token signing key, or None for a random one (tokens then work only
+    with this process).
+    max_inventory (int): How many items players can carry.
+    """
+    if not secret:
+        print("No --secret (or ADV_TOKEN_SECRET) given: using a random one, so tokens only work with this process.")
+        secret = secrets.token_hex(32)
+    server = ApiServer((host, port), StateCodec(secret.encode("utf-8"), world, max_inventory), leaderboard)
+    print(f"Serving the text adventure HTTP API on {host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,117 @@
+"""Append-only record journal used for incremental saves.
+
+Each record is a JSON object framed as: 4-byte length, 4-byte CRC32, payload. A torn
+or corrupted write at the tail fails its length or checksum test and is dropped (along
+with anything after it) when the journal is read or reopened for appending.
+"""
+import json
+import os
+import struct
+import zlib
+
+HEADER = struct.Struct(">II")
+
+
+def encode_record(record):
+    """Frame one record for writing.
+    Args:
+    record (dict): A JSON-serializable record.
+
+    Returns:
+    bytes: The framed record.
+    """
+    payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(data):
+    """Decode every intact record from the start of a journal's bytes.
+    Args:
+    data (bytes): The journal contents.
+
+    Returns:
+    tuple: (records, valid_length) where valid_length is where the intact prefix ends.
+    """
+    records = []
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        length, checksum = HEADER.unpack_from(data, offset)
+        start = offset + HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        try:
+            records.append(json.loads(payload))
+        except ValueError:
+            break
+        offset = start + length
+    return records, offset
+
+
+class Journal:
+    """An append-only file of framed JSON records.
+
+    Attributes:
+    path (str): The journal file.
+    sync (bool): Whether to fsync after every write (durable but slower).
+    size (int): Bytes of intact records in the file.
+    count (int): Number of intact records in the file.
+    """
+    def __init__(self, path, sync=False):
+        self.path = path
+        self.sync = sync
+        self.size = 0
+        self.count = 0
+
+    def read(self):
+        """Read the intact records, dropping a torn tail from the file.
+        Returns:
+        list: The records, oldest first.
+        """
+        with open(self.path, "rb") as f:
+            data = f.read()
+        records, valid = read_records(data)
+        if valid < len(data):
+            with open(self.path, "r+b") as f:
+                f.truncate(valid)
+        self.size = valid
+        self.count = len(records)
+        return records
+
+    def append(self, record):
+        """Append one record.
+        Args:
+        record (dict): A JSON-serializable record.
+
+        Returns:
+        int: The number of bytes written.
+        """
+        frame = encode_record(record)
+        with open(self.path, "ab") as f:
+            f.write(frame)
+            if self.sync:
+                f.flush()
+                os.fsync(f.fileno())
+        self.size += len(frame)
+        self.count += 1
+        return len(frame)
+
+    def rewrite(self, records):
+        """Atomically replace the journal with the given records (temp file plus rename).
+        Args:
+        records (list): The records the new journal holds.
+
+        Returns:
+        int: The number of bytes written.
+        """
+        data = b"".join(encode_record(record) for record in records)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            if self.sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.size = len(data)
+        self.count = len(records)
+        return len(data)
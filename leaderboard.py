@@ -0,0 +1,204 @@
+"""High score store shared by every game session, thread and process.
+
+Scores live in a SQLite database in WAL mode, so concurrent inserts from many sessions
+are atomic and never lose each other's scores, and readers never block writers. A game
+that has an ID (e.g., an HTTP API game, whose state tokens can be sent again) is recorded
+at most once. Each Leaderboard keeps an in-process cache (the top-K entries and the number
+of scores) that is reloaded only when another connection has changed the database; ranks
+are counted on the score index, so memory does not grow with the number of scores.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+import metrics
+
+DEFAULT_LEADERBOARD_FILE = "leaderboard.db"
+# The file used by earlier versions; its scores are imported into a new database.
+LEGACY_LEADERBOARD_FILE = "leaderboard.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    game_id TEXT
+);
+-- Also answers rank(): COUNT(*) WHERE score > ? is a search of this index.
+CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC, id);
+CREATE INDEX IF NOT EXISTS scores_by_name ON scores (name, score);
+"""
+# Run after SCHEMA (and after adding game_id to databases created without it). Scores
+# without a game ID are NULL here, which a UNIQUE index never treats as duplicates.
+GAME_ID_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS scores_by_game ON scores (game_id)"
+
+
+class Leaderboard:
+    """A SQLite-backed leaderboard with a cached top-K and O(log n) rank lookups.
+
+    Attributes:
+    path (str): The database file.
+    top_k (int): How many entries top() and display() return.
+    """
+    def __init__(self, path=DEFAULT_LEADERBOARD_FILE, top_k=5, timeout=10.0):
+        self.path = path
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._add_game_ids()
+        self._import_legacy()
+        self._data_version = None
+        self._top = []
+        self._total = 0
+
+    def _add_game_ids(self):
+        """Add the game_id column to a database created before games had IDs."""
+        with self._lock:
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(scores)")]
+            if "game_id" not in columns:
+                try:
+                    self._db.execute("ALTER TABLE scores ADD COLUMN game_id TEXT")
+                except sqlite3.OperationalError:
+                    # Another process added it first.
+                    pass
+            self._db.execute(GAME_ID_INDEX)
+
+    def _import_legacy(self):
+        """Copy the scores from leaderboard.json into an empty database next to it."""
+        legacy = os.path.join(os.path.dirname(self.path), LEGACY_LEADERBOARD_FILE)
+        if not os.path.exists(legacy):
+            return
+        try:
+            with open(legacy, "r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if self._db.execute("SELECT 1 FROM scores LIMIT 1").fetchone() is None:
+                    self._db.executemany("INSERT INTO scores (name, score) VALUES (?, ?)",
+                                         [(entry["name"], entry["score"]) for entry in entries])
+                self._db.execute("COMMIT")
+            except (sqlite3.Error, KeyError, TypeError):
+                self._db.execute("ROLLBACK")
+
+    def _refresh(self):
+        """Reload the cache if another connection committed since it was loaded. Call with the lock held."""
+        version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._top = [{"name": name, "score": score} for name, score in
+                     self._db.execute("SELECT name, score FROM scores ORDER BY score DESC, id LIMIT ?", (self.top_k,))]
+        self._total = self._db.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        self._data_version = version
+
+    @metrics.timed("leaderboard_seconds", op="add")
+    def add(self, name, score, game_id=None):
+        """Record a score.
+        Args:
+        name (str): The player's name.
+        score (int): The final score.
+        game_id (str): The game's ID, or None. A game whose ID is already recorded is not added again.
+
+        Returns:
+        bool: Whether the score was added.
+        """
+        with self._lock:
+            self._refresh()
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                added = self._db.execute("INSERT OR IGNORE INTO scores (name, score, game_id) VALUES (?, ?, ?)",
+                                         (name, score, game_id)).rowcount
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            if not added:
+                return False
+            # Our own commits do not change data_version, so update the cache in place.
+            self._total += 1
+            position = len(self._top)
+            while position > 0 and self._top[position - 1]["score"] < score:
+                position -= 1
+            if position < self.top_k:
+                self._top.insert(position, {"name": name, "score": score})
+                del self._top[self.top_k:]
+            return True
+
+    @metrics.timed("leaderboard_seconds", op="top")
+    def top(self):
+        """Get the best scores.
+        Returns:
+        list: Up to top_k dictionaries with 'name' and 'score', best first.
+        """
+        with self._lock:
+            self._refresh()
+            return [dict(entry) for entry in self._top]
+
+    @metrics.timed("leaderboard_seconds", op="rank")
+    def rank(self, name):
+        """Get the rank of a player's best score.
+        Args:
+        name (str): The player's name.
+
+        Returns:
+        tuple: (rank, total) where rank 1 is the best score, or None if the player has no score.
+        """
+        with self._lock:
+            self._refresh()
+            best = self._db.execute("SELECT MAX(score) FROM scores WHERE name = ?", (name,)).fetchone()[0]
+            if best is None:
+                return None
+            better = self._db.execute("SELECT COUNT(*) FROM scores WHERE score > ?", (best,)).fetchone()[0]
+            return better + 1, self._total
+
+    def display(self, name=None):
+        """Format the leaderboard.
+        Args:
+        name (str): A player whose rank is shown under the list, or None.
+
+        Returns:
+        str: A formatted string of the leaderboard.
+        """
+        entries = self.top()
+        if not entries:
+            return "Leaderboard is empty."
+        result = "Leaderboard:\n"
+        for i, entry in enumerate(entries, 1):
+            result += f"{i}.{entry['name']}: {entry['score']} points\n"
+        if name is not None:
+            rank = self.rank(name)
+            if rank is not None:
+                result += f"Your best score ranks {rank[0]} of {rank[1]}.\n"
+        return result
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+
+_DEFAULT = {}
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_leaderboard(path=DEFAULT_LEADERBOARD_FILE, top_k=5):
+    """Get the process-wide Leaderboard for a database file, opening it once.
+    Args:
+    path (str): The database file.
+    top_k (int): How many entries are displayed.
+
+    Returns:
+    Leaderboard: The shared leaderboard.
+    """
+    key = (os.path.abspath(path), top_k)
+    with _DEFAULT_LOCK:
+        board = _DEFAULT.get(key)
+        if board is None:
+            board = _DEFAULT[key] = Leaderboard(path, top_k)
+        return board
@@ -0,0 +1,89 @@
+"""Load generator for the asyncio game server.
+
+Opens N fake clients that each play a loop of commands, then reports commands/sec and
+latency percentiles. By default it starts an in-process server on a free port:
+
+    python loadgen.py --clients 500 --commands 200
+    python loadgen.py --host 127.0.0.1 --port 4000 --clients 2000
+"""
+import argparse
+import asyncio
+import time
+
+import server
+
+# A loop of commands that never ends the game (no Garden, no crown).
+DEFAULT_SCRIPT = ["take map", "east", "use map", "take bell", "inventory", "west", "hint", "north", "south", "drop map", "help"]
+
+
+async def run_client(host, port, client_id, commands, latencies):
+    """Play one fake player, appending each command's round-trip time to latencies."""
+    reader, writer = await asyncio.open_connection(host, port)
+    prompt = server.PROMPT.encode("utf-8")
+    await reader.readuntil(server.NAME_PROMPT.encode("utf-8"))
+    writer.write(f"bot{client_id}\n".encode("utf-8"))
+    await reader.readuntil(prompt)
+    for command in commands:
+        start = time.perf_counter()
+        writer.write(command.encode("utf-8") + b"\n")
+        await reader.readuntil(prompt)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+
+def percentile(values, fraction):
+    """Return the value at the given fraction (0-1) of the sorted values."""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run_load(host, port, clients, commands_per_client, script=DEFAULT_SCRIPT):
+    """Run the load test and return a dict of results."""
+    commands = [script[i % len(script)] for i in range(commands_per_client)]
+    latencies = []
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run_client(host, port, i, commands, latencies) for i in range(clients)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    return {
+        "clients": clients,
+        "failed_clients": sum(1 for result in results if isinstance(result, Exception)),
+        "commands": len(latencies),
+        "seconds": elapsed,
+        "commands_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def main_async(args):
+    game_server = None
+    host, port = args.host, args.port
+    if port is None:
+        game_server = server.GameServer("127.0.0.1", 0, max_connections=args.clients, save_dir=args.save_dir)
+        await game_server.start()
+        host, port = "127.0.0.1", game_server.port
+    try:
+        return await run_load(host, port, args.clients, args.commands)
+    finally:
+        if game_server is not None:
+            await game_server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for 'adv.py --serve'")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="server port (default: start an in-process server)")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--commands", type=int, default=100, help="commands sent by each client")
+    parser.add_argument("--save-dir", default="saves", help="save directory for the in-process server")
+    args = parser.parse_args()
+    result = asyncio.run(main_async(args))
+    print(f"{result['clients']} clients ({result['failed_clients']} failed), {result['commands']} commands in {result['seconds']:.2f}s")
+    print(f"{result['commands_per_sec']:.0f} commands/sec, p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
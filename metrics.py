@@ -0,0 +1,326 @@
+"""Optional latency histograms and counters, exported as JSON and Prometheus text.
+
+Instrumentation is off until enable() is called. While it is off, the hot paths (each
+command, room descriptions) only check that the module's registry is None, and the
+timed() wrappers around saves, loads and leaderboard queries call straight through.
+
+    python adv.py --metrics-json metrics.json --metrics-prom metrics.prom --metrics-interval 10
+
+Metric names are exported with an 'adv_' prefix (e.g., adv_command_seconds).
+"""
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+PREFIX = "adv_"
+# Histogram bucket upper bounds in seconds; a command usually takes a few microseconds.
+LATENCY_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HELP = {
+    "commands_total": "Commands run, by verb.",
+    "command_seconds": "Time to run one parsed command (handler and room description), by verb.",
+    "parse_seconds": "Time to parse a command line.",
+    "describe_cache_total": "Room description lookups, by result (hit or miss).",
+    "describe_seconds": "Time to render a room description that was not cached.",
+    "save_seconds": "Time to write a save, by format (json, journal, snapshot or autosave).",
+    "load_seconds": "Time to read a save, by format (json, journal or snapshot).",
+    "saves_total": "Saves requested with the 'save' command, by result.",
+    "loads_total": "Loads requested with the 'load' command, by result.",
+    "slot_cache_total": "Loads of named save slots, by whether the state cache held the slot (hit or miss).",
+    "token_seconds": "Time to encode or decode an HTTP API state token, by operation.",
+    "http_requests_total": "HTTP API requests, by path and status.",
+    "games_total": "Finished games, by outcome (won, lost or quit).",
+    "traps_total": "Traps that ended a game, by room.",
+    "leaderboard_seconds": "Leaderboard database time, by operation.",
+    "sounds_total": "Sound effects, by sound and result (played, dropped or missing).",
+    "sound_seconds": "Time to start playing a sound effect.",
+}
+
+# The active Registry, or None while metrics are disabled.
+registry = None
+# Callables returning (name, labels, value) counters that are read only at export time.
+_collectors = []
+
+
+class Histogram:
+    """Counts of observed values per bucket, with their sum and maximum.
+
+    Attributes:
+    counts (list): Observations per bucket; the last entry counts values above every bound.
+    total (float): The sum of all observations.
+    count (int): The number of observations.
+    max (float): The largest observation.
+    """
+    __slots__ = ("counts", "total", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket it falls in.
+        Args:
+        q (float): The quantile (e.g., 0.99).
+
+        Returns:
+        float: The estimate in seconds, or None if nothing was observed.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def key(name, **labels):
+    """Build the key of a metric and its labels once, for inc_key() and observe_key() on hot paths."""
+    return (name, _label_key(labels))
+
+
+class Registry:
+    """The counters and histograms recorded since metrics were enabled.
+
+    Attributes:
+    started (float): When the registry was created (time.time()).
+    counters (dict): (name, label items) -> value.
+    histograms (dict): (name, label items) -> Histogram.
+    """
+    def __init__(self):
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        """Add to a counter."""
+        self.inc_key((name, _label_key(labels)), amount)
+
+    def inc_key(self, key, amount=1):
+        """Add to a counter under a precomputed key(), skipping the label sorting."""
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        """Record a latency in a histogram."""
+        self.observe_key((name, _label_key(labels)), seconds)
+
+    def observe_key(self, key, seconds):
+        """Record a latency under a precomputed key()."""
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def _counters(self):
+        """Get every counter, including the ones read from collectors."""
+        with self._lock:
+            counters = dict(self.counters)
+        for collector in _collectors:
+            for name, labels, value in collector():
+                counters[(name, _label_key(labels))] = value
+        return counters
+
+    def to_json(self):
+        """Get a snapshot of the metrics.
+        Returns:
+        dict: Counters and histogram summaries (count, sum, max, p50, p90, p99 and buckets).
+        """
+        snapshot = {
+            "time": time.time(),
+            "uptime_seconds": time.time() - self.started,
+            "counters": [],
+            "histograms": [],
+        }
+        with self._lock:
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                snapshot["histograms"].append({
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": histogram.total,
+                    "max": histogram.max,
+                    "p50": histogram.quantile(0.5),
+                    "p90": histogram.quantile(0.9),
+                    "p99": histogram.quantile(0.99),
+                    "buckets": {str(bound): n for bound, n in zip(LATENCY_BUCKETS + ("+Inf",), histogram.counts) if n},
+                })
+        for (name, labels), value in sorted(self._counters().items()):
+            snapshot["counters"].append({"name": name, "labels": dict(labels), "value": value})
+        return snapshot
+
+    def to_prometheus(self):
+        """Format the metrics in the Prometheus text exposition format.
+        Returns:
+        str: The metrics text.
+        """
+        lines = []
+        last = None
+        for (name, labels), value in sorted(self._counters().items()):
+            if name != last:
+                lines.extend(_header(name, "counter"))
+                last = name
+            lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+        with self._lock:
+            histograms = sorted((key, list(h.counts), h.total, h.count) for key, h in self.histograms.items())
+        for (name, labels), counts, total, count in histograms:
+            if name != last:
+                lines.extend(_header(name, "histogram"))
+                last = name
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, counts):
+                cumulative += n
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _header(name, kind):
+    lines = [f"# TYPE {PREFIX}{name} {kind}"]
+    if name in HELP:
+        lines.insert(0, f"# HELP {PREFIX}{name} {HELP[name]}")
+    return lines
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def enable():
+    """Start recording metrics (a no-op if they already are).
+    Returns:
+    Registry: The active registry.
+    """
+    global registry
+    if registry is None:
+        registry = Registry()
+    return registry
+
+
+def disable():
+    """Stop recording metrics and drop what was recorded."""
+    global registry
+    registry = None
+
+
+def add_collector(collector):
+    """Register a callable returning (name, labels, value) counters, read at export time.
+
+    Use this for counts the code keeps anyway (e.g., cache hits), so recording them costs nothing.
+    """
+    _collectors.append(collector)
+
+
+def inc(name, amount=1, **labels):
+    """Add to a counter if metrics are enabled."""
+    if registry is not None:
+        registry.inc(name, amount, **labels)
+
+
+def observe(name, seconds, **labels):
+    """Record a latency if metrics are enabled."""
+    if registry is not None:
+        registry.observe(name, seconds, **labels)
+
+
+def timed(name, **labels):
+    """Decorator recording each call's duration in a histogram while metrics are enabled.
+    Args:
+    name (str): The histogram (e.g., 'save_seconds').
+    labels: Fixed labels for every call (e.g., format='json').
+    """
+    metric = key(name, **labels)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if registry is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.observe_key(metric, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _write_atomic(path, text):
+    temp_file = f"{path}.{os.getpid()}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_file, path)
+
+
+class Exporter:
+    """Write the metrics to files from a background thread every few seconds.
+
+    Attributes:
+    registry (Registry): The metrics to export.
+    json_path (str): The JSON file, or None.
+    prom_path (str): The Prometheus text file (e.g., for node_exporter's textfile collector), or None.
+    interval (float): Seconds between writes.
+    last_error (str): The last write error, or None.
+    """
+    def __init__(self, registry, json_path=None, prom_path=None, interval=10.0):
+        self.registry = registry
+        self.json_path = json_path
+        self.prom_path = prom_path
+        self.interval = interval
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+
+    def write(self):
+        """Write both files now.
+        Returns:
+        bool: True if they were written.
+        """
+        try:
+            if self.json_path:
+                _write_atomic(self.json_path, json.dumps(self.registry.to_json(), indent=2))
+            if self.prom_path:
+                _write_atomic(self.prom_path, self.registry.to_prometheus())
+        except OSError as e:
+            self.last_error = f"Error writing metrics: {e}"
+            return False
+        return True
+
+    def close(self):
+        """Stop the thread and write the final metrics."""
+        self._stop.set()
+        self._thread.join()
+        self.write()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
@@ -0,0 +1,258 @@
+"""Record game sessions and replay them headlessly.
+
+A log is a JSON-lines file (gzip-compressed when its name ends in '.gz'). The first line
+is a header with the player's name, the world, the inventory capacity, the opening room
+description and the contents of the save file and the player's save slots when recording
+started, so 'load' and 'load <slot>' replay the same game. Each further line is one command with the output it produced.
+
+Replaying runs the commands through a fresh GameSession with its save file and slots in a
+temporary folder, compares every output with the recording, and reports the first
+step that differs:
+
+    python adv.py --record bug.log.gz            # play and record
+    python adv.py --replay bug.log.gz other.log  # replay and compare
+"""
+import base64
+import difflib
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+import zlib
+
+import adv
+
+LOG_FORMAT = 1
+
+
+def render_output(item):
+    """Turn one session output item into text for the log.
+    Args:
+    item (str or Event): A line of text, or a banner/sound event.
+
+    Returns:
+    str: The text, or '[kind:value]' for an event.
+    """
+    if isinstance(item, adv.Event):
+        return f"[{item.kind}:{item.value}]"
+    return item
+
+
+def open_log(path, mode):
+    """Open a log for text reading or writing, compressed if its name ends in '.gz'."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def file_checksum(path):
+    """Get the CRC32 of a file, or None if it cannot be read."""
+    try:
+        with open(path, "rb") as f:
+            return zlib.crc32(f.read())
+    except OSError:
+        return None
+
+
+class Recorder:
+    """Write a session's commands and outputs to a log as they happen.
+
+    Leaderboard text depends on other players' games, so the 'leaderboard' command's
+    output and the leaderboard shown when a game ends are not recorded. Neither is the
+    'saves' listing, which shows when each slot was saved.
+
+    Attributes:
+    path (str): The log file.
+    session (GameSession): The recorded session.
+    """
+    def __init__(self, path, session):
+        self.path = path
+        self.session = session
+        save_data = None
+        if os.path.exists(session.save_file):
+            with open(session.save_file, "rb") as f:
+                save_data = base64.b64encode(f.read()).decode("ascii")
+        slot_data = {}
+        if os.path.isdir(session.slots.directory):
+            for name in sorted(os.listdir(session.slots.directory)):
+                with open(os.path.join(session.slots.directory, name), "rb") as f:
+                    slot_data[name] = base64.b64encode(f.read()).decode("ascii")
+        template = session.rooms.template
+        header = {
+            "format": LOG_FORMAT,
+            "player": session.player_name,
+            "world": template.path,
+            "world_crc": file_checksum(template.path) if template.path else None,
+            "max_inventory": session.player.max_inventory,
+            "undo_depth": session.history.depth if session.history else 0,
+            "autosave_every": session.autosave.every if session.autosave else None,
+            "autosave_interval": session.autosave.interval if session.autosave else None,
+            "save_file": os.path.basename(session.save_file),
+            "save_data": save_data,
+            "slot_data": slot_data or None,
+            "look": session.look(),
+        }
+        self._file = open_log(path, "w")
+        self._write(header)
+
+    def record(self, command, output):
+        """Append one command and its output.
+        Args:
+        command (str): The command as typed.
+        output (list): What session.step() returned for it.
+        """
+        output = [render_output(item) for item in output]
+        session = self.session
+        if command.strip().lower() in ("leaderboard", "saves"):
+            output = None
+        elif session.outcome in ("won", "lost") and session.record_scores and output:
+            output.pop()
+        self._write({"c": command, "o": output})
+
+    def close(self):
+        """Close the log."""
+        self._file.close()
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        # Flush every line so a crash still leaves a replayable log.
+        self._file.flush()
+
+
+def load_log(path):
+    """Read a log.
+    Args:
+    path (str): The log file.
+
+    Returns:
+    tuple: (header, entries) where entries are {'c': command, 'o': outputs} dictionaries.
+    """
+    with open_log(path, "r") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get("format") != LOG_FORMAT:
+        raise ValueError(f"{path} is not a version {LOG_FORMAT} replay log.")
+    return lines[0], lines[1:]
+
+
+class Divergence:
+    """The first step where a replay differs from its recording.
+
+    Attributes:
+    step (int): The command number (0 for the opening description).
+    command (str): The command, or None for the opening description.
+    expected (list): The recorded output.
+    actual (list): The replayed output.
+    """
+    def __init__(self, step, command, expected, actual):
+        self.step = step
+        self.command = command
+        self.expected = expected
+        self.actual = actual
+
+    def diff(self):
+        """Get a unified diff of the recorded and replayed output."""
+        expected = "\n".join(self.expected).splitlines()
+        actual = "\n".join(self.actual).splitlines()
+        return "\n".join(difflib.unified_diff(expected, actual, "recorded", "replayed", lineterm=""))
+
+
+def replay(header, entries, work_dir, world=None):
+    """Replay a log.
+    Args:
+    header (dict): The log header.
+    entries (list): The recorded commands.
+    work_dir (str): An empty folder for the session's save file and slots.
+    world (WorldTemplate): The world to replay in, or None to load the recorded world.
+
+    Returns:
+    Divergence: The first difference, or None if the replay matches the recording.
+    """
+    if world is None:
+        world = adv.load_world(header["world"]) if header.get("world") else adv.default_world()
+    save_file = os.path.join(work_dir, header["save_file"])
+    if header.get("save_data") is not None:
+        with open(save_file, "wb") as f:
+            f.write(base64.b64decode(header["save_data"]))
+    if header.get("slot_data"):
+        slot_dir = os.path.join(work_dir, "saves", adv.safe_name(header["player"]))
+        os.makedirs(slot_dir)
+        for name, data in header["slot_data"].items():
+            with open(os.path.join(slot_dir, os.path.basename(name)), "wb") as f:
+                f.write(base64.b64decode(data))
+    autosave = None
+    if header.get("autosave_every") or header.get("autosave_interval") is not None:
+        # Only the command-count policy is deterministic; interval autosaves are not replayed.
+        autosave = adv.Autosave(adv.autosave_file(save_file), header.get("autosave_every"))
+    session = adv.GameSession(header["player"], rooms=world, save_file=save_file, record_scores=False,
+                              max_inventory=header["max_inventory"], autosave=autosave,
+                              undo_depth=header.get("undo_depth", 100), data_dir=work_dir)
+    try:
+        return _compare(session, header, entries)
+    finally:
+        session.close()
+
+
+def _compare(session, header, entries):
+    look = session.look()
+    if look != header["look"]:
+        return Divergence(0, None, [header["look"]], [look])
+    for step, entry in enumerate(entries, 1):
+        try:
+            actual = [render_output(item) for item in session.step(entry["c"])]
+        except Exception as e:
+            return Divergence(step, entry["c"], entry["o"] or [], [f"crashed: {e.__class__.__name__}: {e}"])
+        if entry["o"] is not None and actual != entry["o"]:
+            return Divergence(step, entry["c"], entry["o"], actual)
+    return None
+
+
+def replay_logs(paths, show_diff=True):
+    """Replay logs and print one line per log.
+    Args:
+    paths (list): The log files.
+    show_diff (bool): Whether to print a diff of each first divergence.
+
+    Returns:
+    int: The number of logs that diverged (or failed to load).
+    """
+    failures = 0
+    commands = 0
+    worlds = {}
+    work_dir = tempfile.mkdtemp(prefix="adv-replay-")
+    start = time.perf_counter()
+    try:
+        for path in paths:
+            try:
+                header, entries = load_log(path)
+            except (OSError, ValueError) as e:
+                print(f"{path}: cannot read log ({e})")
+                failures += 1
+                continue
+            world_path = header.get("world")
+            note = ""
+            if world_path and header.get("world_crc") is not None and file_checksum(world_path) != header["world_crc"]:
+                note = " (the world file changed since recording)"
+            elif header.get("autosave_interval") is not None:
+                note = " (interval autosaves are not replayed)"
+            if world_path not in worlds:
+                worlds[world_path] = adv.load_world(world_path) if world_path else adv.default_world()
+            shutil.rmtree(work_dir, ignore_errors=True)
+            os.makedirs(work_dir)
+            divergence = replay(header, entries, work_dir, worlds[world_path])
+            commands += len(entries)
+            if divergence is None:
+                print(f"{path}: OK, {len(entries)} commands{note}")
+                continue
+            failures += 1
+            where = "the opening description" if divergence.command is None else f"step {divergence.step} ({divergence.command!r})"
+            print(f"{path}: diverged at {where}{note}")
+            if show_diff:
+                print(divergence.diff())
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - start
+    if len(paths) > 1 and elapsed > 0:
+        print(f"{len(paths)} logs, {commands} commands in {elapsed:.2f}s ({len(paths) / elapsed:.0f} sessions/sec), {failures} diverged")
+    return failures
@@ -0,0 +1,166 @@
+"""Asyncio TCP/telnet server hosting many text adventure sessions in one process.
+
+Each connection gets its own GameSession (its own player and changes to the shared world).
+Run it with 'python adv.py --serve --port 4000' and connect with telnet or nc.
+"""
+import asyncio
+import os
+
+import adv
+
+PROMPT = "What do you want to do? "
+NAME_PROMPT = "Please enter your name:"
+# Commands whose handlers touch the disk (or may wait briefly for the hint table); they run in a worker thread.
+BLOCKING_COMMANDS = {"save", "load", "saves", "leaderboard", "hint"}
+# Undo steps each hosted session keeps by default; a server holds thousands of sessions, and
+# a long game's full 100-step history adds about 25 KB a session (benchmarks/bench_memory.py).
+UNDO_DEPTH = 10
+
+
+class GameServer:
+    """Serve one GameSession per TCP connection.
+
+    Attributes:
+    host (str): The interface to listen on.
+    port (int): The TCP port to listen on (0 picks a free port).
+    max_connections (int): Connections beyond this cap are turned away.
+    idle_timeout (float): Seconds a client may stay silent before it is disconnected.
+    data_dir (str): Directory holding the players' saves ('saves' under it by default).
+    save_dir (str): Directory holding each player's save file and their folder of save slots.
+    world (WorldTemplate): The world every session plays, or None for the default world.
+    leaderboard (Leaderboard): The high scores shared by every session, or None for leaderboard.db.
+    undo_depth (int): How many commands each session can undo (0 turns undo off).
+    max_inventory (int): How many items each player can carry.
+    active (int): The number of connected clients.
+    """
+    def __init__(self, host="127.0.0.1", port=4000, max_connections=1000, idle_timeout=300.0, save_dir=None, world=None, leaderboard=None, data_dir=".", undo_depth=UNDO_DEPTH, max_inventory=3):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.data_dir = data_dir
+        self.save_dir = save_dir if save_dir is not None else os.path.join(data_dir, "saves")
+        self.world = world
+        self.leaderboard = leaderboard
+        self.undo_depth = undo_depth
+        self.max_inventory = max_inventory
+        self.active = 0
+        self._server = None
+        self._handlers = set()
+
+    async def start(self):
+        """Start listening; the bound port is stored back in self.port."""
+        os.makedirs(self.save_dir, exist_ok=True)
+        # The stream limit caps how much unread input one client can make us buffer.
+        self._server = await asyncio.start_server(self.handle, self.host, self.port, limit=4096, backlog=self.max_connections)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    async def serve_forever(self):
+        """Start the server and run until cancelled."""
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    async def close(self):
+        """Stop accepting connections and wait for connected games to wind down."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._handlers:
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    async def _send(self, writer, text):
+        """Write text and wait for the socket buffer to drain (per-connection backpressure)."""
+        writer.write(text.encode("utf-8"))
+        await writer.drain()
+
+    async def _readline(self, reader):
+        """Read one line, or None if the client disconnected or stayed idle too long."""
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+        except (asyncio.TimeoutError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+            return None
+        if not line:
+            return None
+        return line.decode("utf-8", "replace").strip()
+
+    def _render(self, events):
+        """Turn session output into text; sounds are skipped on the server."""
+        lines = []
+        for event in events:
+            if not isinstance(event, adv.Event):
+                lines.append(event)
+            elif event.kind == "banner":
+                lines.append(adv.banner(event.value))
+        return "".join(line + "\n" for line in lines)
+
+    async def handle(self, reader, writer):
+        """Run one player's game over a connection."""
+        if self.active >= self.max_connections:
+            await self._send(writer, "The server is full, please try again later.\n")
+            writer.close()
+            return
+        self.active += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        loop = asyncio.get_running_loop()
+        try:
+            await self._send(writer, "Welcome to the Text Adventure Game!\nYou goal: Find the golden crown and escape with it!\n" + NAME_PROMPT)
+            player_name = await self._readline(reader)
+            while player_name == "":
+                await self._send(writer, "Name cannot be empty. " + NAME_PROMPT)
+                player_name = await self._readline(reader)
+            if player_name is None:
+                return
+            save_file = os.path.join(self.save_dir, f"{adv.safe_name(player_name)}.json")
+            session = adv.GameSession(player_name, rooms=self.world, save_file=save_file, record_scores=False, leaderboard=self.leaderboard, max_inventory=self.max_inventory, undo_depth=self.undo_depth, data_dir=self.data_dir, hint_wait=adv.HINT_WAIT)
+            await self._send(writer, "\n" + session.look() + "\n" + PROMPT)
+            while not session.finished:
+                command = await self._readline(reader)
+                if command is None:
+                    break
+                if command.strip().lower().split(" ", 1)[0] in BLOCKING_COMMANDS:
+                    events = await loop.run_in_executor(None, session.step, command)
+                else:
+                    events = session.step(command)
+                output = self._render(events)
+                if session.finished:
+                    if session.outcome in ("won", "lost"):
+                        board = session.leaderboard
+                        await loop.run_in_executor(None, session.player.update_leaderboard, player_name, board)
+                        output += await loop.run_in_executor(None, session.player.display_leaderboard, board, player_name) + "\n"
+                else:
+                    output += PROMPT
+                await self._send(writer, output)
+        except ConnectionError:
+            pass
+        finally:
+            self.active -= 1
+            self._handlers.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+def serve(host="127.0.0.1", port=4000, max_connections=1000, idle_timeout=300.0, world=None, leaderboard=None, data_dir=".", undo_depth=UNDO_DEPTH, max_inventory=3):
+    """Run the game server until interrupted.
+    Args:
+    host (str): The interface to listen on.
+    port (int): The TCP port to listen on.
+    max_connections (int): Maximum number of concurrent players.
+    idle_timeout (float): Seconds of silence before a player is disconnected.
+    world (WorldTemplate): The world to host, or None for the default world.
+    leaderboard (Leaderboard): The high scores to record, or None for leaderboard.db.
+    data_dir (str): The folder players' saves go to (under 'saves').
+    undo_depth (int): How many commands each player can undo (0 turns undo off).
+    max_inventory (int): How many items each player can carry.
+    """
+    server = GameServer(host, port, max_connections, idle_timeout, world=world, leaderboard=leaderboard, data_dir=data_dir, undo_depth=undo_depth, max_inventory=max_inventory)
+    print(f"Serving the text adventure on {host}:{port} (max {max_connections} players)")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,383 @@
+"""Compact binary save snapshots, read through mmap.
+
+A snapshot holds only what a session changed: the player (room, score, inventory, solved
+riddles) and the changed fields of changed rooms. Static world data such as room and item
+descriptions is not repeated: every string is stored once in a string table and every
+item definition once in an item table, and records refer to them by ID. Rooms are found
+through an index sorted by name, so a reader decodes a room's record only when it is
+first asked for and never builds anything for the rooms nobody visits.
+
+Layout (little-endian):
+
+    header         magic, format version, CRC32 of everything after the header, counts
+                   and section offsets (HEADER)
+    strings        UTF-8 strings, each preceded by its length as a varint
+    string index   string count x u32 offset, so any string decodes on its own
+    items          varint count, then (type, name, description) string IDs per item
+    player         room ID, score, inventory item IDs, solved riddle room IDs (varints)
+    rooms          per room: field count, then a tag and a value per changed field
+    room index     room count x (u32 name string ID, u32 record offset), sorted by name
+
+Room IDs are string IDs of room names, so a snapshot stays valid when rooms are added to
+the world file.
+"""
+import mmap
+import os
+import struct
+import zlib
+
+MAGIC = b"ADVSNAP\0"
+SNAPSHOT_VERSION = 1
+HEADER = struct.Struct("<8sHHIIIIIIII")
+U32 = struct.Struct("<I")
+INDEX_ENTRY = struct.Struct("<II")
+
+# Room field tags.
+CHEST_LOCKED = 1
+GUARD_PRESENT = 2
+NPC = 3
+ITEMS = 4
+EXITS = 5
+
+
+class SnapshotError(ValueError):
+    """Raised for a file that is not a readable snapshot."""
+
+
+def _varint(value, out):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, offset):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, offset
+        shift += 7
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value // 2 if not value & 1 else -(value + 1) // 2
+
+
+class _Tables:
+    """The string and item tables of a snapshot being written."""
+    def __init__(self):
+        self.strings = []
+        self.string_ids = {}
+        self.items = []
+        self.item_ids = {}
+
+    def string(self, text):
+        string_id = self.string_ids.get(text)
+        if string_id is None:
+            string_id = self.string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    def item(self, key):
+        item_id = self.item_ids.get(key)
+        if item_id is None:
+            item_id = self.item_ids[key] = len(self.items)
+            self.items.append(tuple(self.string(text) for text in key))
+        return item_id
+
+
+def encode(world, player, rooms):
+    """Build a snapshot.
+    Args:
+    world (str): The world's name.
+    player (dict): 'current_room', 'score', 'inventory' (list of (type, name, description)
+    item keys) and 'solved_riddles' (list of room names).
+    rooms (dict): Room name -> {field: value} for the changed fields of changed rooms:
+    'chest_locked' and 'guard_present' (bool), 'npc' (tuple or None), 'items' (list of
+    item keys) and 'exits' (dict of direction -> room name).
+
+    Returns:
+    bytes: The snapshot.
+    """
+    tables = _Tables()
+    world_id = tables.string(world)
+    body = bytearray()
+    _varint(tables.string(player["current_room"]), body)
+    _varint(_zigzag(player["score"]), body)
+    _varint(len(player["inventory"]), body)
+    for key in player["inventory"]:
+        _varint(tables.item(key), body)
+    _varint(len(player["solved_riddles"]), body)
+    for name in player["solved_riddles"]:
+        _varint(tables.string(name), body)
+    index = []
+    for name, fields in rooms.items():
+        index.append((tables.string(name), len(body)))
+        _varint(len(fields), body)
+        for field, value in fields.items():
+            if field == "chest_locked":
+                body += bytes((CHEST_LOCKED, bool(value)))
+            elif field == "guard_present":
+                body += bytes((GUARD_PRESENT, bool(value)))
+            elif field == "npc":
+                body.append(NPC)
+                values = value or ()
+                _varint(len(values), body)
+                for text in values:
+                    _varint(tables.string(text), body)
+            elif field == "items":
+                body.append(ITEMS)
+                _varint(len(value), body)
+                for key in value:
+                    _varint(tables.item(key), body)
+            elif field == "exits":
+                body.append(EXITS)
+                _varint(len(value), body)
+                for direction, target in value.items():
+                    _varint(tables.string(direction), body)
+                    _varint(tables.string(target), body)
+            else:
+                raise ValueError(f"Unknown room field {field!r}.")
+
+    strings = bytearray()
+    string_offsets = []
+    encoded = [text.encode("utf-8") for text in tables.strings]
+    for data in encoded:
+        string_offsets.append(len(strings))
+        _varint(len(data), strings)
+        strings += data
+    items = bytearray()
+    _varint(len(tables.items), items)
+    for triple in tables.items:
+        for string_id in triple:
+            _varint(string_id, items)
+    index.sort(key=lambda entry: encoded[entry[0]])
+
+    strings_offset = HEADER.size
+    string_index_offset = strings_offset + len(strings)
+    items_offset = string_index_offset + U32.size * len(string_offsets)
+    player_offset = items_offset + len(items)
+    room_index_offset = player_offset + len(body)
+    parts = [
+        bytes(strings),
+        b"".join(U32.pack(strings_offset + offset) for offset in string_offsets),
+        bytes(items),
+        bytes(body),
+        b"".join(INDEX_ENTRY.pack(string_id, player_offset + offset) for string_id, offset in index),
+    ]
+    payload = b"".join(parts)
+    header = HEADER.pack(MAGIC, SNAPSHOT_VERSION, 0, zlib.crc32(payload), len(tables.strings), len(index),
+                         string_index_offset, items_offset, player_offset, room_index_offset, world_id)
+    return header + payload
+
+
+def write(path, data, sync=True):
+    """Atomically replace a snapshot file (temp file, fsync, rename).
+    Args:
+    path (str): The snapshot file.
+    data (bytes): The snapshot from encode().
+    sync (bool): Whether to fsync before the rename.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class SnapshotReader:
+    """A snapshot file mapped into memory, decoding rooms on demand.
+
+    Attributes:
+    path (str): The snapshot file.
+    version (int): The snapshot format version.
+    world (str): The name of the world the snapshot was saved in.
+    player (dict): The player, in the form encode() takes.
+    room_count (int): Rooms with saved changes.
+    remaining (int): Rooms with saved changes that take() has not returned yet.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise SnapshotError(f"{path} is too short to be a snapshot.")
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except BaseException:
+            self.close()
+            raise
+
+    def _open(self):
+        data = self._data
+        (magic, version, _, checksum, self._string_count, self.room_count, self._string_index,
+         items_offset, player_offset, self._room_index, world_id) = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{self.path} is not a snapshot.")
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"{self.path} is a version {version} snapshot; this game reads version {SNAPSHOT_VERSION}.")
+        if zlib.crc32(memoryview(data)[HEADER.size:]) != checksum:
+            raise SnapshotError(f"{self.path} is corrupted (checksum mismatch).")
+        self.version = version
+        self.remaining = self.room_count
+        self._taken = set()
+        self._strings = {}
+        self.world = self.string(world_id)
+        count, offset = _read_varint(data, items_offset)
+        self._items = []
+        for _ in range(count):
+            triple = []
+            for _ in range(3):
+                string_id, offset = _read_varint(data, offset)
+                triple.append(self.string(string_id))
+            self._items.append(tuple(triple))
+        self.player, _ = self._read_player(player_offset)
+
+    def close(self):
+        """Unmap the file."""
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+
+    def string(self, string_id):
+        """Decode a string from the string table (each string is decoded once)."""
+        text = self._strings.get(string_id)
+        if text is None:
+            offset = U32.unpack_from(self._data, self._string_index + U32.size * string_id)[0]
+            length, offset = _read_varint(self._data, offset)
+            text = self._strings[string_id] = self._data[offset:offset + length].decode("utf-8")
+        return text
+
+    def _read_player(self, offset):
+        data = self._data
+        room_id, offset = _read_varint(data, offset)
+        score, offset = _read_varint(data, offset)
+        count, offset = _read_varint(data, offset)
+        inventory = []
+        for _ in range(count):
+            item_id, offset = _read_varint(data, offset)
+            inventory.append(self._items[item_id])
+        count, offset = _read_varint(data, offset)
+        solved = []
+        for _ in range(count):
+            string_id, offset = _read_varint(data, offset)
+            solved.append(self.string(string_id))
+        player = {"current_room": self.string(room_id), "score": _unzigzag(score),
+                  "inventory": inventory, "solved_riddles": solved}
+        return player, offset
+
+    def _index_entry(self, position):
+        return INDEX_ENTRY.unpack_from(self._data, self._room_index + INDEX_ENTRY.size * position)
+
+    def _index_name(self, position):
+        return self.string(self._index_entry(position)[0]).encode("utf-8")
+
+    def room(self, name):
+        """Decode the saved changes of one room.
+        Args:
+        name (str): The room's name.
+
+        Returns:
+        dict: {field: value} in the form encode() takes, or None if the room has no saved changes.
+        """
+        key = name.encode("utf-8")
+        low, high = 0, self.room_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._index_name(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.room_count or self._index_name(low) != key:
+            return None
+        return self._read_room(self._index_entry(low)[1])
+
+    def take(self, name):
+        """Decode a room's saved changes the first time it is asked for.
+        Args:
+        name (str): The room's name.
+
+        Returns:
+        dict: The changes, or None if the room has none or was already taken.
+        """
+        if name in self._taken:
+            return None
+        self._taken.add(name)
+        fields = self.room(name)
+        if fields is not None:
+            self.remaining -= 1
+        return fields
+
+    def take_all(self):
+        """Decode every room that take() has not returned yet.
+        Returns:
+        dict: Room name -> changes.
+        """
+        rooms = {}
+        for position in range(self.room_count):
+            string_id, offset = self._index_entry(position)
+            name = self.string(string_id)
+            if name not in self._taken:
+                self._taken.add(name)
+                rooms[name] = self._read_room(offset)
+        self.remaining = 0
+        return rooms
+
+    def room_names(self):
+        """Get the names of every room with saved changes, in index order."""
+        return [self.string(self._index_entry(position)[0]) for position in range(self.room_count)]
+
+    def _read_room(self, offset):
+        data = self._data
+        count, offset = _read_varint(data, offset)
+        fields = {}
+        for _ in range(count):
+            tag = data[offset]
+            offset += 1
+            if tag == CHEST_LOCKED or tag == GUARD_PRESENT:
+                fields["chest_locked" if tag == CHEST_LOCKED else "guard_present"] = bool(data[offset])
+                offset += 1
+            elif tag == NPC:
+                length, offset = _read_varint(data, offset)
+                values = []
+                for _ in range(length):
+                    string_id, offset = _read_varint(data, offset)
+                    values.append(self.string(string_id))
+                fields["npc"] = tuple(values) if values else None
+            elif tag == ITEMS:
+                length, offset = _read_varint(data, offset)
+                items = []
+                for _ in range(length):
+                    item_id, offset = _read_varint(data, offset)
+                    items.append(self._items[item_id])
+                fields["items"] = items
+            elif tag == EXITS:
+                length, offset = _read_varint(data, offset)
+                exits = {}
+                for _ in range(length):
+                    direction, offset = _read_varint(data, offset)
+                    target, offset = _read_varint(data, offset)
+                    exits[self.string(direction)] = self.string(target)
+                fields["exits"] = exits
+            else:
+                raise SnapshotError(f"{self.path}: unknown room field tag {tag}.")
+        return fields
+
@@ -0,0 +1,324 @@
+"""State-space solver for text adventure worlds.
+
+Explores a world breadth-first as a graph of game states (current room, inventory,
+solved riddles, and every room change such as revealed exits, chest, guard and NPC
+state). Moves are real commands run through GameSession's command handlers, so the
+solver follows exactly the rules the game plays by. It reports whether the world can
+be won, the shortest winning command sequence, and (with --dead-ends) the commands that
+make the game unwinnable, such as dropping the shield the Garden trap needs.
+
+    python solver.py                      # every world in worlds/
+    python solver.py worlds/default.json --dead-ends --max-states 200000
+
+Exits with status 1 if any world is not winnable (or could not be proven winnable
+within the state cap), so it can run in CI against every world we ship.
+"""
+import argparse
+import collections
+import glob
+import operator
+import os
+import sys
+
+import adv
+
+by_item_id = operator.attrgetter("item_id")
+
+
+def freeze_state(player, rooms):
+    """Get the hashable solver state of a game.
+    Args:
+    player (Player): The player.
+    rooms (World): The player's rooms.
+
+    Returns:
+    tuple: (room name, inventory items, solved riddles, frozen room overlay).
+    """
+    rooms.materialize()
+    overlay = []
+    for name, changes in rooms.overlay.items():
+        template = rooms.template[name]
+        fields = []
+        for field, value in changes.items():
+            # A room's own copy of its items or exits can end up equal to the template's
+            # (e.g., an item taken and put back); leave it out so equal games freeze equal.
+            if field == "items":
+                value = tuple(sorted(value, key=by_item_id))
+                if value == tuple(sorted(template.items, key=by_item_id)):
+                    continue
+            elif field == "exits":
+                if value == template.exits:
+                    continue
+                value = tuple(sorted(value.items()))
+            fields.append((field, value))
+        if fields:
+            overlay.append((name, tuple(sorted(fields))))
+    return (
+        player.current_room.name,
+        tuple(sorted(player.inventory, key=by_item_id)),
+        tuple(sorted(set(player.solved_riddles))),
+        tuple(sorted(overlay)),
+    )
+
+
+class Report:
+    """The result of solving one world.
+
+    Attributes:
+    world (str): The world's name.
+    winnable (bool): True if a win was found, False if every reachable state was explored
+    without one, or None if the state cap or depth limit stopped the search first.
+    solution (list): The shortest winning command sequence, or None.
+    states (int): Distinct states discovered.
+    complete (bool): Whether every reachable state was explored.
+    losses (int): Transitions that lose the game (e.g., walking into a trap).
+    loss_example (list): The shortest command sequence that loses, or None.
+    dead_ends (int): Reachable states, not yet lost, from which the game cannot be won.
+    None unless dead ends were searched for and the search was complete.
+    fatal (list): Shortest command sequences whose last command makes the game unwinnable.
+    """
+    def __init__(self, world):
+        self.world = world
+        self.winnable = None
+        self.solution = None
+        self.states = 0
+        self.complete = False
+        self.losses = 0
+        self.loss_example = None
+        self.dead_ends = None
+        self.fatal = []
+
+
+class Solver:
+    """Breadth-first search over the states of one world.
+
+    A state is a hashable tuple: (room name, inventory items, solved riddles, frozen room
+    overlay). Inventory and room items are sorted by item id so the same situation
+    reached in a different order is deduplicated. The score is not part of the state.
+
+    Attributes:
+    template (WorldTemplate): The world to solve.
+    max_inventory (int): The player's carrying capacity.
+    max_states (int): Stop after discovering this many states (the memory cap).
+    max_depth (int): Do not explore states more than this many commands deep, or None.
+    find_dead_ends (bool): Explore everything and find the states the game cannot be won
+    from. Without it the search stops at the first win and skips dropping items while
+    the inventory has room (a dropped item is gone, so that can only hurt).
+    parents (dict): After solve(), state -> (parent state, command, depth) for every
+    discovered state, in BFS order.
+    reverse (dict): After solve() with find_dead_ends, state -> list of (parent state,
+    command) for every move into it that does not lose the game.
+    wins (list): After solve(), the winning states found.
+    """
+    def __init__(self, template, max_inventory=3, max_states=1000000, max_depth=None, find_dead_ends=False):
+        self.template = template
+        self.max_inventory = max_inventory
+        self.max_states = max_states
+        self.max_depth = max_depth
+        self.find_dead_ends = find_dead_ends
+        self.parents = {}
+        self.reverse = None
+        self.wins = []
+        self.session = adv.GameSession("solver", rooms=template, save_file=os.devnull, record_scores=False, max_inventory=max_inventory)
+
+    def freeze(self):
+        """Get the hashable state of the solver's session."""
+        return freeze_state(self.session.player, self.session.rooms)
+
+    def restore(self, state):
+        """Put the solver's session into a frozen state."""
+        room_name, inventory, solved, overlay = state
+        changes = {}
+        for name, fields in overlay:
+            entry = changes[name] = {}
+            for field, value in fields:
+                if field == "items":
+                    value = adv.ItemBag(value)
+                elif field == "exits":
+                    value = dict(value)
+                entry[field] = value
+        session = self.session
+        session.rooms = adv.World(self.template, changes)
+        session.player = adv.Player(session.rooms[room_name], self.max_inventory)
+        for item in inventory:
+            session.player.inventory.add(item)
+        session.player.solved_riddles = list(solved)
+        session.finished = False
+        session.outcome = None
+
+    def commands(self):
+        """List the commands worth trying in the session's current state."""
+        player = self.session.player
+        room = player.current_room
+        commands = list(room.exits)
+        if not player.inventory.is_full():
+            commands.extend(f"take {item.name}" for item in room.items)
+        for item in player.inventory:
+            commands.append(f"use {item.name}")
+            if self.find_dead_ends or player.inventory.is_full():
+                commands.append(f"drop {item.name}")
+        if room.puzzle and room.name not in player.solved_riddles:
+            commands.append(f"solve {room.puzzle[1]}")
+        if room.npc:
+            commands.append(f"solve {room.npc[2]}")
+        return commands
+
+    def apply(self, text):
+        """Run one command the way GameSession.step() would, without rendering output.
+        Args:
+        text (str): The command.
+
+        Returns:
+        bool: False if the game would reject the command before running it.
+        """
+        session = self.session
+        entry, arg = adv.parse_command(text.lower())
+        if entry is None or (entry.arg and not arg.replace(" ", "").isalnum()):
+            return False
+        entry.handler(session, arg)
+        if session.player.events:
+            session._run_rules()
+        session.player.messages.clear()
+        session._events = []
+        return True
+
+    def solve(self):
+        """Explore the world.
+        Returns:
+        Report: What the search found.
+        """
+        report = Report(self.template.name)
+        self.restore((self.template.start, (), (), ()))
+        start = self.freeze()
+        # State -> (parent state, command, depth); insertion order is BFS order.
+        parents = {start: (None, None, 0)}
+        reverse = collections.defaultdict(list) if self.find_dead_ends else None
+        wins = []
+        frontier = collections.deque([start])
+        truncated = False
+        while frontier:
+            state = frontier.popleft()
+            depth = parents[state][2]
+            if self.max_depth is not None and depth >= self.max_depth:
+                truncated = True
+                continue
+            self.restore(state)
+            for text in self.commands():
+                if not self.apply(text):
+                    continue
+                outcome = self.session.outcome
+                child = self.freeze()
+                if child == state and outcome is None:
+                    continue
+                if outcome == "lost":
+                    report.losses += 1
+                    if report.loss_example is None:
+                        report.loss_example = self._path(parents, state) + [text]
+                elif child not in parents:
+                    if len(parents) >= self.max_states:
+                        truncated = True
+                        frontier.clear()
+                        break
+                    parents[child] = (state, text, depth + 1)
+                    if outcome == "won":
+                        wins.append(child)
+                        if report.solution is None:
+                            report.solution = self._path(parents, child)
+                            if not self.find_dead_ends:
+                                frontier.clear()
+                                break
+                    else:
+                        frontier.append(child)
+                if reverse is not None and outcome != "lost":
+                    reverse[child].append((state, text))
+                self.restore(state)
+        self.parents, self.reverse, self.wins = parents, reverse, wins
+        report.states = len(parents)
+        report.complete = not truncated and (self.find_dead_ends or report.solution is None)
+        if report.solution is not None:
+            report.winnable = True
+        elif not truncated:
+            report.winnable = False
+        if reverse is not None and report.complete:
+            self._find_dead_ends(report, parents, reverse, set(wins))
+        return report
+
+    def _find_dead_ends(self, report, parents, reverse, wins):
+        """Mark the states that can still reach a win and report the rest."""
+        alive = set(wins)
+        stack = list(wins)
+        while stack:
+            for parent, _ in reverse.get(stack.pop(), ()):
+                if parent not in alive:
+                    alive.add(parent)
+                    stack.append(parent)
+        dead = [state for state in parents if state not in alive]
+        report.dead_ends = len(dead)
+        for state in dead:
+            parent = parents[state][0]
+            if parent is not None and parent in alive:
+                report.fatal.append(self._path(parents, state))
+                if len(report.fatal) >= 5:
+                    break
+
+    def _path(self, parents, state):
+        """Get the commands leading from the start to a state."""
+        path = []
+        while True:
+            state, text, _ = parents[state]
+            if state is None:
+                return path[::-1]
+            path.append(text)
+
+
+def solve_world(template, **options):
+    """Solve a world.
+    Args:
+    template (WorldTemplate): The world to solve.
+    options: Solver settings (max_inventory, max_states, max_depth, find_dead_ends).
+
+    Returns:
+    Report: What the search found.
+    """
+    return Solver(template, **options).solve()
+
+
+def format_report(report, path):
+    """Describe a Report for the terminal."""
+    lines = []
+    if report.winnable:
+        lines.append(f"{report.world} ({path}): winnable in {len(report.solution)} commands, {report.states} states explored")
+        lines.append("  solution: " + ", ".join(report.solution))
+    elif report.winnable is False:
+        lines.append(f"{report.world} ({path}): NOT winnable, all {report.states} reachable states explored")
+    else:
+        lines.append(f"{report.world} ({path}): unknown, no win within the limits ({report.states} states explored)")
+    if report.loss_example is not None:
+        lines.append(f"  losing moves: {report.losses}, e.g. " + ", ".join(report.loss_example))
+    if report.dead_ends is not None:
+        lines.append(f"  dead ends: {report.dead_ends} states")
+        for path in report.fatal:
+            lines.append("    " + ", ".join(path))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that text adventure worlds can be won")
+    parser.add_argument("worlds", nargs="*", help="world JSON files (default: every world in worlds/)")
+    parser.add_argument("--max-inventory", type=int, default=3, help="the player's carrying capacity")
+    parser.add_argument("--max-states", type=int, default=1000000, help="stop after this many distinct states")
+    parser.add_argument("--max-depth", type=int, default=None, help="do not search deeper than this many commands")
+    parser.add_argument("--dead-ends", action="store_true", help="explore every state and report unwinnable ones")
+    args = parser.parse_args(argv)
+    paths = args.worlds or sorted(glob.glob(os.path.join(adv.WORLD_DIR, "*.json")))
+    failed = False
+    for path in paths:
+        report = solve_world(adv.load_world(path), max_inventory=args.max_inventory, max_states=args.max_states,
+                             max_depth=args.max_depth, find_dead_ends=args.dead_ends)
+        print(format_report(report, path))
+        failed = failed or not report.winnable
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""Seeded generator of large, guaranteed-winnable worlds.
+
+A generated world is a tree of rooms. A main path leads from the start room to the goal
+room holding the win item, and side branches hang off every room up to the branching
+limit. Some steps along the main path are gated, in the style of the default world:
+
+    lock     the exit is locked and a key lies somewhere before it (the Kitchen gate)
+    trap     the next room is a trap and a protection item lies before it (the Garden)
+    riddle   a riddle blocks the exit (the Garden's riddle)
+    npc      the exit is locked and an NPC before it gives the key for a riddle (the Library)
+
+Whatever a gate needs is placed in a room reachable from the part of the path between
+it and the previous gate, without crossing any other gate, so the world can always be
+won. The generator also writes that winning command sequence, which --check replays.
+Other rooms get decoy items (by --items density) and dead-end traps.
+
+    python worldgen.py 1000 --seed 7 -o worlds/generated-1k.json --check
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+import adv
+
+DIRECTIONS = ("north", "east", "south", "west")
+OPPOSITE = {"north": "south", "south": "north", "east": "west", "west": "east"}
+ADJECTIVES = ("Dusty", "Damp", "Quiet", "Narrow", "Vaulted", "Crumbling", "Sunlit", "Gloomy", "Painted", "Echoing")
+PLACES = ("Hall", "Cellar", "Corridor", "Chamber", "Gallery", "Study", "Pantry", "Chapel", "Attic", "Cloister")
+DECOYS = (("Item", "pebble", "A smooth grey pebble."), ("Item", "candle", "A stub of a wax candle."),
+          ("Treasure", "coin", "A tarnished silver coin."), ("Tool", "rope", "A coil of frayed rope."),
+          ("Item", "book", "A book with most pages missing."), ("Treasure", "ring", "A thin gold ring."))
+METALS = ("brass", "iron", "silver", "copper", "bone")
+PROTECTIONS = ("shield", "amulet", "cloak", "helmet", "lantern")
+RIDDLES = (
+    ("I speak without a mouth and hear without ears. What am I?", "echo"),
+    ("I'm tall when I'm young, and I'm short when I'm old. What am I?", "candle"),
+    ("What has keys but can't open locks?", "piano"),
+    ("What has to be broken before you can use it?", "egg"),
+    ("The more of me you take, the more you leave behind. What am I?", "footsteps"),
+    ("What has a neck but no head?", "bottle"),
+    ("What gets wetter the more it dries?", "towel"),
+    ("What has hands but cannot clap?", "clock"),
+)
+NPC_NAMES = ("Hermit", "Librarian", "Gardener", "Old Knight", "Scribe", "Ferryman")
+
+
+def generate_world(rooms, seed=0, branching=2, items=0.2, gates=0.25, path_length=None, weights=None,
+                   dead_end_traps=0.02, win_item="golden crown"):
+    """Generate a winnable world.
+    Args:
+    rooms (int): The number of rooms (at least 2).
+    seed (int): The random seed; the same arguments always give the same world.
+    branching (int): The most exits a room has besides the way back (1 to 3).
+    items (float): The share of rooms holding a decoy item.
+    gates (float): The share of main-path steps that are gated.
+    path_length (int): Rooms on the main path from start to goal (default: about 2*sqrt(rooms)).
+    weights (dict): Relative weights of the gate kinds 'lock', 'trap', 'riddle' and 'npc'
+    (default: all 1; 0 disables a kind).
+    dead_end_traps (float): The share of dead-end side rooms that are deadly traps.
+    win_item (str): The name of the item that wins the game.
+
+    Returns:
+    tuple: (world dictionary in the worlds/*.json format, winning command list).
+    """
+    if rooms < 2:
+        raise ValueError("A world needs at least 2 rooms.")
+    if not 1 <= branching <= 3:
+        raise ValueError("branching must be between 1 and 3.")
+    rng = random.Random(seed)
+    weights = dict({"lock": 1, "trap": 1, "riddle": 1, "npc": 1}, **(weights or {}))
+    kinds = [kind for kind, weight in weights.items() if weight > 0]
+    kind_weights = [weights[kind] for kind in kinds]
+    if path_length is None:
+        path_length = max(2, min(rooms, int(2 * rooms ** 0.5)))
+    path_length = max(2, min(rooms, path_length))
+
+    names = [f"{rng.choice(ADJECTIVES)} {rng.choice(PLACES)} {i}" for i in range(rooms)]
+    exits = [{} for _ in range(rooms)]
+    specs = [{} for _ in range(rooms)]
+    parent = [-1] * rooms
+    down = [None] * rooms  # Direction from a room's parent into it.
+    anchor = list(range(rooms))  # The main-path room a side room hangs off.
+    children = bytearray(rooms)
+
+    def link(a, b):
+        direction = rng.choice([d for d in DIRECTIONS if d not in exits[a]])
+        exits[a][direction] = names[b]
+        exits[b][OPPOSITE[direction]] = names[a]
+        parent[b] = a
+        down[b] = direction
+        children[a] += 1
+
+    for i in range(1, path_length):
+        link(i - 1, i)
+    open_rooms = [i for i in range(path_length) if children[i] < branching]
+    for b in range(path_length, rooms):
+        k = rng.randrange(len(open_rooms))
+        a = open_rooms[k]
+        link(a, b)
+        anchor[b] = anchor[a]
+        if children[a] >= branching:
+            open_rooms[k] = open_rooms[-1]
+            open_rooms.pop()
+        open_rooms.append(b)
+
+    # Gate some main-path steps; segment s runs from the room after gate s-1 to gate s.
+    gated = [i for i in range(path_length - 1) if rng.random() < gates] if kinds else []
+    segment_of = [len(gated)] * path_length
+    start = 0
+    for s, edge in enumerate(gated):
+        for i in range(start, edge + 1):
+            segment_of[i] = s
+        start = edge + 1
+    members = [[] for _ in gated]
+    for room in range(rooms):
+        s = segment_of[anchor[room]]
+        if s < len(gated):
+            members[s].append(room)
+
+    needs = {}  # Main-path room -> list of (room holding something, commands to run there).
+    drops = {}  # Gate -> item names to drop once through it.
+    protection = None
+    solution_gates = {}
+    used = set()
+    for s, edge in enumerate(gated):
+        kind = rng.choices(kinds, kind_weights)[0]
+        here, forward = specs[edge], down[edge + 1]
+        drop = [protection] if protection else []
+        protection = None
+        if kind == "riddle":
+            riddle, answer = rng.choice(RIDDLES)
+            here["puzzle"] = {"riddle": riddle, "answer": answer, "blocks": forward, "points": 20,
+                              "blocked_message": f"The path to the {forward} is blocked by a riddle. Use 'solve <answer>' to proceed.",
+                              "solved_message": f"Correct! The path to the {forward} is now open."}
+            solution_gates[edge] = [f"solve {answer}"]
+        else:
+            holder = rng.choice(members[s])
+            used.add(holder)
+            if kind == "trap":
+                name = f"{rng.choice(PROTECTIONS)} {s}"
+                item = {"type": "Item", "name": name, "description": "It might keep you safe somewhere dangerous."}
+                specs[edge + 1]["trap"] = {"protection": name, "safe_text": f" Your {name} keeps you safe here.",
+                                           "message": f"You triggered a trap in the {names[edge + 1]} and lost!"}
+                specs[holder].setdefault("items", []).append(item)
+                actions = [f"take {name}"]
+                protection = name
+            else:
+                name = f"{rng.choice(METALS)} key {s}"
+                key = {"type": "Key", "name": name, "description": f"A key that unlocks the {forward} exit of the {names[edge]}."}
+                here.setdefault("locks", {})[forward] = {"item": name, "message": f"The {forward} exit is locked, you need the {name}."}
+                if kind == "lock":
+                    specs[holder].setdefault("items", []).append(key)
+                    actions = [f"take {name}"]
+                else:
+                    while "npc" in specs[holder] or "puzzle" in specs[holder]:
+                        holder = rng.choice(members[s])
+                    riddle, answer = rng.choice(RIDDLES)
+                    npc_name = rng.choice(NPC_NAMES)
+                    specs[holder]["npc"] = {"name": npc_name, "riddle": riddle, "answer": answer, "reward": key, "points": 20,
+                                            "message": f"Correct! The {npc_name} hands you the {name}."}
+                    actions = [f"solve {answer}", f"take {name}"]
+                drop.append(name)
+            needs.setdefault(anchor[holder], []).append((holder, actions))
+        drops[edge] = drop
+
+    win_room = path_length - 1
+    specs[win_room].setdefault("items", []).append(
+        {"type": "Treasure", "name": win_item, "description": "The prize you came for."})
+
+    decoys = 0
+    for room in range(rooms):
+        if rng.random() < items:
+            item_type, noun, description = rng.choice(DECOYS)
+            specs[room].setdefault("items", []).append({"type": item_type, "name": f"{noun} {decoys}", "description": description})
+            decoys += 1
+    for room in range(path_length, rooms):
+        if not children[room] and room not in used and rng.random() < dead_end_traps:
+            specs[room]["trap"] = {"message": f"The floor of the {names[room]} gives way. You lost!"}
+
+    solution = []
+    for i in range(path_length):
+        for holder, actions in needs.get(i, ()):
+            route = []
+            room = holder
+            while room != i:
+                route.append(down[room])
+                room = parent[room]
+            route.reverse()
+            solution.extend(route)
+            solution.extend(actions)
+            solution.extend(OPPOSITE[direction] for direction in reversed(route))
+        if i == win_room:
+            solution.append(f"take {win_item}")
+            break
+        solution.extend(solution_gates.get(i, ()))
+        solution.append(down[i + 1])
+        solution.extend(f"drop {name}" for name in drops.get(i, ()))
+
+    world_rooms = {}
+    for room in range(rooms):
+        spec = specs[room]
+        spec["description"] = f"You are in a {names[room].rsplit(' ', 1)[0].lower()}."
+        spec["exits"] = exits[room]
+        world_rooms[names[room]] = spec
+    data = {
+        "format": adv.WORLD_FORMAT,
+        "name": f"generated-{rooms}-{seed}",
+        "start": names[0],
+        "win_item": win_item,
+        "hints": {"default": "Follow the main path; what each gate needs lies somewhere before it."},
+        "rooms": world_rooms,
+    }
+    return data, solution
+
+
+def play_solution(template, solution, max_inventory=3):
+    """Play a command list in a fresh session.
+    Args:
+    template (WorldTemplate): The world.
+    solution (list): The commands.
+    max_inventory (int): The player's carrying capacity.
+
+    Returns:
+    str: The session's outcome ('won', 'lost', 'quit' or None if still playing).
+    """
+    session = adv.GameSession("worldgen", rooms=template, save_file=adv.os.devnull, record_scores=False, max_inventory=max_inventory)
+    for command in solution:
+        session.step(command)
+        if session.finished:
+            break
+    return session.outcome
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a winnable text adventure world")
+    parser.add_argument("rooms", type=int, help="number of rooms")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--branching", type=int, default=2, help="most exits per room besides the way back (1-3)")
+    parser.add_argument("--items", type=float, default=0.2, help="share of rooms holding a decoy item")
+    parser.add_argument("--gates", type=float, default=0.25, help="share of main-path steps that are gated")
+    parser.add_argument("--path-length", type=int, default=None, help="rooms on the main path (default: about 2*sqrt(rooms))")
+    for kind in ("lock", "trap", "riddle", "npc"):
+        parser.add_argument(f"--{kind}s", type=float, default=1.0, help=f"relative weight of {kind} gates (0 disables them)")
+    parser.add_argument("-o", "--output", help="world file to write (default: print a summary only)")
+    parser.add_argument("--solution", help="also write the winning commands, one per line, to this file")
+    parser.add_argument("--check", action="store_true", help="replay the winning commands to confirm the world can be won")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    data, solution = generate_world(args.rooms, args.seed, args.branching, args.items, args.gates, args.path_length,
+                                    {"lock": args.locks, "trap": args.traps, "riddle": args.riddles, "npc": args.npcs})
+    print(f"{data['name']}: {len(data['rooms'])} rooms, {len(solution)}-command solution, "
+          f"generated in {time.perf_counter() - start:.2f}s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+    if args.solution:
+        with open(args.solution, "w", encoding="utf-8") as f:
+            f.write("\n".join(solution) + "\n")
+    if args.check:
+        outcome = play_solution(adv.WorldTemplate(data), solution)
+        print(f"solution replay: {outcome or 'not finished'}")
+        return 0 if outcome == "won" else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())